@@ -1,69 +1,67 @@
 import sys
 from pathlib import Path
 
+# ensure repository root is on sys.path so `yt_top` package imports work when running from /scripts
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-def main():
-    # allow user to pass CSV path; otherwise pick the first matching enriched CSV in out/
-    if len(sys.argv) > 1:
-        csv_path = Path(sys.argv[1])
-    else:
-        # prefer CSV candidates first
-        candidates = list(Path('out').glob('youtube_top_videos_last_*.csv'))
-        if not candidates:
-            # fall back to any matching file if no CSVs found
-            candidates = list(Path('out').glob('youtube_top_videos_last_*'))
-        if not candidates:
-            print('No matching CSV found in out/; provide a path argument')
-            sys.exit(1)
-        # prefer .csv
-        csv_path = next((p for p in candidates if p.suffix.lower() == '.csv'), candidates[0])
 
-    if not csv_path.exists():
-        print(f'CSV not found: {csv_path}')
-        sys.exit(1)
-
-    xlsx_path = csv_path.with_suffix('.xlsx')
+def main():
+    # allow user to pass CSV paths, globs or directories; otherwise convert the enriched CSVs in out/
+    args = sys.argv[1:] or ['out/youtube_top_videos_last_*.csv']
 
-    # Try using pandas (recommended). If not available, fall back to the builtin writer.
+    # Try using pandas (recommended). If not available, fall back to the builtin streaming converter.
     try:
         import pandas as pd
+    except ImportError as e:
+        print('pandas not available:', e)
+    else:
+        import os
 
-        print(f'Reading {csv_path}...')
-        df = pd.read_csv(csv_path)
-        # normalize column name: some enriched CSVs use `video_url`; rename to `url`
-        if 'video_url' in df.columns and 'url' not in df.columns:
-            df = df.rename(columns={'video_url': 'url'})
-        print(f'Writing {xlsx_path}...')
-        df.to_excel(xlsx_path, index=False)
-        print(f'Done: {xlsx_path}')
-        return
-    except Exception as e:
-        # pandas not available or failed; fall back
-        print('pandas not available or failed:', e)
-
-    # Fallback: use the repository minimal XLSX writer
-    try:
-        # ensure repo root on path
-        sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
-        from yt_top.exporter import write_xlsx_minimal
-        import csv
+        from yt_top.convert import ConvertState, Skipped, destinations, expand_inputs
+        from yt_top.manifest import file_sha256
 
-        print('Falling back to builtin XLSX writer')
-        with open(csv_path, newline='', encoding='utf-8') as f:
-            r = csv.DictReader(f)
-            rows = [row for row in r]
+        paths = expand_inputs(args)
+        if not paths:
+            print('No matching CSV found; provide a path argument')
+            sys.exit(1)
+        # same outputs as the converter: never the exporter's own workbook, and
+        # inputs recorded as converted with pandas are left alone until they change
+        states = {}
+        failed = False
+        for csv_path, xlsx_path in destinations(paths).items():
+            if isinstance(xlsx_path, Skipped):
+                print(f'Skipped: {csv_path}: {xlsx_path}')
+                continue
+            if isinstance(xlsx_path, Exception):
+                print(f'Failed: {csv_path}: {xlsx_path}')
+                failed = True
+                continue
+            directory = os.path.dirname(xlsx_path) or '.'
+            state = states.setdefault(directory, ConvertState(directory))
+            st = os.stat(csv_path)
+            entry = state.get(xlsx_path)
+            if entry is not None and entry[3] == 'pandas/single' and os.path.exists(xlsx_path) and entry[:2] == (st.st_size, st.st_mtime_ns):
+                print(f'Unchanged: {xlsx_path}')
+                continue
+            print(f'Reading {csv_path}...')
+            df = pd.read_json(csv_path, lines=True) if csv_path.endswith('.jsonl') else pd.read_csv(csv_path)
+            # normalize column name: some enriched CSVs use `video_url`; rename to `url`
+            if 'video_url' in df.columns and 'url' not in df.columns:
+                df = df.rename(columns={'video_url': 'url'})
+            print(f'Writing {xlsx_path}...')
+            df.to_excel(xlsx_path, index=False)
+            state.set(xlsx_path, (st.st_size, st.st_mtime_ns, file_sha256(csv_path), 'pandas/single'))
+            print(f'Done: {xlsx_path}')
+        for state in states.values():
+            state.save()
+        if failed:
+            sys.exit(1)
+        return
 
-        headers = ["category", "rank", "title", "channel", "views", "url", "published_at"]
-        norm_rows = []
-        for row in rows:
-            norm = {h: row.get(h, '') for h in headers}
-            norm_rows.append(norm)
+    from yt_top.convert import main as convert
 
-        write_xlsx_minimal(str(xlsx_path), norm_rows)
-        print('Wrote (builtin):', xlsx_path)
-    except Exception as e:
-        print('Failed to write XLSX:', e)
-        sys.exit(1)
+    print('Falling back to builtin XLSX writer')
+    sys.exit(convert(args))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,23 @@
+import sys
+import pathlib
+
+import pytest
+
+# Ensure project root is on sys.path so imports work under pytest
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from yt_top import client as client_mod
+from yt_top.fakeapi import FakeYouTube
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    fake = FakeYouTube().start()
+    # route the shared default client to the fake server; retries back off instantly
+    fake.client = client_mod.YouTubeClient(base_url=fake.base_url, backoff=0)
+    monkeypatch.setattr(client_mod, "_default_client", fake.client)
+    try:
+        yield fake
+    finally:
+        fake.client.close()
+        fake.stop()
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from yt_top import exporter, run
+from yt_top.fakeapi import FakeYouTube
+
+
+def _async_client(fake, **kwargs):
+    aio = pytest.importorskip("yt_top.aio")
+    pytest.importorskip("httpx")
+    return aio, aio.AsyncYouTubeClient(base_url=fake.base_url, backoff=0, **kwargs)
+
+
+def test_async_backend_matches_sync_rows(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fake_api.videos_per_category = 120
+    fake_api.flaky = {"20": 1}
+    # more connections than requests allowed, so the semaphore is what caps them
+    _, client = _async_client(fake_api, max_in_flight=4, pool_size=16)
+    try:
+        paths = exporter.fetch_and_export("all", 120, "US,JP", 7, api_key="k", client=client, combined=True, formats=["csv"])
+        assert client.get_json("videoCategories", {"regionCode": "US"})["items"][1]["snippet"]["title"] == "Music"
+        assert fake_api.peak_active <= 4
+    finally:
+        client.close()
+    async_csv = open(paths[0], encoding="utf-8").read()
+
+    exporter.fetch_and_export("all", 120, "US,JP", 7, api_key="k", client=fake_api.client, combined=True, formats=["csv"])
+    assert async_csv == open(paths[0], encoding="utf-8").read()
+    assert len(async_csv.splitlines()) == 1 + 2 * 3 * 120
+
+
+def test_http1_pool_is_sized_for_max_in_flight(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fake = FakeYouTube(delay=0.05).start()
+    _, client = _async_client(fake, max_in_flight=8, http2=False)
+    try:
+        exporter.fetch_and_export("all", 5, ",".join(f"R{i}" for i in range(4)), 7, api_key="k", client=client, formats=["csv"])
+    finally:
+        client.close()
+        fake.stop()
+    assert 4 < fake.peak_active <= 8
+
+
+def test_fatal_error_cancels_outstanding_charts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fake = FakeYouTube(delay=0.02, reject={"10": "quotaExceeded"}).start()
+    aio, client = _async_client(fake, max_in_flight=2)
+    try:
+        with pytest.raises(aio.FatalAPIError, match="quotaExceeded"):
+            exporter.fetch_and_export("1,10,20", 5, ",".join(f"R{i}" for i in range(8)), 7, api_key="k", client=client)
+    finally:
+        client.close()
+        fake.stop()
+    # the run stopped well before fetching all 24 charts, and no output replaced a previous one
+    assert len([p for p, _ in fake.requests if p.endswith("/videos")]) < 24
+    assert not os.path.exists("out/top_videos_R0.csv")
+
+
+def test_async_backend_requires_httpx(monkeypatch, capsys):
+    monkeypatch.setattr(run, "_httpx_available", lambda: False)
+    monkeypatch.setenv("YOUTUBE_API_KEY", "k")
+    with pytest.raises(SystemExit):
+        run.main(["--backend", "async"])
+    assert "requires the httpx package" in capsys.readouterr().err
@@ -0,0 +1,52 @@
+from yt_top import bench, exporter
+from yt_top.client import YouTubeClient
+from yt_top.fakeapi import FakeYouTube
+from yt_top.lang import detect_langs
+from yt_top.synthetic import SyntheticCharts
+
+
+def test_synthetic_rows_are_deterministic_and_varied():
+    rows = list(SyntheticCharts(seed=3).rows(5000, per_category=100))
+    assert rows == list(SyntheticCharts(seed=3).rows(5000, per_category=100))
+    assert len({r["video_id"] for r in rows}) == 5000
+    assert {r["rank"] for r in rows} == set(range(1, 101))
+    assert len({lang for lang, _ in detect_langs(r["title"] for r in rows)}) >= 6
+    assert max(len(r["channel"]) for r in rows) >= 60
+    # heavy tail: the top 1% of rows hold a large share of all views
+    views = sorted((r["views"] for r in rows), reverse=True)
+    assert sum(views[:50]) > 0.1 * sum(views)
+
+
+def test_fake_api_serves_synthetic_charts():
+    charts = SyntheticCharts(seed=1)
+    fake = FakeYouTube(videos_per_category=120, synthetic=charts).start()
+    client = YouTubeClient(base_url=fake.base_url, backoff=0)
+    try:
+        rows = exporter.fetch_videos_for_category("10", 120, "JP", 7, "k", client=client)
+    finally:
+        client.close()
+        fake.stop()
+    assert len(rows) == 120
+    expected = charts.video("10", 77, "JP")
+    assert {k: rows[76][k] for k in ("video_id", "title", "channel", "views")} == {
+        k: expected[k] for k in ("video_id", "title", "channel", "views")
+    }
+
+
+def test_suite_runs_stages_and_results_compare(tmp_path):
+    results = bench.bench_suite(rows=300, per_category=50, stages=["verify"])
+    assert list(results["stages"]) == ["verify"]
+    verify = results["stages"]["verify"]
+    assert verify["rows"] == 300 and verify["rows_per_sec"] > 0 and verify["peak_rss_bytes"] > 0
+
+    slower = {"stages": {"verify": dict(verify, rows_per_sec=verify["rows_per_sec"] * 0.5)}}
+    lines, regressions = bench.compare_results(results, slower)
+    assert regressions == ["verify"] and "REGRESSION" in lines[-1]
+    assert bench.compare_results(results, results)[1] == []
+
+
+def test_row_records_are_smaller_than_dicts():
+    results = bench.bench_rows(rows=2000)
+    assert set(results) == {"dicts", "records"}
+    assert results["records"]["bytes_per_row"] < results["dicts"]["bytes_per_row"]
+    assert all(r["rows_per_sec"] > 0 for r in results.values())
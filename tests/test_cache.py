@@ -0,0 +1,48 @@
+import os
+
+from yt_top import exporter
+from yt_top.cache import ResponseCache
+from yt_top.client import YouTubeClient
+
+
+def _client(fake, cache):
+    return YouTubeClient(base_url=fake.base_url, cache=cache)
+
+
+def test_fresh_entries_skip_the_network(fake_api, tmp_path):
+    client = _client(fake_api, ResponseCache(str(tmp_path)))
+
+    first = exporter.get_video_categories("key-a", "US", client=client)
+    # a different API key must still hit the same entry
+    second = exporter.get_video_categories("key-b", "US", client=client)
+
+    assert first == second == fake_api.categories
+    assert len(fake_api.requests) == 1
+
+
+def test_expired_entries_revalidate_with_etag(fake_api, tmp_path):
+    cache = ResponseCache(str(tmp_path), ttls={"videos": 0})
+    client = _client(fake_api, cache)
+
+    first = exporter.fetch_videos_for_category("10", 3, "US", 7, "k", client=client)
+    second = exporter.fetch_videos_for_category("10", 3, "US", 7, "k", client=client)
+
+    assert first == second
+    assert len(fake_api.requests) == 2
+    assert fake_api.not_modified == 1
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=700)
+    body = {"items": ["x" * 150]}
+    cache.put("videos", {"videoCategoryId": "1"}, body)
+    cache.put("videos", {"videoCategoryId": "2"}, body)
+    # backdate entry 2 so it is the least recently used
+    old = os.path.getmtime(cache._path("videos", {"videoCategoryId": "2"})) - 10
+    os.utime(cache._path("videos", {"videoCategoryId": "2"}), (old, old))
+    cache.put("videos", {"videoCategoryId": "3"}, body)
+    cache.put("videos", {"videoCategoryId": "4"}, body)
+
+    assert cache.get("videos", {"videoCategoryId": "2"}) is None
+    assert cache.get("videos", {"videoCategoryId": "4"}) is not None
+    assert sum(os.path.getsize(os.path.join(tmp_path, p)) for p in os.listdir(tmp_path)) <= 700
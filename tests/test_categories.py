@@ -0,0 +1,47 @@
+import csv
+
+from yt_top import exporter
+from yt_top.categories import CategoryIndex
+
+CATEGORIES = {"1": "Film & Animation", "10": "Music", "20": "Gaming", "28": "Science & Technology"}
+
+
+def test_resolve_is_case_and_unicode_insensitive():
+    index = CategoryIndex(CATEGORIES)
+
+    assert index.resolve("music") == "10"
+    assert index.resolve("  MUSIC ") == "10"
+    # full-width letters normalize (NFKC) to their ASCII form
+    assert index.resolve("ｇａｍｉｎｇ") == "20"
+    assert index.resolve("film  &  animation") == "1"
+    assert index.resolve("28") == "28"
+    assert index.resolve("unknown") is None
+
+
+def test_aliases_only_map_to_existing_categories():
+    index = CategoryIndex(CATEGORIES)
+
+    assert index.resolve("tech") == "28"
+    assert index.resolve("games") == "20"
+    assert index.resolve("news") is None
+    assert CategoryIndex(CATEGORIES, aliases={"tunes": "Music"}).resolve("tunes") == "10"
+
+
+def test_lookup_matches_enrichment_semantics():
+    index = CategoryIndex(CATEGORIES)
+
+    assert index.lookup("10") == ("10", "Music")
+    assert index.lookup("99") == ("99", "")
+    assert index.lookup("Gaming") == ("20", "Gaming")
+    assert index.lookup("mock") == ("", "mock")
+
+
+def test_cli_names_and_aliases_resolve_to_ids(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    paths = exporter.fetch_and_export("MUSIC,games", 1, "US", 7, api_key="k")
+
+    fetched = [p.get("videoCategoryId") for path, p in fake_api.requests if path.endswith("/videos")]
+    assert fetched == ["10", "20"]
+    with open(paths[2], newline="", encoding="utf-8") as f:
+        assert [(r["category_id"], r["category_name"]) for r in csv.DictReader(f)] == [("10", "Music"), ("20", "Gaming")]
@@ -0,0 +1,91 @@
+import json
+import os
+
+import pytest
+
+from yt_top import exporter, run, verifier
+
+
+class Crash(BaseException):
+    pass
+
+
+def _videos_requested(fake_api):
+    return [p.get("videoCategoryId") for path, p in fake_api.requests if path.endswith("/videos")]
+
+
+def test_resume_fetches_only_missing_charts(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fetch = exporter.fetch_videos_for_category
+
+    def crash_on_gaming(category, *args, **kwargs):
+        if category == "20":
+            raise Crash()
+        return fetch(category, *args, **kwargs)
+
+    monkeypatch.setattr(exporter, "fetch_videos_for_category", crash_on_gaming)
+    with pytest.raises(Crash):
+        exporter.fetch_and_export("all", 2, "US", 7, api_key="k", checkpoint_dir="ckpt")
+    assert sorted(os.listdir("ckpt")) == ["US__1.jsonl", "US__10.jsonl", "run.json"]
+    assert not os.path.exists(os.path.join("out", "top_videos.csv"))
+
+    monkeypatch.setattr(exporter, "fetch_videos_for_category", fetch)
+    fake_api.requests.clear()
+    paths = exporter.fetch_and_export("all", 2, "US", 7, api_key="k", checkpoint_dir="ckpt", resume=True)
+
+    assert _videos_requested(fake_api) == ["20"]
+    assert not os.path.exists("ckpt")
+    report = verifier.verify_all(paths[0], paths[1])
+    assert report, str(report)
+    assert report.rows["csv"] == 6
+
+
+def test_resume_with_changed_settings_refetches(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # as left behind by a run that failed after fetching Music
+    exporter.Checkpoints("ckpt", {"n": 2, "days": 7, "mock": False}).save("US", "10", exporter._mock_videos("10", 2))
+
+    # a different n fetches different charts: nothing is reused
+    exporter.fetch_and_export("music", 3, "US", 7, api_key="k", checkpoint_dir="ckpt", resume=True)
+
+    assert _videos_requested(fake_api) == ["10"]
+
+
+def test_manifest_verifies_outputs_without_parsing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_path, xlsx_path, enriched = exporter.fetch_and_export("testcat", 3, "US", 7, mock=True)
+    manifest_path = os.path.join("out", "manifest.json")
+
+    assert os.stat(manifest_path).st_mode & 0o777 == 0o644
+    with open(manifest_path, encoding="utf-8") as f:
+        files = json.load(f)["files"]
+    assert sorted(files) == ["top_videos.csv", "top_videos.xlsx", "youtube_top_videos_last_7_US.csv"]
+    assert files["top_videos.csv"]["rows"] == files["top_videos.xlsx"]["rows"] == 3
+
+    monkeypatch.setattr(verifier, "_csv_rows", None)
+    monkeypatch.setattr(verifier, "_xlsx_rows", None)
+    report = verifier.verify_all(csv_path, xlsx_path, manifest=manifest_path)
+    assert report, str(report)
+    assert report.rows == {"csv": 3, "xlsx": 3}
+    assert verifier.main(["--manifest", manifest_path]) == 0
+
+    with open(csv_path, "r+b") as f:
+        f.seek(-2, os.SEEK_END)
+        f.write(b"X\n")
+    report = verifier.verify_all(csv_path, xlsx_path, manifest=manifest_path)
+    assert not report
+    assert "does not match its manifest checksum" in str(report)
+    assert not verifier.verify_manifest(manifest_path, [enriched, os.path.join("out", "other.csv")])
+
+
+def test_checkpoints_in_the_output_directory_leave_outputs_alone(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("out")
+    with open(os.path.join("out", "notes.jsonl"), "w", encoding="utf-8") as f:
+        f.write("{}\n")
+
+    paths = exporter.fetch_and_export("a", 2, "US", 7, mock=True, checkpoint_dir="out")
+    run.main(["--mock", "--categories", "a", "--n", "2", "--checkpoint-dir", "out"])
+
+    assert sorted(os.listdir("out")) == ["manifest.json", "notes.jsonl", "top_videos.csv", "top_videos.xlsx", "youtube_top_videos_last_7_US.csv"]
+    assert verifier.verify_all(paths[0], paths[1], manifest=os.path.join("out", "manifest.json"))
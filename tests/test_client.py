@@ -0,0 +1,44 @@
+import pytest
+import requests
+
+from yt_top import exporter
+from yt_top.client import YouTubeClient
+
+
+def test_retries_transient_errors_honoring_retry_after(fake_api):
+    fake_api.flaky = {"10": 2}
+    sleeps = []
+    client = YouTubeClient(base_url=fake_api.base_url, sleep=sleeps.append)
+
+    rows = exporter.fetch_videos_for_category("10", 3, "US", 7, "k", client=client)
+
+    assert len(rows) == 3
+    # two 503s with Retry-After: 0, then success
+    assert sleeps == [0.0, 0.0]
+
+
+def test_gives_up_after_max_retries(fake_api):
+    fake_api.flaky = {"10": 5}
+    client = YouTubeClient(base_url=fake_api.base_url, max_retries=2, sleep=lambda s: None)
+
+    with pytest.raises(requests.HTTPError):
+        exporter.fetch_videos_for_category("10", 3, "US", 7, "k", client=client)
+
+
+def test_reuses_connections(fake_api):
+    for cid in ("1", "10", "20"):
+        exporter.fetch_videos_for_category(cid, 1, "US", 7, "k")
+    exporter.get_video_categories("k", "US")
+
+    assert len(fake_api.requests) == 4
+    assert len(fake_api.connections) == 1
+
+
+def test_transient_failure_no_longer_drops_category(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fake_api.flaky = {"20": 1}
+
+    out_csv, _, _ = exporter.fetch_and_export("all", 1, "US", 7, api_key="k")
+
+    with open(out_csv, encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 1 + len(fake_api.categories)
@@ -0,0 +1,43 @@
+import csv
+import os
+import time
+
+from yt_top import exporter
+
+
+def _read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def _timed_export(concurrency):
+    start = time.perf_counter()
+    exporter.fetch_and_export("all", 2, "US", 7, api_key="k", concurrency=concurrency)
+    return time.perf_counter() - start
+
+
+def test_concurrent_fetch_scales_and_keeps_order(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fake_api.categories = {str(i): f"Cat {i}" for i in range(1, 9)}
+    fake_api.delay = 0.1
+
+    serial = _timed_export(1)
+    serial_rows = _read_rows(os.path.join("out", "top_videos.csv"))
+    parallel = _timed_export(8)
+    parallel_rows = _read_rows(os.path.join("out", "top_videos.csv"))
+
+    # 8 categories at 100ms each: serial pays every round trip, the pool overlaps them
+    assert serial > 2 * parallel
+    assert [r["category"] for r in parallel_rows] == [str(i) for i in range(1, 9) for _ in range(2)]
+    assert parallel_rows == serial_rows
+
+
+def test_concurrent_fetch_skips_failing_category(fake_api, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    fake_api.fail = {"10"}
+
+    exporter.fetch_and_export("all", 2, "US", 7, api_key="k", concurrency=3)
+
+    rows = _read_rows(os.path.join("out", "top_videos.csv"))
+    assert [r["category"] for r in rows] == ["1", "1", "20", "20"]
+    assert "Skipping category 10" in capsys.readouterr().err
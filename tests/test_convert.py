@@ -0,0 +1,96 @@
+import os
+
+from yt_top import convert, exporter, verifier
+from yt_top.convert import STATE_NAME
+
+
+def _rows(n):
+    for i in range(1, n + 1):
+        yield {
+            "category": "10",
+            "rank": i,
+            "title": f"Title {i}",
+            "channel": "Channel",
+            "views": 1000 * i,
+            "url": f"https://www.youtube.com/watch?v=v{i}",
+            "published_at": "2024-01-01T00:00:00Z",
+        }
+
+
+def _enriched(n):
+    for r in _rows(n):
+        yield dict(r, category_id="10", category_name="Music", language="en", video_url=r["url"])
+
+
+def test_convert_directory_in_parallel_and_skip_unchanged(tmp_path, capsys):
+    src = tmp_path / "in"
+    exporter.write_csv(str(src / "raw.csv"), _rows(30))
+    exporter.write_csv(str(src / "enriched.csv"), _enriched(20), exporter.ENRICHED_HEADERS)
+    exporter.write_rows(str(src / "raw2.jsonl"), _rows(5))
+    (src / "notes.txt").write_text("not an export")
+    out = tmp_path / "out"
+
+    assert convert.main([str(src), "-o", str(out), "-j", "2"]) == 0
+    assert sorted(os.listdir(out)) == [STATE_NAME, "enriched.xlsx", "raw.xlsx", "raw2.xlsx"]
+    assert "Wrote: " + str(out / "enriched.xlsx") + " (20 rows)" in capsys.readouterr().out
+    report = verifier.verify_all(str(src / "raw.csv"), str(out / "raw.xlsx"))
+    assert report, str(report)
+    # enriched exports keep their video_url column, hyperlinked
+    report = verifier.verify_xlsx(str(out / "enriched.xlsx"))
+    assert report and report.rows == {"xlsx": 20}, str(report)
+
+    # nothing changed; a touched file is hashed and still unchanged
+    os.utime(src / "raw.csv", ns=(1, 1))
+    results = convert.convert_many(convert.expand_inputs([str(src / "*.csv")]), str(out))
+    assert results == {str(src / "enriched.csv"): None, str(src / "raw.csv"): None}
+
+    exporter.write_csv(str(src / "raw.csv"), _rows(31))
+    results = convert.convert_many([str(src / "raw.csv"), str(src / "enriched.csv")], str(out))
+    assert results == {str(src / "raw.csv"): 31, str(src / "enriched.csv"): None}
+
+
+def test_convert_single_file_reports_failures(tmp_path):
+    csv_path = tmp_path / "a.csv"
+    exporter.write_csv(str(csv_path), _rows(3))
+    (tmp_path / "empty.csv").write_text("")
+
+    assert convert.main([str(csv_path), "-o", str(tmp_path / "b.xlsx")]) == 0
+    assert verifier.verify_xlsx(str(tmp_path / "b.xlsx"))
+    assert convert.main([str(tmp_path / "empty.csv")]) == 1
+    assert convert.main([str(tmp_path / "missing.csv")]) == 2
+
+
+def test_inputs_sharing_an_output_keep_their_extension(tmp_path, capsys):
+    exporter.write_csv(str(tmp_path / "top.csv"), _rows(3))
+    exporter.write_rows(str(tmp_path / "top.jsonl"), _rows(4))
+    exporter.write_csv(str(tmp_path / "other.csv"), _rows(2))
+
+    results = convert.convert_many(convert.expand_inputs([str(tmp_path)]), jobs=2)
+    assert results == {str(tmp_path / "other.csv"): 2, str(tmp_path / "top.csv"): 3, str(tmp_path / "top.jsonl"): 4}
+    assert verifier.verify_xlsx(str(tmp_path / "top.csv.xlsx")).rows == {"xlsx": 3}
+    assert verifier.verify_xlsx(str(tmp_path / "top.jsonl.xlsx")).rows == {"xlsx": 4}
+    assert not os.path.exists(tmp_path / "top.xlsx")
+
+    # each output keeps its own state entry, so both settle as unchanged
+    for _ in range(2):
+        assert convert.main([str(tmp_path / "top.csv"), str(tmp_path / "top.jsonl")]) == 0
+        assert capsys.readouterr().out.count("Unchanged:") == 2
+
+    # flattened into one -o directory, the same file names still collide
+    (tmp_path / "b").mkdir()
+    exporter.write_csv(str(tmp_path / "b" / "top.csv"), _rows(1))
+    results = convert.convert_many([str(tmp_path / "top.csv"), str(tmp_path / "b" / "top.csv")], str(tmp_path / "x"))
+    assert all(isinstance(r, ValueError) for r in results.values())
+
+
+def test_exporter_workbooks_are_not_replaced(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    raw, xlsx, enriched = exporter.fetch_and_export("testcat", 3, "US", 7, mock=True, xlsx_sheets="category")
+    before = os.stat(xlsx).st_mtime_ns
+
+    assert convert.main(["out"]) == 0
+
+    assert f"Skipped: {raw}: the exporter wrote {xlsx}" in capsys.readouterr().err
+    assert os.stat(xlsx).st_mtime_ns == before
+    assert verifier.verify_manifest(os.path.join("out", "manifest.json"))
+    assert verifier.verify_xlsx(convert.output_path(enriched))
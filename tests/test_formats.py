@@ -0,0 +1,82 @@
+import csv
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from yt_top import exporter, run, verifier
+from yt_top.sinks import format_for_path, open_sink
+
+
+def test_formats_write_raw_and_enriched_outputs(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    paths = exporter.fetch_and_export("10", 3, "US", 7, api_key="k", formats=["jsonl", "csv.gz", "xlsx"])
+
+    assert [p.replace("\\", "/") for p in paths] == [
+        "out/top_videos.jsonl",
+        "out/top_videos.csv.gz",
+        "out/top_videos.xlsx",
+        "out/youtube_top_videos_last_7_US.jsonl",
+        "out/youtube_top_videos_last_7_US.csv.gz",
+    ]
+    with open(paths[0], encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert list(rows[0]) == exporter.RAW_HEADERS
+    assert [r["views"] for r in rows] == [1000, 2000, 3000]
+    with gzip.open(paths[4], "rt", newline="", encoding="utf-8") as f:
+        assert [r["category_name"] for r in csv.DictReader(f)] == ["Music"] * 3
+
+
+def test_parquet_columns_are_typed(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "rows.parquet")
+    rows = [{"category": "10", "rank": i, "title": f"t{i}", "views": i * 10, "url": "u", "published_at": "2024-01-01T00:00:00Z"} for i in range(5)]
+    rows.append({"category": "10", "rank": "6", "views": "", "published_at": None})
+
+    with open_sink(path, exporter.RAW_HEADERS, batch_rows=2) as sink:
+        for r in rows:
+            sink.write(r)
+
+    table = pq.read_table(path)
+    assert table.num_rows == 6
+    assert str(table.schema.field("views").type) == "int64"
+    assert table["views"].to_pylist() == [0, 10, 20, 30, 40, None]
+    assert table["rank"].to_pylist()[-1] == 6
+    assert table["published_at"][0].as_py() == datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def test_zstd_csv_round_trips(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    path = str(tmp_path / "rows.csv.zst")
+    exporter.write_rows(path, exporter._mock_videos("10", 4))
+
+    with open(path, "rb") as f:
+        text = zstandard.ZstdDecompressor().stream_reader(f).read().decode("utf-8")
+    assert text.splitlines()[0] == ",".join(exporter.RAW_HEADERS)
+    assert len(text.splitlines()) == 5
+
+
+def test_format_lookup_and_cli_validation(tmp_path, monkeypatch, capsys):
+    assert format_for_path("a/b.csv.gz") == "csv.gz"
+    assert format_for_path("b.csv") == "csv"
+    with pytest.raises(ValueError):
+        format_for_path("b.txt")
+
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit):
+        run.main(["--mock", "--format", "csv,feather"])
+    assert "--format" in capsys.readouterr().err
+
+
+def test_sinks_write_records_and_dicts_alike(tmp_path):
+    rows = exporter._mock_videos("10", 3)
+    assert rows[0]["title"] == rows[0].title and rows[0].get("language") is None
+    for fmt in ("csv", "jsonl"):
+        exporter.write_rows(str(tmp_path / f"records.{fmt}"), rows, fmt=fmt)
+        exporter.write_rows(str(tmp_path / f"dicts.{fmt}"), [dict(r) for r in rows], fmt=fmt)
+        assert (tmp_path / f"records.{fmt}").read_bytes() == (tmp_path / f"dicts.{fmt}").read_bytes()
+    exporter.write_xlsx(str(tmp_path / "records.xlsx"), rows)
+    report = verifier.verify_all(str(tmp_path / "dicts.csv"), str(tmp_path / "records.xlsx"))
+    assert report, str(report)
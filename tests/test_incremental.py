@@ -0,0 +1,82 @@
+import csv
+import os
+
+import pytest
+
+from yt_top import exporter, run
+
+
+def _read(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_incremental_runs_write_only_new_and_changed_rows(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    def export():
+        return exporter.fetch_and_export("10", 3, "US", 7, api_key="k", incremental=True, history=True, min_views_change=0.05)
+
+    delta, history = export()
+    assert [(r["change"], r["video_id"]) for r in _read(delta)] == [
+        ("new", "v10x1"),
+        ("new", "v10x2"),
+        ("new", "v10x3"),
+    ]
+    assert not os.path.exists(os.path.join("out", "top_videos.csv"))
+
+    assert _read(export()[0]) == []
+
+    # one real change and one below the 5% threshold
+    fake_api.views.update({"v10x2": 9000, "v10x3": 3100})
+    delta, history = export()
+    assert [(r["change"], r["rank"], r["views"]) for r in _read(delta)] == [("changed", "2", "9000")]
+    rows = _read(history)
+    assert len(rows) == 4 and rows[-1]["views"] == "9000"
+
+    # small changes accumulate against the last exported views
+    fake_api.views["v10x3"] = 3200
+    assert [r["views"] for r in _read(export()[0])] == ["3200"]
+
+
+def test_failed_run_appends_no_history(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    def export():
+        return exporter.fetch_and_export("10", 3, "US", 7, api_key="k", incremental=True, history=True)
+
+    history = export()[1]
+    fake_api.views["v10x2"] = 9000
+    # the run fails before saving its state, or while saving it
+    with monkeypatch.context() as m:
+        m.setattr(exporter, "write_manifest", lambda *a: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            export()
+    with pytest.raises(OSError):
+        exporter.fetch_and_export("10", 3, "US", 7, api_key="k", incremental=True, history=True, state_path=os.path.join("out", "state-is-a-dir", ""))
+
+    assert len(_read(history)) == 3
+    assert sorted(os.listdir("out")) == ["manifest.json", "state-is-a-dir", "top_videos_delta.csv", "top_videos_history.csv", "top_videos_state.tsv"]
+    export()
+    assert [(r["change"], r["video_id"]) for r in _read(history)][3:] == [("changed", "v10x2")]
+
+
+def test_state_drops_videos_that_left_a_fetched_chart(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    state = tmp_path / "state.tsv"
+
+    exporter.fetch_and_export("10,20", 3, "US", 7, api_key="k", incremental=True, state_path=str(state))
+    assert len(state.read_text().splitlines()) == 6
+
+    fake_api.fail = {"20"}
+    fake_api.videos_per_category = 2
+    exporter.fetch_and_export("10,20", 3, "US", 7, api_key="k", incremental=True, state_path=str(state))
+    # v10x3 left chart 10; the failed chart 20 keeps its entries
+    assert sorted(line.split("\t")[2] for line in state.read_text().splitlines()) == ["v10x1", "v10x2", "v20x1", "v20x2", "v20x3"]
+
+
+def test_cli_requires_incremental_for_history(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit):
+        run.main(["--mock", "--history"])
+    assert "--incremental" in capsys.readouterr().err
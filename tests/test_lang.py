@@ -0,0 +1,92 @@
+import csv
+
+import pytest
+
+from yt_top import exporter
+from yt_top.lang import detect_lang, detect_langs
+from yt_top.synthetic import SyntheticCharts
+
+TITLES = {
+    "Official Music Video (4K Remastered)": "en",
+    "Café con leche — receta fácil": "en",
+    "周杰倫【最偉大的作品】": "zh",
+    "【公式】YOASOBI「アイドル」 Official Music Video": "ja",
+    "[MV] 아이유(IU) _ 좋은 날(Good Day)": "ko",
+    "Лучшие моменты матча": "ru",
+    "أجمل تلاوة للقرآن الكريم": "ar",
+    "नई फिल्म का आधिकारिक ट्रेलर": "hi",
+    "周杰倫・演唱會完整版": "zh",
+    "ㄅㄆㄇ 注音教學": "zh",
+    "ラーメン": "ja",
+}
+
+
+@pytest.mark.parametrize("title,lang", TITLES.items())
+def test_detect_lang_scripts(title, lang):
+    detected, confidence = detect_lang(title)
+
+    assert detected == lang
+    assert 0.0 < confidence <= 1.0
+
+
+def test_confidence_reflects_mixed_scripts():
+    assert detect_lang("Лучшие моменты") == ("ru", 1.0)
+    lang, confidence = detect_lang("Лучшие Highlights")
+    assert lang == "ru" and confidence == pytest.approx(6 / 16)
+    # no letters at all: default language, no confidence
+    assert detect_lang("1234 !!") == ("en", 0.0)
+    assert detect_lang("— 😀") == ("en", 0.0)
+    assert detect_lang("") == detect_lang(None) == ("en", 0.0)
+
+
+def test_scripts_sharing_a_block_are_told_apart():
+    # Hebrew shares a 256-code-point block with Cyrillic, Bengali with Devanagari
+    assert detect_lang("שלום עולם") == ("en", 0.0)
+    assert detect_lang("আমার সোনার বাংলা") == ("en", 0.0)
+    assert detect_lang("Shalom שלום") == ("en", 1.0)
+    # Bopomofo shares one with Hangul jamo; the middle dot and long vowel
+    # mark are not kana
+    assert detect_lang("ㄅㄆㄇ") == ("zh", 1.0)
+    assert detect_lang("周杰倫・演唱會完整版") == ("zh", 1.0)
+    assert detect_lang("ㅋㅋㅋ") == ("ko", 1.0)
+    # private use characters in the internal stand-in blocks are not letters
+    assert detect_lang("\ue1a0\ue6a0") == ("en", 0.0)
+
+
+def test_batch_matches_single_title_detection():
+    titles = list(TITLES) + ["", None, "1234", "ñ", "a\x00b", " private use", "שלום", "abc ・ー", "\ue3a0"]
+
+    assert detect_langs(titles) == [detect_lang(t) for t in titles]
+    assert detect_langs([]) == []
+
+
+def test_allowed_langs_and_confidence_filter_enriched_csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    paths = exporter.fetch_and_export("10", 3, "US", 7, mock=True, allowed_langs=["zh", "ja"])
+    with open(paths[0], newline="", encoding="utf-8") as f:
+        assert len(list(csv.DictReader(f))) == 3
+    with open(paths[2], newline="", encoding="utf-8") as f:
+        assert list(csv.DictReader(f)) == []
+
+    paths = exporter.fetch_and_export("10", 3, "US", 7, mock=True, min_lang_confidence=0.5)
+    with open(paths[2], newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["language"] for r in rows] == ["en"] * 3
+    assert "language_confidence" not in rows[0]
+
+
+def test_default_filter_keeps_every_script_and_batches_match(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fake_api.synthetic = SyntheticCharts(seed=3)
+    fake_api.videos_per_category = 300
+
+    paths = exporter.fetch_and_export("10", 300, "US", 7, api_key="k")
+
+    with open(paths[0], newline="", encoding="utf-8") as f:
+        titles = [r["title"] for r in csv.DictReader(f)]
+    with open(paths[2], newline="", encoding="utf-8") as f:
+        languages = [r["language"] for r in csv.DictReader(f)]
+    # titles used to be en or zh and were all kept; they still are
+    assert languages == [detect_lang(t)[0] for t in titles]
+    assert len(set(languages)) >= 5
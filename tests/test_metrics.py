@@ -0,0 +1,59 @@
+import json
+import os
+
+from yt_top import exporter, metrics, run
+
+
+def _series(data, kind, name, **labels):
+    labels = {k: str(v) for k, v in labels.items()}
+    return [s for s in data[kind].get(name, []) if all(s["labels"].get(k) == v for k, v in labels.items())]
+
+
+def test_run_writes_json_and_prometheus_metrics(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("YOUTUBE_API_KEY", "k")
+    fake_api.flaky = {"20": 1}
+    monkeypatch.setattr(run, "YouTubeClient", lambda **kw: fake_api.client)
+    run.main(
+        ["--categories", "10,20", "--n", "8", "--langs", "zh", "--no-cache",
+         "--metrics-json", "m/metrics.json", "--metrics-prom", "m/yt_top.prom"]
+    )
+    assert metrics.get_metrics() is metrics.NULL
+
+    with open("m/metrics.json", encoding="utf-8") as f:
+        data = json.load(f)
+    assert _series(data, "counters", "http_responses_total", endpoint="videos", status=503)[0]["value"] == 1
+    assert _series(data, "counters", "http_retries_total", endpoint="videos")[0]["value"] == 1
+    assert sum(s["value"] for s in _series(data, "counters", "rows_fetched_total")) == 16
+    # the fake API titles are all English, so --langs zh drops them all
+    assert _series(data, "counters", "rows_filtered_total", reason="language", language="en")[0]["value"] == 16
+    csv_bytes = _series(data, "counters", "sink_bytes_total", format="csv", output="raw")[0]["value"]
+    assert csv_bytes == os.path.getsize(os.path.join("out", "top_videos.csv"))
+    assert _series(data, "counters", "sink_rows_total", format="xlsx", output="raw")[0]["value"] == 16
+    assert len(_series(data, "timers", "category_fetch_seconds", region="US")) == 2
+    stages = {s["labels"]["stage"] for s in data["timers"]["stage_seconds"]}
+    assert {"categories", "enrich", "write:csv", "write:xlsx", "export"} <= stages
+
+    with open("m/yt_top.prom", encoding="utf-8") as f:
+        prom = f.read()
+    assert "# TYPE yt_top_http_responses_total counter" in prom
+    assert 'yt_top_http_responses_total{endpoint="videos",status="200"} 2' in prom
+    assert 'yt_top_stage_seconds_count{stage="export"} 1' in prom
+
+
+def test_disabled_metrics_leave_the_fast_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    out = exporter._OutputSet("", "US", 7)
+    try:
+        assert metrics.get_metrics() is metrics.NULL
+        assert "write" not in vars(out)
+    finally:
+        out.close()
+    with metrics.NULL.timer("stage_seconds", stage="x"):
+        metrics.NULL.inc("rows_total", 5)
+
+
+def test_label_values_are_escaped():
+    m = metrics.Metrics()
+    m.inc("rows_total", 2, title='a "b"\nc\\d')
+    assert 'yt_top_rows_total{title="a \\"b\\"\\nc\\\\d"} 2' in m.prometheus()
@@ -0,0 +1,40 @@
+import time
+
+from yt_top import exporter
+
+
+def _page_sizes(fake):
+    return [int(p["maxResults"]) for path, p in fake.requests if path.endswith("/videos")]
+
+
+def test_follows_page_tokens_until_n(fake_api):
+    fake_api.videos_per_category = 500
+
+    rows = exporter.fetch_videos_for_category("10", 120, "US", 7, "k")
+
+    assert [r["rank"] for r in rows] == list(range(1, 121))
+    assert rows[-1]["url"].endswith("v10x120")
+    assert _page_sizes(fake_api) == [50, 50, 20]
+
+
+def test_stops_when_chart_runs_out(fake_api):
+    fake_api.videos_per_category = 75
+
+    rows = exporter.fetch_videos_for_category("10", 200, "US", 7, "k")
+
+    assert len(rows) == 75
+    assert _page_sizes(fake_api) == [50, 50]
+
+
+def test_next_page_is_requested_while_current_page_is_consumed(fake_api):
+    fake_api.videos_per_category = 100
+
+    it = exporter.iter_videos_for_category("10", 100, "US", 7, "k")
+    first = next(it)
+    deadline = time.monotonic() + 2
+    while len(fake_api.requests) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert first["rank"] == 1
+    assert len(fake_api.requests) == 2
+    assert len(list(it)) == 99
@@ -0,0 +1,125 @@
+import pytest
+
+from yt_top import exporter, quota
+from yt_top.client import YouTubeClient
+from yt_top.quota import QuotaExceeded, QuotaScheduler, TokenBucket
+
+
+def _client(fake_api, scheduler):
+    return YouTubeClient(base_url=fake_api.base_url, backoff=0, scheduler=scheduler)
+
+
+def _videos_requested(fake_api):
+    return [p.get("videoCategoryId") for path, p in fake_api.requests if path.endswith("/videos")]
+
+
+def test_budget_admits_charts_in_category_priority_order(fake_api, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    scheduler = QuotaScheduler(run_budget=3)
+    client = _client(fake_api, scheduler)
+
+    exporter.fetch_and_export("gaming,all", 3, "US", 7, api_key="k", client=client)
+
+    # 1 unit for videoCategories, then Gaming first and the next chart in API order
+    assert _videos_requested(fake_api) == ["20", "1"]
+    assert scheduler.used_run == 3
+    assert scheduler.fetched == [("US", "20"), ("US", "1")]
+    assert scheduler.skipped == [("US", "10")]
+    err = capsys.readouterr().err
+    assert "Quota: 3 units this run (1 videoCategories, 2 videos)" in err
+    assert "not fetched (budget exhausted): US/10" in err
+    client.close()
+
+
+def test_budget_running_out_mid_run_stops_requests(fake_api, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    # the retry of chart 10 costs a unit the up-front estimate did not plan for
+    fake_api.flaky = {"10": 1}
+    scheduler = QuotaScheduler(run_budget=4)
+    client = _client(fake_api, scheduler)
+
+    paths = exporter.fetch_and_export("10,20,1", 3, "US", 7, api_key="k", client=client)
+
+    assert _videos_requested(fake_api) == ["10", "10", "20"]
+    assert scheduler.skipped == [("US", "1")]
+    assert "Skipping category" not in capsys.readouterr().err
+    with open(paths[0], encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 1 + 6
+    client.close()
+
+
+def test_daily_usage_is_persisted_across_runs(tmp_path):
+    state = str(tmp_path / "quota.state")
+    first = QuotaScheduler(daily_budget=3, state_path=state, day=lambda: "2026-01-01")
+    for _ in range(2):
+        first.acquire("videos")
+
+    second = QuotaScheduler(daily_budget=3, state_path=state, day=lambda: "2026-01-01")
+    assert second.used_today == 2 and second.remaining() == 1
+    second.acquire("videoCategories")
+    with pytest.raises(QuotaExceeded):
+        second.acquire("videos")
+
+    # a new quota day starts from zero
+    assert QuotaScheduler(daily_budget=3, state_path=state, day=lambda: "2026-01-02").remaining() == 3
+
+
+def test_concurrent_runs_add_up_their_units(tmp_path):
+    state = str(tmp_path / "quota.state")
+    first = QuotaScheduler(daily_budget=4, state_path=state, day=lambda: "2026-01-01")
+    second = QuotaScheduler(daily_budget=4, state_path=state, day=lambda: "2026-01-01")
+    first.acquire("videos")
+    second.acquire("videos")
+    first.acquire("videos")
+
+    # the second run sees the first run's units, read when it charges
+    assert (first.used_today, second.used_today) == (3, 2)
+    second.acquire("videos")
+    with pytest.raises(QuotaExceeded):
+        first.acquire("videos")
+
+
+def test_usage_without_a_daily_budget_is_saved_in_batches(tmp_path, monkeypatch):
+    state = tmp_path / "quota.state"
+    monkeypatch.setattr(quota, "SAVE_EVERY", 3)
+    first = QuotaScheduler(state_path=str(state), day=lambda: "2026-01-01")
+    second = QuotaScheduler(state_path=str(state), day=lambda: "2026-01-01")
+    for _ in range(2):
+        first.acquire("videos")
+        second.acquire("videos")
+    assert not state.exists()
+
+    first.acquire("videos")
+    second.save()
+    assert QuotaScheduler(state_path=str(state), day=lambda: "2026-01-01").used_today == 5
+
+
+def test_token_bucket_waits_for_refill():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=2.0, burst=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(4):
+        bucket.acquire()
+
+    assert sleeps == [0.5, 0.5]
+
+
+def test_report_lists_charts_that_failed(fake_api, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    fake_api.fail = {"20"}
+    scheduler = QuotaScheduler()
+    client = _client(fake_api, scheduler)
+
+    exporter.fetch_and_export("all", 2, "US,JP", 7, api_key="k", client=client)
+
+    assert sorted(scheduler.fetched) == [("JP", "1"), ("JP", "10"), ("US", "1"), ("US", "10")]
+    assert scheduler.failed == [("US", "20"), ("JP", "20")]
+    err = capsys.readouterr().err
+    assert "fetched: 4 charts" in err
+    assert "failed (API errors): US/20, JP/20" in err
+    client.close()
@@ -0,0 +1,112 @@
+import csv
+import json
+import os
+
+import openpyxl
+
+from yt_top import exporter, run, verifier
+from yt_top.refresh import refresh_export, refresh_history, video_id_from_url
+
+
+def _read(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_video_id_from_url():
+    assert video_id_from_url("https://www.youtube.com/watch?v=abc123&t=1") == "abc123"
+    assert video_id_from_url("https://youtu.be/xyz") == "xyz"
+    assert video_id_from_url("http://example.com/10/1") is None
+    assert video_id_from_url("") is None
+
+
+def test_refresh_updates_views_in_place_with_batched_calls(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fake_api.videos_per_category = 60
+    raw, _, enriched = exporter.fetch_and_export("10,20", 60, "US", 7, api_key="k")
+    fake_api.requests.clear()
+    fake_api.views.update({"v10x1": 777, "v20x60": 888})
+
+    assert refresh_export(enriched, "k", concurrency=3) == 120
+
+    # 120 ids in 3 statistics calls instead of 2 charts x 2 pages + a category list
+    calls = [p for path, p in fake_api.requests if path.endswith("/videos")]
+    # concurrent batches reach the server in any order
+    batches = sorted((p["id"].split(",") for p in calls), key=len)
+    assert [len(b) for b in batches] == [20, 50, 50]
+    assert len({i for b in batches for i in b}) == 120
+    assert all(p["part"] == "statistics" and "videoCategoryId" not in p for p in calls)
+    rows = _read(enriched)
+    assert len(rows) == 120 and list(rows[0]) == exporter.ENRICHED_HEADERS
+    assert (rows[0]["views"], rows[-1]["views"]) == ("777", "888")
+    assert rows[1]["category_name"] == "Music"
+
+
+def test_refresh_jsonl_keeps_unknown_ids(fake_api, tmp_path):
+    path = tmp_path / "rows.jsonl"
+    path.write_text(
+        json.dumps({"url": "https://www.youtube.com/watch?v=v10x2", "views": 1}) + "\n" + json.dumps({"url": "https://youtu.be/gone", "views": 5}) + "\n",
+        encoding="utf-8",
+    )
+
+    assert refresh_export(str(path), "k") == 1
+
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [r["views"] for r in rows] == [2000, 5]
+
+
+def test_refresh_history_records_a_new_snapshot(fake_api, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    db = str(tmp_path / "h.sqlite3")
+    exporter.fetch_and_export("10", 3, "US", 7, api_key="k", history_db=db)
+    fake_api.views["v10x3"] = 9000
+
+    assert refresh_history(db, "k", days=1) == 3
+
+    monkeypatch.delenv("YOUTUBE_API_KEY", raising=False)
+    run.main(["--from-history", "--days", "1", "--history-db", db, "--format", "csv"])
+    rows = _read("out/top_videos_last_1d.csv")
+    assert rows[0]["video_id"] == "v10x3" and rows[0]["max_views"] == "9000"
+
+
+def test_cli_refresh(fake_api, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    raw = exporter.fetch_and_export("10", 3, "US", 7, api_key="k")[0]
+    fake_api.views["v10x1"] = 5
+    monkeypatch.setenv("YOUTUBE_API_KEY", "k")
+
+    run.main(["--refresh", raw, "--api-base", fake_api.base_url, "--no-cache", "--quota-state", str(tmp_path / "q.state")])
+
+    assert f"Refreshed 3 rows in {raw}" in capsys.readouterr().out
+    assert _read(raw)[0]["views"] == "5"
+
+
+def test_refresh_bypasses_the_response_cache(fake_api, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    raw = exporter.fetch_and_export("10", 2, "US", 7, api_key="k")[0]
+    monkeypatch.setenv("YOUTUBE_API_KEY", "k")
+    args = ["--refresh", raw, "--api-base", fake_api.base_url, "--cache-dir", str(tmp_path / "cache"), "--quota-state", str(tmp_path / "q.state")]
+
+    fake_api.views["v10x1"] = 777
+    run.main(args)
+    fake_api.views["v10x1"] = 999999
+    fake_api.requests.clear()
+    run.main(args)
+
+    assert len(fake_api.requests) == 1
+    assert _read(raw)[0]["views"] == "999999"
+
+
+def test_refresh_keeps_the_manifest_and_workbook_in_step(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    raw, xlsx, _ = exporter.fetch_and_export("10", 3, "US", 7, api_key="k")
+    fake_api.views["v10x1"] = 5
+
+    assert refresh_export(raw, "k") == 3
+
+    report = verifier.verify_all(raw, xlsx, manifest=os.path.join("out", "manifest.json"))
+    assert report, str(report)
+    assert verifier.verify_all(raw, xlsx)
+    ws = openpyxl.load_workbook(xlsx).active
+    header = [c.value for c in ws[1]]
+    assert ws.cell(2, header.index("views") + 1).value == 5
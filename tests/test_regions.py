@@ -0,0 +1,51 @@
+import csv
+import os
+
+from yt_top import exporter, run
+from yt_top.client import YouTubeClient
+
+
+def _read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_per_region_files_and_timing_report(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    regions = tmp_path / "regions.txt"
+    regions.write_text("# EU\nGB\nDE  # germany\n\n", encoding="utf-8")
+
+    run.main(["--mock", "--categories", "c1,c2", "--n", "2", "--lang", "US", "--regions-file", str(regions)])
+
+    for region in ("US", "GB", "DE"):
+        assert len(_read_rows(os.path.join("out", f"top_videos_{region}.csv"))) == 4
+        assert os.path.exists(os.path.join("out", f"top_videos_{region}.xlsx"))
+        assert os.path.exists(os.path.join("out", f"youtube_top_videos_last_7_{region}.csv"))
+    err = capsys.readouterr().err
+    assert "Region timings:" in err
+    assert all(f"  {r}: " in err for r in ("US", "GB", "DE"))
+
+
+def test_combined_output_has_region_column(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    paths = exporter.fetch_and_export("c1", 2, "US,JP", 7, mock=True, region_concurrency=2, combined=True)
+
+    rows = _read_rows(paths[0])
+    assert [r["region"] for r in rows] == ["US", "US", "JP", "JP"]
+    enriched = _read_rows(paths[2])
+    assert paths[2].endswith("youtube_top_videos_last_7_multi.csv")
+    assert enriched[0]["region"] == "US"
+
+
+def test_global_request_budget_caps_in_flight_requests(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fake_api.delay = 0.05
+    client = YouTubeClient(base_url=fake_api.base_url, max_in_flight=2)
+
+    exporter.fetch_and_export(
+        "all", 1, "US,GB,DE,FR", 7, api_key="k", concurrency=3, client=client, region_concurrency=4
+    )
+
+    assert len(fake_api.requests) == 4 * (1 + len(fake_api.categories))
+    assert fake_api.peak_active <= 2
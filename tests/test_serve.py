@@ -0,0 +1,133 @@
+import os
+import signal
+import threading
+
+import pytest
+
+from yt_top import exporter, run, serve
+from yt_top.sinks import open_sink
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeStop(threading.Event):
+    # waiting advances the fake clock instead of sleeping
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def wait(self, timeout=None):
+        self.clock.now += timeout
+        return self.is_set()
+
+
+def test_parse_interval():
+    assert serve.parse_interval("15m") == 900
+    assert serve.parse_interval("90s") == serve.parse_interval("90") == 90
+    assert serve.parse_interval("1.5h") == 5400
+    for bad in ("", "0m", "15x", "-1"):
+        with pytest.raises(ValueError):
+            serve.parse_interval(bad)
+
+
+def test_serve_keeps_a_fixed_grid_with_jitter_and_survives_failures():
+    clock = FakeClock()
+    stop = FakeStop(clock)
+    starts = []
+
+    def job():
+        starts.append(clock.now)
+        if len(starts) == 2:
+            clock.now += 250  # a slow run overruns the next two slots
+            raise RuntimeError("boom")
+        clock.now += 10
+
+    runs = serve.serve(job, 100, jitter=0.1, stop=stop, max_runs=4, clock=clock, rng=lambda: 0.5)
+    assert runs == 4
+    assert starts == [0.0, 105.0, 405.0, 505.0]
+
+
+def test_serve_stops_between_runs():
+    clock = FakeClock()
+    stop = FakeStop(clock)
+    calls = []
+
+    def job():
+        calls.append(clock.now)
+        if len(calls) == 2:
+            stop.set()
+
+    assert serve.serve(job, 60, jitter=0, stop=stop, clock=clock) == 2
+
+
+def test_sigterm_sets_stop_and_restores_the_handler():
+    before = signal.getsignal(signal.SIGTERM)
+    with serve.stop_on_signals(threading.Event()) as stop:
+        os.kill(os.getpid(), signal.SIGTERM)
+        assert stop.wait(5)
+    assert signal.getsignal(signal.SIGTERM) is before
+
+
+def test_serve_mode_exports_until_sigterm(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    timer = threading.Timer(0.5, os.kill, (os.getpid(), signal.SIGTERM))
+    timer.start()
+    try:
+        run.main(["--mock", "--categories", "testcat", "--n", "2", "--every", "0.1s", "--jitter", "0"])
+    finally:
+        timer.cancel()
+    runs = capsys.readouterr().out.count("Wrote:")
+    assert runs >= 2
+    assert sorted(os.listdir("out")) == ["manifest.json", "top_videos.csv", "top_videos.xlsx", "youtube_top_videos_last_7_US.csv"]
+
+
+def test_outputs_are_replaced_atomically(tmp_path):
+    path = str(tmp_path / "rows.csv")
+    exporter.write_csv(path, [{"title": "old"}])
+    old = open(path, encoding="utf-8").read()
+
+    sink = open_sink(path, exporter.RAW_HEADERS, atomic=True)
+    sink.write({"title": "new"})
+    assert open(path, encoding="utf-8").read() == old
+    sink.close()
+    assert "new" in open(path, encoding="utf-8").read()
+
+    def failing():
+        yield {"title": "partial"}
+        raise RuntimeError("fetch failed")
+
+    with pytest.raises(RuntimeError):
+        exporter.write_csv(path, failing())
+    assert "new" in open(path, encoding="utf-8").read()
+    assert os.listdir(tmp_path) == ["rows.csv"]
+
+
+def test_failed_export_keeps_previous_outputs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    exporter.fetch_and_export("a", 2, "US", 7, mock=True)
+    before = open(os.path.join("out", "top_videos.csv"), encoding="utf-8").read()
+
+    def broken(category, n):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(exporter, "_mock_videos", broken)
+    with pytest.raises(RuntimeError):
+        exporter.fetch_and_export("a", 2, "US", 7, mock=True)
+    assert open(os.path.join("out", "top_videos.csv"), encoding="utf-8").read() == before
+    assert not [f for f in os.listdir("out") if f.startswith(".tmp-")]
+
+
+def test_category_cache_is_reused_across_runs(fake_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = {}
+    for _ in range(2):
+        exporter.fetch_and_export("music", 2, "US", 7, api_key="k", category_cache=cache)
+    paths = [path for path, _ in fake_api.requests]
+    assert sum(p.endswith("/videoCategories") for p in paths) == 1
+    assert sum(p.endswith("/videos") for p in paths) == 2
@@ -0,0 +1,34 @@
+import os
+import pathlib
+import subprocess
+import sys
+
+from yt_top.bench import _importtime
+
+ROOT = str(pathlib.Path(__file__).resolve().parents[1])
+# generous for slow CI machines; importing yt_top.run took ~145 ms before the
+# heavy imports were deferred and ~40 ms after
+IMPORT_BUDGET_SECONDS = 0.1
+# modules a --mock run must never load
+HEAVY = ("requests", "urllib3", "dotenv", "openpyxl", "pyarrow", "xml.sax", "email.utils")
+
+
+def _python(args, cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable] + args, cwd=cwd, env=env, check=True, capture_output=True, text=True)
+
+
+def test_mock_run_skips_heavy_imports(tmp_path):
+    code = (
+        "import sys; from yt_top import run; run.main(['--mock', '--categories', 'music', '--n', '3']); "
+        f"print([m for m in {HEAVY!r} if m in sys.modules])"
+    )
+    out = _python(["-c", code], tmp_path).stdout.splitlines()
+    assert out[-1] == "[]"
+    assert (tmp_path / "out" / "top_videos.xlsx").exists()
+
+
+def test_import_time_budget(tmp_path):
+    # best of three fresh interpreters to ride out scheduling noise
+    best = min(_importtime(_python(["-X", "importtime", "-c", "import yt_top.run"], tmp_path).stderr)["yt_top.run"] for _ in range(3))
+    assert best / 1e6 < IMPORT_BUDGET_SECONDS
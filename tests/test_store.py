@@ -0,0 +1,81 @@
+import csv
+import sqlite3
+import time
+
+import pytest
+
+from yt_top import exporter, run
+from yt_top import store as store_mod
+from yt_top.store import HistoryStore
+
+
+def test_snapshots_aggregate_over_the_window(tmp_path):
+    now = time.time()
+    with HistoryStore(str(tmp_path / "h.sqlite3"), batch_rows=2) as store:
+        for hours_ago, views, rank in ((30 * 24, 10, 1), (2, 100, 3), (1, 400, 2)):
+            list(store.recording([{"region": "US", "category": "10", "rank": rank, "video_id": "a", "views": views, "title": f"A{hours_ago}"}], now - hours_ago * 3600))
+        list(store.recording([{"region": "GB", "category": "10", "rank": 1, "video_id": "a", "views": 5}], now - 3600))
+
+        (row,) = store.top_videos(1, regions=["US"], now=now)
+
+    assert (row["best_rank"], row["max_views"], row["snapshots"], row["title"]) == (2, 400, 2, "A1")
+    assert row["views_per_hour"] == pytest.approx(300.0, rel=0.01)
+
+
+def test_failed_run_rolls_back_its_snapshot(tmp_path):
+    path = str(tmp_path / "h.sqlite3")
+    with pytest.raises(RuntimeError):
+        with HistoryStore(path, batch_rows=1) as store:
+            store.add({"region": "US", "category": "10", "rank": 1, "video_id": "a"}, 1)
+            store.add({"region": "US", "category": "10", "rank": 2, "video_id": "b"}, 1)
+            raise RuntimeError("boom")
+
+    db = sqlite3.connect(path)
+    assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert db.execute("SELECT COUNT(*) FROM chart_entries").fetchone()[0] == 0
+    indexes = {r[1] for r in db.execute("PRAGMA index_list(chart_entries)")}
+    assert indexes == {"chart_entries_chart", "chart_entries_video"}
+
+
+def test_from_history_answers_without_api_calls(fake_api, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    db = str(tmp_path / "h.sqlite3")
+    hour_ago = time.time() - 3600
+    with monkeypatch.context() as m:
+        m.setattr(store_mod.time, "time", lambda: hour_ago)
+        exporter.fetch_and_export("10,20", 2, "US", 7, api_key="k", history_db=db)
+    fake_api.views["v20x1"] = 50_000
+    exporter.fetch_and_export("10,20", 2, "US", 7, api_key="k", history_db=db)
+    requests_before = len(fake_api.requests)
+
+    monkeypatch.delenv("YOUTUBE_API_KEY", raising=False)
+    run.main(["--from-history", "--days", "3", "--categories", "20", "--history-db", db, "--format", "csv"])
+
+    assert len(fake_api.requests) == requests_before
+    assert "top_videos_last_3d.csv" in capsys.readouterr().out
+    with open("out/top_videos_last_3d.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [(r["video_id"], r["max_views"], r["snapshots"]) for r in rows] == [("v20x1", "50000", "2"), ("v20x2", "2000", "2")]
+    assert float(rows[0]["views_per_hour"]) == pytest.approx(49_000, rel=0.01)
+
+
+def test_from_history_resolves_category_names(fake_api, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    db = str(tmp_path / "h.sqlite3")
+    exporter.fetch_and_export("10,20", 2, "US", 7, api_key="k", history_db=db)
+
+    by_id = exporter.export_history(3, "US", "10", db, formats=["csv"])
+    with open(by_id[0], newline="", encoding="utf-8") as f:
+        expected = list(csv.DictReader(f))
+    assert len(expected) == 2
+    for categories in ("Music", "music", "10,MUSIC"):
+        with open(exporter.export_history(3, "US", categories, db, formats=["csv"])[0], newline="", encoding="utf-8") as f:
+            assert list(csv.DictReader(f)) == expected
+
+    with pytest.raises(ValueError, match="nonsense"):
+        exporter.export_history(3, "US", "music,nonsense", db, formats=["csv"])
+    monkeypatch.delenv("YOUTUBE_API_KEY", raising=False)
+    with pytest.raises(SystemExit) as exc:
+        run.main(["--from-history", "--categories", "nonsense", "--history-db", db])
+    assert exc.value.code == 2
+    assert "unknown categories" in capsys.readouterr().err
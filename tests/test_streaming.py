@@ -0,0 +1,15 @@
+from yt_top import bench
+
+
+def test_streaming_pipeline_memory_stays_flat():
+    results = bench.bench_memory(rows=20000, per_category=500)
+
+    streaming = results["streaming"]
+    currents = [current for _, current in streaming["samples"]]
+    assert len(currents) == 10
+    # heap use must not grow with the number of rows written
+    assert max(currents) < 2 * min(currents)
+    assert streaming["peak_bytes"] * 5 < results["materialized"]["peak_bytes"]
+    # the baseline's heap grows with every chart it holds
+    materialized = [current for _, current in results["materialized"]["samples"]]
+    assert materialized == sorted(materialized) and materialized[-1] > 5 * materialized[0]
@@ -0,0 +1,90 @@
+import csv
+import zipfile
+
+import pytest
+
+from yt_top import exporter, verifier
+
+
+def _rows(n):
+    for i in range(1, n + 1):
+        yield {
+            "category": str(10 + i % 3),
+            "rank": i,
+            "title": f"Title {i}\r\nsecond line" if i == 2 else f"Title {i}",
+            "channel": None if i == 3 else f"Channel {i % 7}",
+            "views": 1000 + i,
+            "url": f"https://www.youtube.com/watch?v=vid{i}",
+            "published_at": "2024-01-01T00:00:00Z",
+        }
+
+
+@pytest.mark.parametrize("engine", ["builtin", "openpyxl"])
+def test_verify_all_passes_for_matching_exports(tmp_path, engine):
+    if engine == "openpyxl":
+        pytest.importorskip("openpyxl")
+    csvp, xlsxp = str(tmp_path / "a.csv"), str(tmp_path / "a.xlsx")
+    exporter.write_csv(csvp, _rows(2500))
+    exporter.write_xlsx(xlsxp, _rows(2500), engine=engine)
+
+    report = verifier.verify_all(csvp, xlsxp)
+    assert report, str(report)
+    assert report.rows == {"csv": 2500, "xlsx": 2500}
+    assert report.checksums["csv"] == report.checksums["xlsx"]
+
+
+def test_bad_url_is_reported_with_its_row(tmp_path):
+    rows = list(_rows(5))
+    rows[2]["url"] = "not a url"
+    csvp = str(tmp_path / "a.csv")
+    exporter.write_csv(csvp, rows)
+
+    report = verifier.verify_csv(csvp)
+    assert not report
+    assert report.failed_rows == [4]
+    assert "not a URL" in str(report)
+
+
+def test_missing_hyperlink_is_reported(tmp_path):
+    xlsxp = tmp_path / "a.xlsx"
+    exporter.write_xlsx(str(xlsxp), _rows(3))
+    broken = tmp_path / "broken.xlsx"
+    with zipfile.ZipFile(xlsxp) as src, zipfile.ZipFile(broken, "w") as dst:
+        for item in src.infolist():
+            data = src.read(item)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                # drop the hyperlink of row 3
+                text = data.decode("utf-8")
+                start = text.index('<hyperlink ref="F3"')
+                data = (text[:start] + text[text.index("/>", start) + 2:]).encode("utf-8")
+            dst.writestr(item, data)
+
+    report = verifier.verify_xlsx(str(broken))
+    assert not report
+    assert report.failed_rows == [3]
+
+
+def test_verify_all_detects_diverging_files(tmp_path):
+    csvp, xlsxp = tmp_path / "a.csv", str(tmp_path / "a.xlsx")
+    exporter.write_csv(str(csvp), _rows(10))
+    exporter.write_xlsx(xlsxp, _rows(10))
+    with open(csvp, newline="", encoding="utf-8") as f:
+        data = list(csv.reader(f))
+    data[5][4] = "1"
+    data.append(data[-1])
+    with open(csvp, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(data)
+
+    report = verifier.verify_all(str(csvp), xlsxp)
+    assert not report
+    assert report.failed_rows == [6]
+    assert "column 5" in str(report)
+    assert "row counts differ: csv 11, xlsx 10" in str(report)
+
+
+def test_main_exit_codes(tmp_path, capsys):
+    csvp = str(tmp_path / "a.csv")
+    exporter.write_csv(csvp, _rows(2))
+    assert verifier.main([csvp]) == 0
+    assert capsys.readouterr().out.startswith("OK")
+    assert verifier.main([]) == 2
@@ -0,0 +1,122 @@
+import zipfile
+
+import pytest
+
+from yt_top import exporter
+from yt_top.sinks import XlsxSink
+from yt_top.xlsx import StreamingXlsxWriter
+
+
+def _rows(n):
+    return [
+        {
+            "category": "10",
+            "rank": i,
+            "title": f"Title {i} <&> \x0b",
+            "channel": f"Channel {i % 2}" if i > 1 else None,
+            "views": 1000 * i,
+            "url": f"https://www.youtube.com/watch?v=v{i}&t=1",
+            "published_at": "2024-01-01T00:00:00Z",
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def test_streaming_writer_output_reads_back(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = str(tmp_path / "out.xlsx")
+    # tiny chunks so rows and hyperlinks cross several flushes
+    with StreamingXlsxWriter(path, exporter.RAW_HEADERS, chunk_rows=3) as w:
+        for r in _rows(10):
+            w.write(r)
+
+    ws = openpyxl.load_workbook(path).active
+    assert [c.value for c in ws[1]] == exporter.RAW_HEADERS
+    assert [c.value for c in ws[11]] == ["10", 10, "Title 10 <&> ", "Channel 0", 10000, "https://www.youtube.com/watch?v=v10&t=1", "2024-01-01T00:00:00Z"]
+    # an empty cell must not shift the cells after it
+    assert [c.value for c in ws[2]][3:5] == [None, 1000]
+    assert all(ws.cell(row=r, column=6).hyperlink.target.endswith(f"v{r - 1}&t=1") for r in range(2, 12))
+
+    with zipfile.ZipFile(path) as z:
+        sst = z.read("xl/sharedStrings.xml").decode("utf-8")
+    # category and channel are stored once each in the shared strings table
+    assert 'uniqueCount="3"' in sst and 'count="19"' in sst
+
+
+def test_streaming_writer_handles_emptied_text_and_non_ascii_digits(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = str(tmp_path / "out.xlsx")
+    row = dict(_rows(1)[0], title="\x0b\x01", views="2\u00b2")
+    with StreamingXlsxWriter(path, exporter.RAW_HEADERS) as w:
+        w.write(row)
+
+    ws = openpyxl.load_workbook(path).active
+    # a title of only illegal characters is an empty string, a superscript digit stays text
+    assert [c.value for c in ws[2]][2:5] == ["", None, "2\u00b2"]
+
+
+@pytest.mark.parametrize("engine", ["builtin", "openpyxl"])
+def test_xlsx_sink_engines_hyperlink_urls(tmp_path, engine):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = str(tmp_path / f"{engine}.xlsx")
+    with XlsxSink(path, exporter.RAW_HEADERS, engine=engine) as sink:
+        for r in _rows(3):
+            sink.write(r)
+
+    ws = openpyxl.load_workbook(path).active
+    assert ws.max_row == 4
+    assert ws["F4"].hyperlink.target == "https://www.youtube.com/watch?v=v3&t=1"
+
+
+@pytest.mark.parametrize("engine", ["builtin", "openpyxl"])
+def test_split_workbook_has_summary_and_sheet_per_category(tmp_path, engine):
+    openpyxl = pytest.importorskip("openpyxl")
+    from yt_top import verifier
+
+    rows = _rows(9)
+    for r in rows:
+        r["category"] = ["10", "20", "music/live"][r["rank"] % 3]
+    titles = {"10": "Music", "20": "music"}
+    path, csv_path = str(tmp_path / "out.xlsx"), str(tmp_path / "out.csv")
+    sink = XlsxSink(path, exporter.RAW_HEADERS, engine=engine, sheets="category", sheet_title=lambda c: titles.get(c, c))
+    for r in rows:
+        sink.write(r)
+    sink.close()
+    exporter.write_csv(csv_path, rows)
+
+    wb = openpyxl.load_workbook(path)
+    assert wb.sheetnames == ["Summary", "music", "music live", "Music (2)"]
+    summary = [[c.value for c in row] for row in wb["Summary"].iter_rows()]
+    assert summary[0] == ["sheet", "videos", "total_views", "average_views", "top_video", "top_video_views"]
+    assert summary[2][:4] == ["music live", 3, 15000, 5000]
+    assert summary[-1][:3] == ["Total", 9, 45000]
+    ws = wb["Music (2)"]
+    assert [c.value for c in ws[1]] == exporter.RAW_HEADERS
+    assert ws.max_row == 4 and ws.cell(row=2, column=6).hyperlink.target.endswith("v3&t=1")
+
+    with zipfile.ZipFile(path) as z:
+        types = z.read("[Content_Types].xml").decode("utf-8")
+    assert all(f"/xl/worksheets/sheet{i}.xml" in types for i in range(1, 5))
+    report = verifier.verify_all(csv_path, path)
+    assert report, str(report)
+    assert report.rows == {"csv": 9, "xlsx": 9}
+
+
+def test_split_workbook_summary_mismatch_is_reported(tmp_path):
+    from yt_top import verifier
+
+    path = tmp_path / "out.xlsx"
+    with StreamingXlsxWriter(str(path), exporter.RAW_HEADERS, split_by="channel") as w:
+        for r in _rows(4):
+            w.write(r)
+    broken = tmp_path / "broken.xlsx"
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(broken, "w") as dst:
+        for item in src.infolist():
+            data = src.read(item)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                data = data.replace(b"<c><v>4</v></c>", b"<c><v>5</v></c>", 1)
+            dst.writestr(item, data)
+
+    assert verifier.verify_xlsx(str(path))
+    report = verifier.verify_xlsx(str(broken))
+    assert "Total has 5 videos, the sheet has 4 rows" in str(report)
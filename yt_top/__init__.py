@@ -1 +1 @@
-__all__ = ["run", "exporter", "verifier"]
+__all__ = ["run", "exporter", "verifier", "client", "cache", "checkpoint", "convert", "categories", "incremental", "lang", "manifest", "metrics", "quota", "refresh", "rows", "serve", "sinks", "store", "xlsx", "bench", "fakeapi", "synthetic"]
@@ -0,0 +1,220 @@
+import asyncio
+import importlib.util
+import os
+import random
+import threading
+from collections import deque
+
+from .client import DEFAULT_BASE_URL, RETRY_STATUSES, _retry_after
+from .exporter import PAGE_SIZE, _video_row
+from .metrics import get_metrics
+
+DEFAULT_MAX_IN_FLIGHT = 64
+# API error reasons that every later request would hit as well
+FATAL_REASONS = frozenset(
+    {"keyInvalid", "keyExpired", "quotaExceeded", "dailyLimitExceeded", "accessNotConfigured", "ipRefererBlocked"}
+)
+
+
+class FatalAPIError(RuntimeError):
+    """The API rejected the key or the project's quota: retrying or skipping to
+    the next chart cannot help, so the whole fetch stops."""
+
+
+def available() -> bool:
+    return importlib.util.find_spec("httpx") is not None
+
+
+def _error_reason(resp) -> str:
+    try:
+        errors = resp.json().get("error", {}).get("errors") or [{}]
+    except ValueError:
+        return ""
+    return errors[0].get("reason") or ""
+
+
+class AsyncYouTubeClient:
+    """asyncio YouTube Data API client on the optional httpx package.
+
+    It runs its own event loop on a background thread, so it drops into
+    the sync code paths: `get_json` blocks like `YouTubeClient.get_json`,
+    while `ordered_map` runs many chart fetches on the loop at once.
+    Requests share one `httpx.AsyncClient`, which multiplexes them over a
+    few HTTP/2 connections when the `h2` package is installed (HTTP/1.1
+    keep-alive otherwise). `max_in_flight` is a global semaphore on
+    concurrent requests. The connection pool holds `pool_size` connections,
+    by default 4 with HTTP/2 and `max_in_flight` without it, since each
+    HTTP/1.1 connection carries one request at a time.
+
+    Caching, retries with backoff and `Retry-After`, quota charging and
+    metrics behave as in `client.YouTubeClient`. A response whose error
+    reason is in `FATAL_REASONS`, or a 401, raises `FatalAPIError`.
+    """
+
+    is_async = True
+
+    def __init__(
+        self,
+        base_url: str = None,
+        pool_size: int = None,
+        max_retries: int = 4,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        timeout: float = 10,
+        cache=None,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        scheduler=None,
+        http2: bool = None,
+    ):
+        try:
+            import httpx
+        except ImportError:
+            raise RuntimeError("the async backend requires the httpx package") from None
+        self.base_url = (base_url or os.getenv("YOUTUBE_API_BASE") or DEFAULT_BASE_URL).rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cache = cache
+        self.scheduler = scheduler
+        self.max_in_flight = max_in_flight or DEFAULT_MAX_IN_FLIGHT
+        self.http2 = importlib.util.find_spec("h2") is not None if http2 is None else http2
+        if pool_size is None:
+            pool_size = 4 if self.http2 else self.max_in_flight
+        self._transient_errors = (httpx.TransportError,)
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="yt_top-aio", daemon=True)
+        self._thread.start()
+
+        async def open_session():
+            limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            return httpx.AsyncClient(http2=self.http2, limits=limits, timeout=timeout)
+
+        self.session = self.submit(open_session()).result()
+
+    def submit(self, coro):
+        """Schedule `coro` on the client's loop; returns a `concurrent.futures.Future`.
+
+        Never wait on the result from a coroutine running on that loop."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def get_json(self, endpoint: str, params: dict, use_cache: bool = True) -> dict:
+        return self.submit(self.aget_json(endpoint, params, use_cache)).result()
+
+    def ordered_map(self, fn, items, window: int):
+        """Run the coroutines `fn(item)` on the loop, at most `window` ahead of the
+        consumer, and yield their results in order.
+
+        When one raises, or the consumer stops early, the outstanding ones
+        are cancelled along with their requests.
+        """
+        pending = deque()
+        try:
+            for it in items:
+                pending.append(self.submit(fn(it)))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def aget_json(self, endpoint: str, params: dict, use_cache: bool = True) -> dict:
+        """GET `{base_url}/{endpoint}` and return the decoded JSON body,
+        bypassing the response cache unless `use_cache`."""
+        cache = self.cache if use_cache else None
+        entry = None
+        headers = None
+        metrics = get_metrics()
+        # the response cache and the quota state are files: keep their I/O off the loop
+        if cache is not None:
+            entry = await asyncio.to_thread(cache.get, endpoint, params)
+            if entry is not None:
+                if cache.is_fresh(endpoint, entry):
+                    metrics.inc("cache_lookups_total", endpoint=endpoint, result="hit")
+                    return entry["body"]
+                if entry.get("etag"):
+                    headers = {"If-None-Match": entry["etag"]}
+
+        resp = await self._request(endpoint, params, headers)
+        if resp.status_code == 304 and entry is not None:
+            metrics.inc("cache_lookups_total", endpoint=endpoint, result="revalidated")
+            await asyncio.to_thread(cache.revalidated, endpoint, params, entry)
+            return entry["body"]
+        if cache is not None:
+            metrics.inc("cache_lookups_total", endpoint=endpoint, result="miss")
+        if resp.status_code == 401 or resp.status_code in (400, 403) and _error_reason(resp) in FATAL_REASONS:
+            raise FatalAPIError(f"{endpoint}: HTTP {resp.status_code} {_error_reason(resp) or 'unauthorized'}")
+        resp.raise_for_status()
+        body = resp.json()
+        if cache is not None:
+            await asyncio.to_thread(cache.put, endpoint, params, body, resp.headers.get("ETag"))
+        return body
+
+    async def _request(self, endpoint: str, params: dict, headers: dict = None):
+        url = f"{self.base_url}/{endpoint}"
+        metrics = get_metrics()
+        attempt = 0
+        while True:
+            if self.scheduler is not None:
+                # saves the quota state and may sleep for the rate limit
+                await asyncio.to_thread(self.scheduler.acquire, endpoint)
+            if attempt:
+                metrics.inc("http_retries_total", endpoint=endpoint)
+            try:
+                async with self._in_flight:
+                    with metrics.timer("http_request_seconds", endpoint=endpoint):
+                        resp = await self.session.get(url, params=params, headers=headers)
+            except self._transient_errors:
+                metrics.inc("http_responses_total", endpoint=endpoint, status="error")
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff_delay(attempt))
+                attempt += 1
+                continue
+            metrics.inc("http_responses_total", endpoint=endpoint, status=resp.status_code)
+            if resp.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = _retry_after(resp)
+                await asyncio.sleep(self._backoff_delay(attempt) if delay is None else min(delay, self.max_backoff))
+                attempt += 1
+                continue
+            return resp
+
+    def _backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self.submit(self.session.aclose()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+async def fetch_videos_for_category(client: AsyncYouTubeClient, category: str, n: int, region: str, api_key: str) -> list:
+    """Async `exporter.fetch_videos_for_category`: up to `n` chart rows, page by page."""
+    params = {
+        "part": "snippet,statistics",
+        "chart": "mostPopular",
+        "regionCode": region,
+        "key": api_key,
+    }
+    if category and category.isdigit():
+        params["videoCategoryId"] = category
+    rows = []
+    token = None
+    while len(rows) < n:
+        page_params = dict(params, maxResults=min(PAGE_SIZE, n - len(rows)))
+        if token:
+            page_params["pageToken"] = token
+        data = await client.aget_json("videos", page_params)
+        items = data.get("items", [])[: n - len(rows)]
+        for it in items:
+            rows.append(_video_row(category, len(rows) + 1, it))
+        token = data.get("nextPageToken")
+        if not token or not items:
+            break
+    return rows
+
@@ -0,0 +1,755 @@
+import argparse
+import csv
+import importlib.util
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from xml.sax.saxutils import escape
+
+from . import exporter, verifier
+from .categories import CategoryIndex
+from .client import YouTubeClient
+from .fakeapi import FakeYouTube
+from .lang import detect_langs
+from .sinks import FORMATS, CsvSink, XlsxSink, _open_text, format_available, open_sink
+from .synthetic import REGIONS, SyntheticCharts
+
+
+def _legacy_export(categories: str, n: int, lang: str, days: int, mock: bool = True):
+    # the build-every-list fetch_and_export the streaming pipeline replaced, kept as a baseline
+    index = CategoryIndex()
+    all_rows = []
+    for c in categories.split(","):
+        all_rows.extend(exporter._mock_videos(c, n))
+    out_csv = os.path.join("out", "top_videos.csv")
+    out_xlsx = os.path.join("out", "top_videos.xlsx")
+    exporter.write_csv(out_csv, all_rows)
+    exporter.write_xlsx(out_xlsx, all_rows)
+    enriched = [_legacy_enrich_row(r, index) for r in all_rows]
+    filtered = [e for e in enriched if exporter._lang_allowed(e["language"], e["language_confidence"])]
+    enriched_csv = os.path.join("out", exporter.OUTPUT_CSV_DEFAULT.format(days=days, lang=lang))
+    exporter.write_enriched_csv(enriched_csv, filtered)
+    return out_csv, out_xlsx, enriched_csv
+
+
+MEMORY_MODES = {"streaming": exporter.fetch_and_export, "materialized": _legacy_export}
+
+
+def bench_memory(rows: int = 1_000_000, per_category: int = 1000):
+    """Trace Python heap use of a `--mock` export of `rows` rows.
+
+    "streaming" runs `exporter.fetch_and_export`, "materialized" the
+    baseline that built every row list before writing. The heap is sampled
+    as each of about ten charts is fetched. Returns {mode: {"seconds",
+    "peak_bytes", "samples"}}.
+    """
+    n_cats = max(1, rows // per_category)
+    categories = ",".join(f"cat{i}" for i in range(n_cats))
+    step = max(1, n_cats // 10)
+    mock_videos = exporter._mock_videos
+    results = {}
+    for mode, export in MEMORY_MODES.items():
+        samples = []
+        fetched = 0
+
+        def sampled(category, n):
+            nonlocal fetched
+            chart = mock_videos(category, n)
+            fetched += 1
+            if fetched % step == 0:
+                samples.append((fetched * n, tracemalloc.get_traced_memory()[0]))
+            return chart
+
+        cwd = os.getcwd()
+        exporter._mock_videos = sampled
+        try:
+            with tempfile.TemporaryDirectory() as d:
+                # both write to out/ under the working directory
+                os.chdir(d)
+                tracemalloc.start()
+                start = time.perf_counter()
+                export(categories, per_category, "US", 7, mock=True)
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            os.chdir(cwd)
+            exporter._mock_videos = mock_videos
+        results[mode] = {"seconds": elapsed, "peak_bytes": peak, "samples": samples}
+    return results
+
+
+def _print_memory(results):
+    for mode, r in results.items():
+        print(f"{mode:>13}: {r['seconds']:.1f}s, peak {r['peak_bytes'] / 2**20:.1f} MiB")
+        for i, current in r["samples"]:
+            print(f"{'':>15}{i:>10} rows  {current / 2**20:8.1f} MiB")
+
+
+def _xlsx_rows(rows: int):
+    for i in range(1, rows + 1):
+        cat = str(i % 15)
+        yield {
+            "category": cat,
+            "rank": i % 200 + 1,
+            "title": f"Video {i} <live> & more",
+            "channel": f"Channel {i % 500}",
+            "views": i * 37,
+            "url": f"https://www.youtube.com/watch?v=v{i:09d}",
+            "published_at": "2024-01-01T00:00:00Z",
+        }
+
+
+def _legacy_minimal(path: str, rows):
+    # the string-concatenation builder this benchmark replaced, kept as a baseline
+    headers = exporter.RAW_HEADERS
+
+    def cell_xml(col, row_idx, value):
+        v = "" if value is None else escape(str(value))
+        return f'<c r="{col}{row_idx}" t="inlineStr"><is><t>{v}</t></is></c>'
+
+    cols = [chr(65 + i) for i in range(len(headers))]
+    rows_xml = ['<row r="1">' + "".join(cell_xml(c, 1, h) for c, h in zip(cols, headers)) + "</row>"]
+    hyperlinks = []
+    for ridx, r in enumerate(rows, start=2):
+        cells = []
+        for col, h in zip(cols, headers):
+            val = r.get(h, "")
+            cells.append(cell_xml(col, ridx, val))
+            if h == "url":
+                hyperlinks.append((f"{col}{ridx}", val))
+        rows_xml.append(f'<row r="{ridx}">{"".join(cells)}</row>')
+    links = "".join(f'<hyperlink ref="{c}" r:id="rId{i + 1}"/>' for i, (c, _) in enumerate(hyperlinks))
+    sheet_xml = f"<worksheet><sheetData>{''.join(rows_xml)}</sheetData><hyperlinks>{links}</hyperlinks></worksheet>"
+    rels = "".join(f'<Relationship Id="rId{i + 1}" Target="{escape(t)}"/>' for i, (_, t) in enumerate(hyperlinks))
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        z.writestr("xl/worksheets/sheet1.xml", sheet_xml)
+        z.writestr("xl/worksheets/_rels/sheet1.xml.rels", f"<Relationships>{rels}</Relationships>")
+
+
+def _legacy_openpyxl(path: str, rows):
+    # openpyxl's default (non write-only) workbook with a ws.cell lookup per row
+    from openpyxl import Workbook
+    from openpyxl.styles import Font
+
+    wb = Workbook()
+    ws = wb.active
+    headers = exporter.RAW_HEADERS
+    ws.append(headers)
+    url_idx = headers.index("url") + 1
+    for r in rows:
+        ws.append([r.get(h) for h in headers])
+        url_cell = ws.cell(row=ws.max_row, column=url_idx)
+        url_cell.hyperlink = r["url"]
+        url_cell.font = Font(color="0000FF", underline="single")
+    wb.save(path)
+
+
+def _sink_writer(engine):
+    def write(path, rows):
+        with XlsxSink(path, exporter.RAW_HEADERS, engine=engine) as sink:
+            for r in rows:
+                sink.write(r)
+
+    return write
+
+
+XLSX_ENGINES = {
+    "builtin": _sink_writer("builtin"),
+    "openpyxl-write-only": _sink_writer("openpyxl"),
+    "legacy-minimal": _legacy_minimal,
+    "legacy-openpyxl": _legacy_openpyxl,
+}
+
+
+# ws.max_row is recomputed from every stored cell, so the legacy openpyxl path is
+# quadratic; cap it so the benchmark finishes
+LEGACY_OPENPYXL_MAX_ROWS = 20_000
+
+
+def _xlsx_child(engine: str, rows: int, queue):
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "bench.xlsx")
+        start = time.perf_counter()
+        XLSX_ENGINES[engine](path, _xlsx_rows(rows))
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+    # ru_maxrss is KiB on Linux
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, size))
+
+
+def bench_xlsx(rows: int = 200_000, engines=None):
+    """Time each XLSX engine in a fresh interpreter.
+
+    Returns {engine: {"rows", "rows_per_sec", "peak_rss_bytes", "file_bytes"}}.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for engine in engines or XLSX_ENGINES:
+        n = min(rows, LEGACY_OPENPYXL_MAX_ROWS) if engine == "legacy-openpyxl" else rows
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_xlsx_child, args=(engine, n, queue))
+        proc.start()
+        elapsed, rss, size = queue.get()
+        proc.join()
+        results[engine] = {"rows": n, "rows_per_sec": n / elapsed, "peak_rss_bytes": rss, "file_bytes": size}
+    return results
+
+
+def _print_xlsx(results):
+    for engine, r in results.items():
+        print(
+            f"{engine:>20}: {r['rows']:>9,} rows {r['rows_per_sec']:>10,.0f} rows/s  peak RSS {r['peak_rss_bytes'] / 2**20:7.1f} MiB"
+            f"  file {r['file_bytes'] / 2**20:6.1f} MiB"
+        )
+
+
+def _read_csv(compression=None):
+    def read(path):
+        with _open_text(path, "r", compression) as f:
+            return sum(int(r["views"]) for r in csv.DictReader(f))
+
+    return read
+
+
+def _read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return sum(json.loads(line)["views"] for line in f)
+
+
+def _read_parquet(path):
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    return pc.sum(pq.read_table(path)["views"]).as_py()
+
+
+def _read_xlsx(path):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True)
+    try:
+        rows = wb.active.iter_rows(min_row=2, values_only=True)
+        return sum(r[exporter.RAW_HEADERS.index("views")] for r in rows)
+    finally:
+        wb.close()
+
+
+# format -> reader returning the sum of the typed `views` column
+FORMAT_READERS = {
+    "csv": _read_csv(),
+    "csv.gz": _read_csv("gzip"),
+    "csv.zst": _read_csv("zstd"),
+    "jsonl": _read_jsonl,
+    "parquet": _read_parquet,
+    "xlsx": _read_xlsx,
+}
+
+
+def bench_formats(rows: int = 200_000, formats=None):
+    """Write `rows` rows in each output format and read them back.
+
+    Reading sums the typed `views` column, so CSV pays for parsing text back
+    into ints. Formats whose optional package (or openpyxl, for reading XLSX)
+    is missing are skipped. Returns {format: {"write_rows_per_sec",
+    "read_rows_per_sec", "file_bytes"}}.
+    """
+    expected = sum(r["views"] for r in _xlsx_rows(rows))
+    results = {}
+    with tempfile.TemporaryDirectory() as d:
+        for fmt in formats or FORMAT_READERS:
+            if not format_available(fmt) or (fmt == "xlsx" and importlib.util.find_spec("openpyxl") is None):
+                continue
+            path = os.path.join(d, "bench" + FORMATS[fmt][0])
+            start = time.perf_counter()
+            with open_sink(path, exporter.RAW_HEADERS, fmt) as sink:
+                for r in _xlsx_rows(rows):
+                    sink.write(r)
+            written = time.perf_counter() - start
+            start = time.perf_counter()
+            total = FORMAT_READERS[fmt](path)
+            read = time.perf_counter() - start
+            assert total == expected, f"{fmt} read back {total}, expected {expected}"
+            results[fmt] = {"write_rows_per_sec": rows / written, "read_rows_per_sec": rows / read, "file_bytes": os.path.getsize(path)}
+    return results
+
+
+# videoCategories for the US region, the realistic size of a category map
+US_CATEGORIES = {
+    "1": "Film & Animation", "2": "Autos & Vehicles", "10": "Music", "15": "Pets & Animals",
+    "17": "Sports", "18": "Short Movies", "19": "Travel & Events", "20": "Gaming",
+    "21": "Videoblogging", "22": "People & Blogs", "23": "Comedy", "24": "Entertainment",
+    "25": "News & Politics", "26": "Howto & Style", "27": "Education", "28": "Science & Technology",
+    "29": "Nonprofits & Activism", "30": "Movies", "31": "Anime/Animation", "32": "Action/Adventure",
+    "33": "Classics", "34": "Comedy", "35": "Documentary", "36": "Drama", "37": "Family",
+    "38": "Foreign", "39": "Horror", "40": "Sci-Fi/Fantasy", "41": "Thriller", "42": "Shorts",
+    "43": "Shows", "44": "Trailers",
+}
+
+
+def _legacy_category_lookup(raw_cat, category_map):
+    # the per-row linear scan CategoryIndex replaced, kept as a baseline
+    raw_cat = str(raw_cat)
+    if raw_cat.isdigit():
+        return raw_cat, category_map.get(raw_cat, "")
+    for cid, title in category_map.items():
+        if title and title.lower() == raw_cat.lower():
+            return cid, raw_cat
+    return "", raw_cat
+
+
+def bench_categories(rows: int = 1_000_000):
+    """Resolve the category of `rows` synthetic rows (half ids, half names) with the
+    legacy linear scan and with CategoryIndex; return {mode: rows_per_sec}."""
+    values = list(US_CATEGORIES) + [t.upper() for t in US_CATEGORIES.values()]
+    cats = [values[i % len(values)] for i in range(rows)]
+    results = {}
+    start = time.perf_counter()
+    for c in cats:
+        _legacy_category_lookup(c, US_CATEGORIES)
+    results["legacy-scan"] = rows / (time.perf_counter() - start)
+    start = time.perf_counter()
+    index = CategoryIndex(US_CATEGORIES)
+    for c in cats:
+        index.lookup(c)
+    results["index"] = rows / (time.perf_counter() - start)
+    return results
+
+
+def _legacy_detect_lang(text: str) -> str:
+    # the per-character en/zh check detect_lang replaced, kept as a baseline
+    if not text:
+        return "en"
+    for ch in text:
+        if "\u4e00" <= ch <= "\u9fff":
+            return "zh"
+    return "en"
+
+
+SAMPLE_TITLES = [
+    "Official Music Video (4K Remastered) | Live at Wembley Stadium",
+    "Minecraft but every block is TNT - part 12",
+    "周杰倫 Jay Chou【最偉大的作品 Greatest Works of Art】Official MV",
+    "【公式】YOASOBI「アイドル」 Official Music Video",
+    "[MV] 아이유(IU) _ 좋은 날(Good Day) 뮤직비디오",
+    "Лучшие моменты матча | Обзор игры",
+    "أجمل تلاوة للقرآن الكريم بصوت هادئ",
+    "नई फिल्म का आधिकारिक ट्रेलर | Official Trailer",
+    "Café con leche — receta fácil en 5 minutos",
+]
+
+
+def bench_lang(titles: int = 1_000_000):
+    """Detect the language of `titles` titles with the legacy per-character
+    function and with detect_langs, once on a corpus cycling through every
+    sample script and once on Latin-only titles (a typical US/GB chart);
+    return {corpus: {mode: titles_per_sec}}."""
+    corpora = {"mixed": SAMPLE_TITLES, "latin": [t for t in SAMPLE_TITLES if t.isascii()]}
+    results = {}
+    for corpus, samples in corpora.items():
+        data = [f"{samples[i % len(samples)]} #{i}" for i in range(titles)]
+        rates = results[corpus] = {}
+        start = time.perf_counter()
+        for t in data:
+            _legacy_detect_lang(t)
+        rates["legacy"] = titles / (time.perf_counter() - start)
+        start = time.perf_counter()
+        detect_langs(data)
+        rates["detect_langs"] = titles / (time.perf_counter() - start)
+    return results
+
+def _legacy_video_row(category: str, rank: int, it: dict) -> dict:
+    # the per-row dicts VideoRow replaced, kept as a baseline
+    snip = it.get("snippet", {})
+    stats = it.get("statistics", {})
+    vid_id = it.get("id")
+    return {
+        "category": category,
+        "rank": rank,
+        "video_id": vid_id,
+        "title": snip.get("title"),
+        "channel": snip.get("channelTitle"),
+        "views": int(stats.get("viewCount", 0)),
+        "url": f"https://www.youtube.com/watch?v={vid_id}",
+        "published_at": snip.get("publishedAt"),
+    }
+
+
+def _legacy_enrich_row(r: dict, index: CategoryIndex) -> dict:
+    category_id, category_name = index.lookup(r.get("category", ""))
+    title = r.get("title")
+    language, confidence = exporter.detect_lang(title)
+    return {
+        "region": r.get("region"),
+        "category_id": category_id,
+        "category_name": category_name,
+        "title": title,
+        "channel": r.get("channel"),
+        "views": r.get("views"),
+        "language": language,
+        "language_confidence": confidence,
+        "published_at": r.get("published_at"),
+        "video_url": r.get("url"),
+    }
+
+
+class _LegacyCsvSink:
+    # csv.DictWriter, which looked every header up in every row dict
+    def __init__(self, path, headers):
+        self._f = open(path, "w", newline="", encoding="utf-8")
+        self._w = csv.DictWriter(self._f, fieldnames=headers, extrasaction="ignore")
+        self._w.writeheader()
+        self.write = self._w.writerow
+
+    def close(self):
+        self._f.close()
+
+
+ROW_MODES = {
+    "dicts": (_legacy_video_row, _legacy_enrich_row, _LegacyCsvSink),
+    "records": (exporter._video_row, exporter._enrich_row, CsvSink),
+}
+
+
+def _api_pages(rows: int, seed: int) -> list:
+    # JSON-encoded `videos` pages, so every decode yields fresh strings like a real response
+    charts = SyntheticCharts(seed)
+    cats = list(US_CATEGORIES)
+    pages = []
+    for start in range(0, rows, exporter.PAGE_SIZE):
+        cat = cats[start // 200 % len(cats)]
+        items = [charts.api_item(cat, start % 200 + i + 1) for i in range(min(exporter.PAGE_SIZE, rows - start))]
+        pages.append((cat, start % 200, json.dumps(items)))
+    return pages
+
+
+def bench_rows(rows: int = 200_000, seed: int = 0):
+    """Compare dict rows with `VideoRow`/`EnrichedRow` records over `rows` synthetic API items.
+
+    `bytes_per_row` is the Python heap that holding every raw and enriched
+    row takes, as a multi-region or history run that keeps them would.
+    `rows_per_sec` times building, enriching and writing each row to the raw
+    and enriched CSVs. Returns {mode: {"bytes_per_row", "rows_per_sec"}}.
+    """
+    pages = _api_pages(rows, seed)
+    results = {}
+    for mode, (to_row, enrich, sink) in ROW_MODES.items():
+        index = CategoryIndex(US_CATEGORIES)
+        # build the rows once untraced: interning a new string can resize the
+        # interpreter's intern table, one large block that swamps a small run
+        for cat, offset, page in pages:
+            for rank, it in enumerate(json.loads(page), start=offset + 1):
+                enrich(to_row(cat, rank, it), index)
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        kept = []
+        for cat, offset, page in pages:
+            for rank, it in enumerate(json.loads(page), start=offset + 1):
+                r = to_row(cat, rank, it)
+                kept.append((r, enrich(r, index)))
+        held = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del kept
+        decoded = [(cat, offset, json.loads(page)) for cat, offset, page in pages]
+        with tempfile.TemporaryDirectory() as d:
+            raw = sink(os.path.join(d, "raw.csv"), exporter.RAW_HEADERS)
+            enriched = sink(os.path.join(d, "enriched.csv"), exporter.ENRICHED_HEADERS)
+            start = time.perf_counter()
+            for cat, offset, items in decoded:
+                for rank, it in enumerate(items, start=offset + 1):
+                    r = to_row(cat, rank, it)
+                    raw.write(r)
+                    enriched.write(enrich(r, index))
+            raw.close()
+            enriched.close()
+            elapsed = time.perf_counter() - start
+        results[mode] = {"bytes_per_row": held / rows, "rows_per_sec": rows / elapsed}
+    return results
+
+
+# the fetch stage pages every chart through a local HTTP server, so it is capped
+FETCH_MAX_ROWS = 200_000
+SUITE_HEADERS = ["region"] + exporter.RAW_HEADERS
+
+
+def _stage_generate(rows: int, per_category: int, seed: int, out_dir: str) -> int:
+    return sum(1 for _ in SyntheticCharts(seed).rows(rows, per_category))
+
+
+def _stage_fetch(rows: int, per_category: int, seed: int, out_dir: str) -> int:
+    rows = min(rows, FETCH_MAX_ROWS)
+    charts = [(REGIONS[i % len(REGIONS)], str(100 + i)) for i in range(math.ceil(rows / per_category))]
+    plans = [(region, CategoryIndex(), [c for r, c in charts if r == region]) for region in REGIONS]
+    fake = FakeYouTube(videos_per_category=per_category, synthetic=SyntheticCharts(seed)).start()
+    client = YouTubeClient(base_url=fake.base_url, backoff=0)
+    try:
+        timings = exporter._RegionTimings(REGIONS)
+        return sum(1 for _ in exporter._iter_rows(plans, per_category, 7, "bench", False, client, 8, timings))
+    finally:
+        client.close()
+        fake.stop()
+
+
+def _stage_enrich(rows: int, per_category: int, seed: int, out_dir: str) -> int:
+    index = CategoryIndex(US_CATEGORIES)
+    for r in SyntheticCharts(seed).rows(rows, per_category):
+        e = exporter._enrich_row(r, index)
+        exporter._lang_allowed(e["language"], e["language_confidence"])
+    return rows
+
+
+def _stage_write(fmt: str):
+    def write(rows: int, per_category: int, seed: int, out_dir: str) -> int:
+        with open_sink(os.path.join(out_dir, "suite" + FORMATS[fmt][0]), SUITE_HEADERS, fmt) as sink:
+            for r in SyntheticCharts(seed).rows(rows, per_category):
+                sink.write(r)
+        return rows
+
+    return write
+
+
+def _stage_verify(rows: int, per_category: int, seed: int, out_dir: str) -> int:
+    report = verifier.verify_all(os.path.join(out_dir, "suite.csv"), os.path.join(out_dir, "suite.xlsx"))
+    if not report:
+        raise RuntimeError(str(report))
+    return report.rows["csv"]
+
+
+def _suite_stages():
+    stages = {"generate": _stage_generate, "fetch": _stage_fetch, "enrich": _stage_enrich}
+    stages.update((f"write:{fmt}", _stage_write(fmt)) for fmt in FORMATS if format_available(fmt))
+    # verify reads the files the csv and xlsx writers left behind
+    stages["verify"] = _stage_verify
+    return stages
+
+
+SUITE_STAGES = _suite_stages()
+
+
+def _stage_child(stage: str, args: tuple, queue):
+    try:
+        start = time.perf_counter()
+        n = SUITE_STAGES[stage](*args)
+        elapsed = time.perf_counter() - start
+        queue.put((n, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, None))
+    except Exception as e:
+        queue.put((0, 0.0, 0, f"{type(e).__name__}: {e}"))
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(__file__), capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def bench_suite(rows: int = 1_000_000, per_category: int = 200, seed: int = 0, stages=None):
+    """Time every stage of an export over `rows` synthetic rows, each in a fresh interpreter.
+
+    Stages: generating the rows alone, fetching them from the local fake API
+    (at most `FETCH_MAX_ROWS`), enrichment with language filtering, each
+    available output format, and verifying the CSV against the XLSX. Writer
+    and enrichment stages include generating their input, so subtract the
+    `generate` stage to isolate them. Returns a JSON-serializable dict with
+    the commit, interpreter and per-stage {"rows", "seconds",
+    "rows_per_sec", "peak_rss_bytes"}; compare two with `compare_results`.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "rows": rows,
+        "per_category": per_category,
+        "seed": seed,
+        "stages": {},
+    }
+    names = stages or list(SUITE_STAGES)
+    if "verify" in names:
+        # verify needs both files; write them first even when not asked for
+        names = [n for n in ("write:csv", "write:xlsx") if n not in names] + list(names)
+    with tempfile.TemporaryDirectory() as d:
+        for stage in SUITE_STAGES:
+            if stage not in names:
+                continue
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_stage_child, args=(stage, (rows, per_category, seed, d), queue))
+            proc.start()
+            n, elapsed, rss, error = queue.get()
+            proc.join()
+            if error:
+                raise RuntimeError(f"stage {stage} failed: {error}")
+            if stages and stage not in stages:
+                continue
+            results["stages"][stage] = {"rows": n, "seconds": elapsed, "rows_per_sec": n / elapsed if elapsed else 0.0, "peak_rss_bytes": rss}
+    return results
+
+
+def compare_results(base: dict, new: dict, threshold: float = 0.10):
+    """Compare two `bench_suite` results stage by stage.
+
+    Returns (lines, regressions): a printable line per stage present in both,
+    and the stages whose rows/sec dropped by more than `threshold`.
+    """
+    lines, regressions = [], []
+    lines.append(f"{'stage':>14} {'base rows/s':>13} {'new rows/s':>13} {'change':>8} {'peak RSS':>17}")
+    for stage, b in base["stages"].items():
+        n = new["stages"].get(stage)
+        if n is None:
+            continue
+        change = n["rows_per_sec"] / b["rows_per_sec"] - 1 if b["rows_per_sec"] else 0.0
+        flag = ""
+        if change < -threshold:
+            regressions.append(stage)
+            flag = "  REGRESSION"
+        rss = f"{b['peak_rss_bytes'] / 2**20:.0f} -> {n['peak_rss_bytes'] / 2**20:.0f} MiB"
+        lines.append(f"{stage:>14} {b['rows_per_sec']:>13,.0f} {n['rows_per_sec']:>13,.0f} {change:>+8.1%} {rss:>17}{flag}")
+    return lines, regressions
+
+
+def _print_suite(results):
+    print(f"commit {results['commit'] or '?'}, Python {results['python']}, {results['rows']:,} rows")
+    for stage, r in results["stages"].items():
+        print(
+            f"{stage:>14}: {r['rows']:>10,} rows {r['seconds']:8.2f}s {r['rows_per_sec']:>11,.0f} rows/s"
+            f"  peak RSS {r['peak_rss_bytes'] / 2**20:7.1f} MiB"
+        )
+
+
+STARTUP_ARGS = ["--mock", "--categories", "music", "--n", "5"]
+
+
+def _importtime(stderr: str) -> dict:
+    # cumulative microseconds per module from `python -X importtime`
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def bench_startup(runs: int = 5, top: int = 10):
+    """Wall time of `python -m yt_top.run --mock` (median of `runs` fresh
+    interpreters) plus `-X importtime` for `import yt_top.run`: its total and
+    the `top` slowest modules it pulls in beyond a bare interpreter's.
+
+    Returns {"seconds", "import_seconds", "imports": [(module, seconds)]}.
+    """
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    cmd = [sys.executable, "-m", "yt_top.run"] + STARTUP_ARGS
+    times = []
+    with tempfile.TemporaryDirectory() as d:
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(cmd, cwd=d, env=env, check=True, capture_output=True)
+            times.append(time.perf_counter() - start)
+
+    def importtime(code):
+        out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env, check=True, capture_output=True, text=True)
+        return _importtime(out.stderr)
+
+    baseline, imports = importtime("pass"), importtime("import yt_top.run")
+    ours = [(m, us / 1e6) for m, us in imports.items() if m not in baseline and not m.startswith("yt_top")]
+    return {
+        "seconds": sorted(times)[len(times) // 2],
+        "import_seconds": imports.get("yt_top.run", 0) / 1e6,
+        "imports": sorted(ours, key=lambda x: -x[1])[:top],
+    }
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="yt_top benchmarks")
+    sub = p.add_subparsers(dest="bench", required=True)
+    m = sub.add_parser("memory", help="Peak memory of the streaming row pipeline vs. materialized lists")
+    m.add_argument("--rows", type=int, default=1_000_000)
+    m.add_argument("--per-category", type=int, default=1000)
+    x = sub.add_parser("xlsx", help="Rows/sec and peak RSS of each XLSX engine")
+    x.add_argument("--rows", type=int, default=200_000)
+    x.add_argument("--engine", action="append", choices=sorted(XLSX_ENGINES), help="Engine to run (repeatable; default all)")
+    c = sub.add_parser("categories", help="Per-row category resolution: linear scan vs CategoryIndex")
+    c.add_argument("--rows", type=int, default=1_000_000)
+    f = sub.add_parser("formats", help="Write and read-back rows/sec and file size of each output format")
+    f.add_argument("--rows", type=int, default=200_000)
+    f.add_argument("--format", action="append", choices=sorted(FORMAT_READERS), help="Format to run (repeatable; default all available)")
+    lg = sub.add_parser("lang", help="Language detection: legacy per-character scan vs detect_langs")
+    lg.add_argument("--titles", type=int, default=1_000_000)
+    rw = sub.add_parser("rows", help="Bytes per row and rows/sec of dict rows vs slotted row records")
+    rw.add_argument("--rows", type=int, default=200_000)
+    rw.add_argument("--seed", type=int, default=0)
+    st = sub.add_parser("startup", help="Wall time of a --mock CLI run and its slowest imports (-X importtime)")
+    st.add_argument("--runs", type=int, default=5)
+    su = sub.add_parser("suite", help="Rows/sec and peak RSS of every export stage over synthetic data")
+    su.add_argument("--rows", type=int, default=1_000_000)
+    su.add_argument("--per-category", type=int, default=200)
+    su.add_argument("--seed", type=int, default=0)
+    su.add_argument("--stage", action="append", choices=list(SUITE_STAGES), help="Stage to run (repeatable; default all)")
+    su.add_argument("--json", help="Also write the results to this JSON file")
+    cmp = sub.add_parser("compare", help="Compare two `suite --json` results; exit 1 on a regression")
+    cmp.add_argument("base")
+    cmp.add_argument("new")
+    cmp.add_argument("--threshold", type=float, default=0.10, help="Allowed rows/sec drop per stage (default 0.10)")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.bench == "memory":
+        _print_memory(bench_memory(args.rows, args.per_category))
+    elif args.bench == "xlsx":
+        _print_xlsx(bench_xlsx(args.rows, args.engine))
+    elif args.bench == "formats":
+        for fmt, r in bench_formats(args.rows, args.format).items():
+            print(
+                f"{fmt:>8}: write {r['write_rows_per_sec']:>10,.0f} rows/s  read {r['read_rows_per_sec']:>10,.0f} rows/s"
+                f"  file {r['file_bytes'] / 2**20:6.1f} MiB"
+            )
+    elif args.bench == "categories":
+        for mode, rate in bench_categories(args.rows).items():
+            print(f"{mode:>12}: {rate:>12,.0f} rows/s")
+    elif args.bench == "lang":
+        for corpus, rates in bench_lang(args.titles).items():
+            for mode, rate in rates.items():
+                print(f"{corpus:>6} {mode:>12}: {rate:>12,.0f} titles/s")
+    elif args.bench == "rows":
+        for mode, r in bench_rows(args.rows, args.seed).items():
+            print(f"{mode:>8}: {r['bytes_per_row']:8,.0f} bytes/row  {r['rows_per_sec']:>10,.0f} rows/s")
+    elif args.bench == "startup":
+        r = bench_startup(args.runs)
+        print(f"python -m yt_top.run {' '.join(STARTUP_ARGS)}: {r['seconds'] * 1000:.0f} ms (median), yt_top.run imports {r['import_seconds'] * 1000:.0f} ms")
+        for module, seconds in r["imports"]:
+            print(f"{module:>24}: {seconds * 1000:7.1f} ms")
+    elif args.bench == "suite":
+        results = bench_suite(args.rows, args.per_category, args.seed, args.stage)
+        _print_suite(results)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+    elif args.bench == "compare":
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        lines, regressions = compare_results(base, new, args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            print(f"regressed by more than {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
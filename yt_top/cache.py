@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Seconds a cached response is served without revalidation, per endpoint.
+DEFAULT_TTLS = {
+    "videoCategories": 24 * 3600,
+    "videos": 10 * 60,
+}
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Query parameters that never take part in the cache key.
+_EXCLUDED_PARAMS = frozenset({"key"})
+
+
+def default_cache_dir() -> str:
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "yt_top")
+
+
+class ResponseCache:
+    """On-disk cache of API JSON responses with per-endpoint TTLs.
+
+    Entries are keyed by endpoint plus query params (the API key is excluded so
+    rotating keys keeps the cache warm) and store the response `ETag`, so an
+    expired entry can be revalidated with `If-None-Match` instead of being
+    refetched. Total size is capped at `max_bytes`; the least recently used
+    entries (by file mtime, bumped on every hit) are evicted first.
+    """
+
+    def __init__(self, directory: str, ttls: dict = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(os.path.getsize(p) for p in self._entry_paths())
+
+    def _entry_paths(self):
+        with os.scandir(self.directory) as it:
+            return [e.path for e in it if e.name.endswith(".json")]
+
+    def _path(self, endpoint: str, params: dict) -> str:
+        key_params = sorted((k, str(v)) for k, v in params.items() if k not in _EXCLUDED_PARAMS)
+        digest = hashlib.sha256(json.dumps([endpoint, key_params]).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{endpoint}-{digest[:32]}.json")
+
+    def get(self, endpoint: str, params: dict):
+        """Return the stored entry (`stored_at`, `etag`, `body`) or None."""
+        path = self._path(endpoint, params)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def is_fresh(self, endpoint: str, entry: dict) -> bool:
+        ttl = self.ttls.get(endpoint, 0)
+        return time.time() - entry.get("stored_at", 0) < ttl
+
+    def put(self, endpoint: str, params: dict, body, etag: str = None):
+        entry = {"stored_at": time.time(), "etag": etag, "body": body}
+        path = self._path(endpoint, params)
+        data = json.dumps(entry).encode("utf-8")
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        with self._lock:
+            try:
+                self._size -= os.path.getsize(path)
+            except OSError:
+                pass
+            os.replace(tmp, path)
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def revalidated(self, endpoint: str, params: dict, entry: dict):
+        """Mark an entry fresh again after the server answered 304 Not Modified."""
+        self.put(endpoint, params, entry["body"], entry.get("etag"))
+
+    def _evict(self):
+        entries = []
+        for path in self._entry_paths():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
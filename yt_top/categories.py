@@ -0,0 +1,92 @@
+import unicodedata
+from typing import Dict, Optional, Tuple
+
+# Common short names -> YouTube category titles. Aliases only apply when the
+# region actually has the target category.
+DEFAULT_ALIASES = {
+    "film": "Film & Animation",
+    "animation": "Film & Animation",
+    "autos": "Autos & Vehicles",
+    "cars": "Autos & Vehicles",
+    "pets": "Pets & Animals",
+    "animals": "Pets & Animals",
+    "travel": "Travel & Events",
+    "games": "Gaming",
+    "people": "People & Blogs",
+    "blogs": "People & Blogs",
+    "vlogs": "People & Blogs",
+    "news": "News & Politics",
+    "politics": "News & Politics",
+    "howto": "Howto & Style",
+    "how to": "Howto & Style",
+    "style": "Howto & Style",
+    "science": "Science & Technology",
+    "tech": "Science & Technology",
+    "technology": "Science & Technology",
+    "nonprofits": "Nonprofits & Activism",
+    "activism": "Nonprofits & Activism",
+}
+
+
+def normalize(name: str) -> str:
+    """Case-fold and NFKC-normalize a category name, collapsing whitespace."""
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+
+class CategoryIndex:
+    """Category id <-> name lookups for one region, built once per region.
+
+    Name matching is case-insensitive and Unicode-normalized, and also accepts
+    the aliases in `DEFAULT_ALIASES` (or `aliases`). `lookup` memoizes its
+    results, so resolving the category of every exported row costs one dict
+    hit instead of a scan over all categories.
+    """
+
+    def __init__(self, category_map: Dict[str, str] = None, aliases: Dict[str, str] = None):
+        self.names = dict(category_map or {})
+        self._by_name = {}
+        for cid, title in self.names.items():
+            if title:
+                self._by_name.setdefault(normalize(title), cid)
+        for alias, target in (DEFAULT_ALIASES if aliases is None else aliases).items():
+            cid = self._by_name.get(normalize(target))
+            if cid is not None:
+                self._by_name.setdefault(normalize(alias), cid)
+        self._lookups = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __bool__(self):
+        return bool(self.names)
+
+    def ids(self):
+        return list(self.names)
+
+    def name(self, cid: str) -> str:
+        return self.names.get(cid) or ""
+
+    def resolve(self, value: str) -> Optional[str]:
+        """Return the category id for an id, name or alias, or None when unknown."""
+        value = str(value).strip()
+        if value.isdigit():
+            return value
+        return self._by_name.get(normalize(value))
+
+    def lookup(self, raw_cat) -> Tuple[str, str]:
+        """Return (category_id, category_name) for a row's raw category value.
+
+        Numeric values are ids and get their title; anything else is kept as
+        the name and mapped to an id when it matches a known category.
+        """
+        try:
+            return self._lookups[raw_cat]
+        except KeyError:
+            pass
+        raw = str(raw_cat)
+        if raw.isdigit():
+            result = (raw, self.name(raw))
+        else:
+            result = (self._by_name.get(normalize(raw), ""), raw)
+        self._lookups[raw_cat] = result
+        return result
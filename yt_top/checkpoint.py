@@ -0,0 +1,99 @@
+import json
+import os
+import re
+import tempfile
+
+from .rows import video_row
+
+DEFAULT_CHECKPOINT_DIR = os.path.join("out", ".checkpoints")
+SETTINGS_NAME = "run.json"
+_UNSAFE = re.compile(r"[^\w.-]")
+_CHART = re.compile(r"[\w.-]+__[\w.-]*\.jsonl")
+
+
+class Checkpoints:
+    """Per-chart checkpoint files for a run whose outputs are not written yet.
+
+    Each fetched chart is saved to `{region}__{category}.jsonl` in
+    `directory`, one JSON array of `VideoRow` values per line. The file is
+    written under a temporary name and then renamed. A run with `resume`
+    reads saved charts back instead of fetching them again, but only if
+    `run.json` shows they were fetched with the same `settings`.
+    Otherwise, and for every fresh run, the saved charts are dropped.
+    `clear` removes them once the outputs are in place; it only deletes
+    the files it wrote, so the directory may hold other files too.
+    """
+
+    def __init__(self, directory: str, settings: dict, resume: bool = False):
+        self.directory = directory
+        self.settings = dict(settings)
+        self.resumed = 0
+        self._saved = set()
+        if resume and self._load_settings() == self.settings:
+            self._saved = {name for name in os.listdir(directory) if _CHART.fullmatch(name)}
+            return
+        self.clear()
+        os.makedirs(directory, exist_ok=True)
+        self._write(SETTINGS_NAME, json.dumps(self.settings) + "\n")
+
+    def __len__(self):
+        return len(self._saved)
+
+    def _load_settings(self):
+        try:
+            with open(os.path.join(self.directory, SETTINGS_NAME), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _name(region: str, category: str) -> str:
+        return f"{_UNSAFE.sub('_', str(region))}__{_UNSAFE.sub('_', str(category))}.jsonl"
+
+    def has(self, region: str, category: str) -> bool:
+        return self._name(region, category) in self._saved
+
+    def load(self, region: str, category: str):
+        """The saved rows of a chart, or None if it has no checkpoint."""
+        name = self._name(region, category)
+        if name not in self._saved:
+            return None
+        with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+            rows = [video_row(*json.loads(line)) for line in f]
+        self.resumed += 1
+        return rows
+
+    def save(self, region: str, category: str, rows):
+        name = self._name(region, category)
+        self._write(
+            name,
+            "".join(
+                json.dumps([r.category, r.rank, r.video_id, r.title, r.channel, r.views, r.url, r.published_at], ensure_ascii=False) + "\n"
+                for r in rows
+            ),
+        )
+        self._saved.add(name)
+
+    def _write(self, name: str, text: str):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+                f.write(text)
+            os.replace(tmp, os.path.join(self.directory, name))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def clear(self):
+        # chart files only count as checkpoints next to the run.json written with them
+        if os.path.isfile(os.path.join(self.directory, SETTINGS_NAME)):
+            for name in os.listdir(self.directory):
+                if _CHART.fullmatch(name):
+                    os.unlink(os.path.join(self.directory, name))
+            os.unlink(os.path.join(self.directory, SETTINGS_NAME))
+        self._saved = set()
+        try:
+            os.rmdir(self.directory)
+        except OSError:
+            # not empty: it holds something else as well
+            pass
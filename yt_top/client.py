@@ -0,0 +1,159 @@
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+from .metrics import get_metrics
+
+DEFAULT_BASE_URL = "https://www.googleapis.com/youtube/v3"
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class YouTubeClient:
+    """Pooled HTTP client for the YouTube Data API.
+
+    One `requests.Session` is shared by every call so connections (and their TLS
+    handshakes) are reused. Retryable responses (429/5xx) and connection errors
+    are retried with exponential backoff and full jitter; a `Retry-After` header
+    takes precedence over the computed delay.
+
+    The base URL defaults to the public API but can be overridden with
+    `base_url` or the `YOUTUBE_API_BASE` environment variable. When a
+    `ResponseCache` is given, fresh entries are served without a request and
+    stale ones are revalidated with `If-None-Match`. `max_in_flight` caps the
+    number of concurrent requests across every thread sharing the client, which
+    is the global request budget for multi-region runs. A `quota.QuotaScheduler`
+    passed as `scheduler` is charged before every request that goes out (cache
+    hits are free) and may raise `QuotaExceeded` instead.
+
+    `requests` is imported when the first client is created, so code paths
+    that never talk to the API (mock runs, conversions) do not pay for it.
+    """
+
+    def __init__(
+        self,
+        base_url: str = None,
+        pool_size: int = 16,
+        max_retries: int = 4,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        timeout: float = 10,
+        sleep=time.sleep,
+        cache=None,
+        max_in_flight: int = None,
+        scheduler=None,
+    ):
+        self.base_url = (base_url or os.getenv("YOUTUBE_API_BASE") or DEFAULT_BASE_URL).rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._sleep = sleep
+        self.cache = cache
+        self.scheduler = scheduler
+        self._in_flight = threading.BoundedSemaphore(max_in_flight) if max_in_flight else nullcontext()
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._transient_errors = (requests.ConnectionError, requests.Timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_json(self, endpoint: str, params: dict, use_cache: bool = True) -> dict:
+        """GET `{base_url}/{endpoint}` and return the decoded JSON body.
+
+        With `use_cache` false the response cache is neither read nor
+        written, for lookups that must see current values.
+        """
+        cache = self.cache if use_cache else None
+        entry = None
+        headers = None
+        metrics = get_metrics()
+        if cache is not None:
+            entry = cache.get(endpoint, params)
+            if entry is not None:
+                if cache.is_fresh(endpoint, entry):
+                    metrics.inc("cache_lookups_total", endpoint=endpoint, result="hit")
+                    return entry["body"]
+                if entry.get("etag"):
+                    headers = {"If-None-Match": entry["etag"]}
+
+        resp = self._request(endpoint, params, headers)
+        if resp.status_code == 304 and entry is not None:
+            metrics.inc("cache_lookups_total", endpoint=endpoint, result="revalidated")
+            cache.revalidated(endpoint, params, entry)
+            return entry["body"]
+        if cache is not None:
+            metrics.inc("cache_lookups_total", endpoint=endpoint, result="miss")
+        resp.raise_for_status()
+        body = resp.json()
+        if cache is not None:
+            cache.put(endpoint, params, body, resp.headers.get("ETag"))
+        return body
+
+    def _request(self, endpoint: str, params: dict, headers: dict = None):
+        url = f"{self.base_url}/{endpoint}"
+        metrics = get_metrics()
+        attempt = 0
+        while True:
+            if self.scheduler is not None:
+                self.scheduler.acquire(endpoint)
+            if attempt:
+                metrics.inc("http_retries_total", endpoint=endpoint)
+            try:
+                with self._in_flight, metrics.timer("http_request_seconds", endpoint=endpoint):
+                    resp = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except self._transient_errors:
+                metrics.inc("http_responses_total", endpoint=endpoint, status="error")
+                if attempt >= self.max_retries:
+                    raise
+                self._sleep(self._backoff_delay(attempt))
+                attempt += 1
+                continue
+            metrics.inc("http_responses_total", endpoint=endpoint, status=resp.status_code)
+            if resp.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = _retry_after(resp)
+                self._sleep(self._backoff_delay(attempt) if delay is None else min(delay, self.max_backoff))
+                attempt += 1
+                continue
+            return resp
+
+    def _backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def close(self):
+        self.session.close()
+
+
+def _retry_after(resp):
+    """Return the Retry-After delay in seconds, or None when absent/unparseable."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    from email.utils import parsedate_to_datetime
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_default_client() -> YouTubeClient:
+    """Return the process-wide shared client, creating it on first use."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = YouTubeClient()
+        return _default_client
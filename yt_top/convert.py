@@ -0,0 +1,304 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List
+
+from .manifest import DEFAULT_MANIFEST_PATH, file_sha256, load_manifest, manifest_entry
+from .sinks import DEFAULT_XLSX_ENGINE, FORMATS, READABLE_FORMATS, XLSX_ENGINES, format_for_path, open_sink, read_rows
+from .xlsx import NUMERIC_COLUMNS
+
+STATE_NAME = ".yt_top_convert.tsv"
+
+
+def expand_inputs(args: List[str]) -> List[str]:
+    """Input files named by `args`: paths, glob patterns, or directories
+    (every readable export directly inside them). Hidden files, such as
+    staged outputs, are skipped when expanding; duplicates are dropped."""
+    paths = []
+    for arg in args:
+        if os.path.isdir(arg):
+            found = sorted(
+                os.path.join(arg, name)
+                for name in os.listdir(arg)
+                if not name.startswith(".") and _readable(name) and os.path.isfile(os.path.join(arg, name))
+            )
+        elif glob.has_magic(arg):
+            found = sorted(p for p in glob.glob(arg) if _readable(p) and os.path.isfile(p))
+        else:
+            found = [arg]
+        paths.extend(found)
+    return list(dict.fromkeys(paths))
+
+
+def _readable(path: str) -> bool:
+    try:
+        return format_for_path(path) in READABLE_FORMATS
+    except ValueError:
+        return False
+
+
+def output_path(src: str, out_dir: str = None, keep_extension: bool = False) -> str:
+    """`src` with its format's extension replaced by .xlsx (or, with
+    `keep_extension`, followed by it), in `out_dir` if given."""
+    base = src if keep_extension else src[: -len(FORMATS[format_for_path(src)][0])]
+    if out_dir is not None:
+        base = os.path.join(out_dir, os.path.basename(base))
+    return base + ".xlsx"
+
+
+class Skipped(Exception):
+    """An input that is deliberately not converted; not a failure."""
+
+
+def destinations(inputs: List[str], out_dir: str = None, output: str = None) -> dict:
+    """The XLSX each input converts to: {input: path, or the exception that rules it out}.
+
+    Inputs whose XLSX the exporter wrote itself, as listed in the manifest
+    next to it, are `Skipped`, so a converted CSV never replaces the
+    exporter's workbook. Inputs that would share an XLSX (`top_videos.csv`
+    and `top_videos.jsonl`) keep their own extension in its name instead
+    (`top_videos.csv.xlsx`); any that still collide fail.
+    """
+    if output is not None and len(inputs) == 1:
+        return {inputs[0]: output}
+    dests = {}
+    manifests = {}
+    for src in inputs:
+        try:
+            dest = output_path(src, out_dir)
+        except ValueError as e:
+            dests[src] = e
+            continue
+        if _exported(dest, manifests):
+            dests[src] = Skipped(f"the exporter wrote {dest}")
+        else:
+            dests[src] = dest
+    for keep_extension in (True, False):
+        taken = {}
+        for src, dest in dests.items():
+            if isinstance(dest, str):
+                taken.setdefault(os.path.normcase(os.path.abspath(dest)), []).append(src)
+        for same in taken.values():
+            if len(same) < 2:
+                continue
+            for src in same:
+                if keep_extension:
+                    dests[src] = output_path(src, out_dir, keep_extension=True)
+                else:
+                    dests[src] = ValueError(f"{dests[src]} is also the output of {', '.join(o for o in same if o != src)}")
+    return dests
+
+
+def _exported(dest: str, manifests: dict) -> bool:
+    path = os.path.join(os.path.dirname(dest), os.path.basename(DEFAULT_MANIFEST_PATH))
+    if path not in manifests:
+        try:
+            manifests[path] = load_manifest(path)
+        except (OSError, ValueError):
+            manifests[path] = None
+    return manifests[path] is not None and manifest_entry(manifests[path], path, dest) is not None
+
+
+class ConvertState:
+    """Fingerprints of the inputs behind the XLSX files in one directory.
+
+    The state file (`STATE_NAME` next to the outputs) is tab-separated
+    `output name, size, mtime_ns, sha256, options`. An input whose size and
+    mtime match its entry is unchanged without being read; one whose size
+    matches but mtime does not is hashed, so touching or copying a file does
+    not force a conversion. `save` rewrites the file atomically.
+    """
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory or ".", STATE_NAME)
+        self._entries = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    name, size, mtime_ns, sha, options = line.rstrip("\n").split("\t")
+                    self._entries[name] = (int(size), int(mtime_ns), sha, options)
+        except FileNotFoundError:
+            pass
+
+    def get(self, dest: str):
+        return self._entries.get(os.path.basename(dest))
+
+    def set(self, dest: str, fingerprint: tuple):
+        self._entries[os.path.basename(dest)] = fingerprint
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                for name, (size, mtime_ns, sha, options) in sorted(self._entries.items()):
+                    f.write(f"{name}\t{size}\t{mtime_ns}\t{sha}\t{options}\n")
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def convert_file(src: str, dest: str = None, engine: str = None, sheets: str = None) -> int:
+    """Stream one CSV (optionally compressed) or JSON Lines export into an XLSX.
+
+    The input's own columns are kept, so raw (`url`) and enriched
+    (`video_url`) exports both get hyperlinked URL cells. `sheets` splits
+    the workbook like `--xlsx-sheets` and is ignored for inputs without that
+    column. The XLSX is staged and renamed into place. Returns the number of
+    rows written.
+    """
+    headers, rows = read_rows(src)
+    if not headers:
+        rows.close()
+        raise ValueError(f"{src}: no header row")
+    dest = dest or output_path(src)
+    if sheets not in headers:
+        sheets = None
+    # the builtin writer turns digit strings into numbers itself
+    numeric = [h for h in headers if h in NUMERIC_COLUMNS] if (engine or DEFAULT_XLSX_ENGINE) == "openpyxl" else []
+    with open_sink(dest, headers, "xlsx", atomic=True, xlsx_engine=engine, xlsx_sheets=sheets) as sink:
+        for row in rows:
+            for h in numeric:
+                v = row.get(h)
+                if type(v) is str and v.isascii() and v.isdecimal():
+                    row[h] = int(v)
+            sink.write(row)
+    return sink.rows
+
+
+def _convert_job(src: str, dest: str, engine: str, sheets: str, known_sha: str = None):
+    """Convert `src` unless its content hashes to `known_sha`.
+
+    Returns (rows or None if unchanged, fingerprint of `src`)."""
+    st = os.stat(src)
+    sha = file_sha256(src)
+    options = f"{engine or DEFAULT_XLSX_ENGINE}/{sheets or 'single'}"
+    fingerprint = (st.st_size, st.st_mtime_ns, sha, options)
+    if sha == known_sha:
+        return None, fingerprint
+    return convert_file(src, dest, engine, sheets), fingerprint
+
+
+def convert_many(
+    inputs: List[str], out_dir: str = None, jobs: int = None, engine: str = None, sheets: str = None, force: bool = False, output: str = None
+) -> dict:
+    """Convert every input to XLSX, `jobs` files at a time in worker processes.
+
+    Inputs whose size, mtime (or content hash) and options match the state
+    recorded for their output, and whose output still exists, are skipped
+    unless `force` is set. `output` names the XLSX of a single input; see
+    `destinations` for the others. Returns {input: rows written, None if
+    unchanged, or the exception that failed or `Skipped` it}.
+    """
+    options = f"{engine or DEFAULT_XLSX_ENGINE}/{sheets or 'single'}"
+    results = {}
+    pending = []
+    states = {}
+    for src, dest in destinations(inputs, out_dir, output).items():
+        if isinstance(dest, Exception):
+            results[src] = dest
+            continue
+        directory = os.path.dirname(dest) or "."
+        state = states.get(directory)
+        if state is None:
+            state = states[directory] = ConvertState(directory)
+        entry = None if force or not os.path.exists(dest) else state.get(dest)
+        known_sha = None
+        if entry is not None and entry[3] == options:
+            try:
+                st = os.stat(src)
+            except OSError as e:
+                results[src] = e
+                continue
+            if (st.st_size, st.st_mtime_ns) == entry[:2]:
+                results[src] = None
+                continue
+            if st.st_size == entry[0]:
+                known_sha = entry[2]
+        pending.append((src, dest, state, known_sha))
+
+    def done(src, dest, state, result):
+        rows, fingerprint = result
+        state.set(dest, fingerprint)
+        results[src] = rows
+
+    jobs = min(jobs or os.cpu_count() or 1, len(pending))
+    try:
+        if jobs <= 1:
+            for src, dest, state, known_sha in pending:
+                try:
+                    done(src, dest, state, _convert_job(src, dest, engine, sheets, known_sha))
+                except Exception as e:
+                    results[src] = e
+        else:
+            with ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = {pool.submit(_convert_job, src, dest, engine, sheets, known_sha): (src, dest, state) for src, dest, state, known_sha in pending}
+                for future in as_completed(futures):
+                    src, dest, state = futures[future]
+                    try:
+                        done(src, dest, state, future.result())
+                    except Exception as e:
+                        results[src] = e
+    finally:
+        for state in states.values():
+            state.save()
+    return {src: results[src] for src in inputs if src in results}
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Convert CSV/JSONL exports to XLSX with hyperlinked URLs")
+    p.add_argument("inputs", nargs="+", metavar="INPUT", help="CSV (.csv, .csv.gz, .csv.zst) or JSON Lines files, glob patterns or directories")
+    p.add_argument("-o", "--output", default=None, help="Output directory, or the XLSX path when converting a single file (default: next to each input)")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="Files converted in parallel (default: one per CPU)")
+    p.add_argument("--xlsx-engine", choices=XLSX_ENGINES, default=DEFAULT_XLSX_ENGINE, help="XLSX writer: builtin streaming writer or openpyxl write-only mode")
+    p.add_argument("--xlsx-sheets", choices=["single", "category", "region"], default="single", help="One sheet, or one sheet per category or region after a summary sheet")
+    p.add_argument("--force", action="store_true", help="Convert inputs even if they have not changed since the last conversion")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    inputs = expand_inputs(args.inputs)
+    missing = [p for p in inputs if not os.path.isfile(p)]
+    if missing or not inputs:
+        print(f"No input files found: {' '.join(missing or args.inputs)}", file=sys.stderr)
+        return 2
+    output = out_dir = None
+    if args.output is not None:
+        if len(inputs) == 1 and args.output.endswith(".xlsx"):
+            output = args.output
+        else:
+            out_dir = args.output
+    dests = destinations(inputs, out_dir, output)
+    results = convert_many(
+        inputs,
+        out_dir,
+        args.jobs,
+        args.xlsx_engine,
+        None if args.xlsx_sheets == "single" else args.xlsx_sheets,
+        args.force,
+        output,
+    )
+    failed = 0
+    for src, result in results.items():
+        dest = dests[src]
+        if isinstance(result, Skipped):
+            print(f"Skipped: {src}: {result}", file=sys.stderr)
+        elif isinstance(result, Exception):
+            failed += 1
+            print(f"Failed: {src}: {result}", file=sys.stderr)
+        elif result is None:
+            print(f"Unchanged: {dest}")
+        else:
+            print(f"Wrote: {dest} ({result} rows)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,53 @@
-import csv
 import os
+import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime, timedelta
-from typing import List
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterable, List
 
-import requests
 from datetime import timezone
 
+from .cache import DEFAULT_TTLS
+from .categories import CategoryIndex
+from .checkpoint import Checkpoints
+from .client import YouTubeClient, get_default_client
+from .incremental import DEFAULT_STATE_PATH, DELTA_HEADERS, ExportState
+from .lang import LANGS, detect_lang, detect_langs
+from .manifest import DEFAULT_MANIFEST_PATH, write_manifest
+from .metrics import get_metrics
+from .quota import QuotaExceeded, QuotaScheduler
+from .rows import EnrichedRow, VideoRow, as_video_row, video_row
+from .sinks import DEFAULT_FORMATS, FORMATS, CsvSink, format_for_path, open_sink, staging_path
+from .store import DEFAULT_DB_PATH, HISTORY_HEADERS, HistoryStore
+from .xlsx import StreamingXlsxWriter
+
 # Defaults and small config
 DEFAULT_MAX_PER_CATEGORY = 10
 DEFAULT_REGION = "US"
 OUTPUT_CSV_DEFAULT = "youtube_top_videos_last_{days}_{lang}.csv"
-ALLOWED_LANG_PREFIX = ("en", "zh")
+# every detected language: before script detection every title was en or zh,
+# so the default filter kept them all
+ALLOWED_LANG_PREFIX = LANGS
+ENRICH_BATCH = 256  # titles classified per detect_langs call
+PAGE_SIZE = 50  # videos.list maxResults upper bound
+# seconds a region's CategoryIndex is reused by later runs in the same process
+CATEGORY_INDEX_TTL = DEFAULT_TTLS["videoCategories"]
+RAW_HEADERS = ["category", "rank", "title", "channel", "views", "url", "published_at"]
+ENRICHED_HEADERS = [
+    "category_id",
+    "category_name",
+    "title",
+    "channel",
+    "views",
+    "language",
+    "published_at",
+    "video_url",
+]
 
 
 def _mock_videos(category: str, n: int):
@@ -19,192 +55,123 @@ def _mock_videos(category: str, n: int):
     items = []
     for i in range(1, n + 1):
         items.append(
-            {
-                "category": category,
-                "rank": i,
-                "title": f"Mock Video {i} ({category})",
-                "channel": "MockChannel",
-                "views": 1000 * i,
-                "url": f"http://example.com/{category}/{i}",
-                "published_at": now,
-            }
+            video_row(
+                category,
+                i,
+                f"mock-{category}-{i}",
+                f"Mock Video {i} ({category})",
+                "MockChannel",
+                1000 * i,
+                f"http://example.com/{category}/{i}",
+                now,
+            )
         )
     return items
 
 
-def fetch_videos_for_category(category: str, n: int, lang: str, days: int, api_key: str):
+def _video_row(category: str, rank: int, it: dict) -> VideoRow:
+    snip = it.get("snippet", {})
+    stats = it.get("statistics", {})
+    vid_id = it.get("id")
+    return video_row(
+        category,
+        rank,
+        vid_id,
+        snip.get("title"),
+        snip.get("channelTitle"),
+        int(stats.get("viewCount", 0)),
+        f"https://www.youtube.com/watch?v={vid_id}",
+        snip.get("publishedAt"),
+    )
+
+
+def iter_videos_for_category(category: str, n: int, lang: str, days: int, api_key: str, client: YouTubeClient = None):
+    """Yield up to `n` chart rows for `category`, following `nextPageToken`.
+
+    Page tokens are only known once the previous page arrives, so the next
+    request is issued in the background as soon as a page lands and overlaps
+    with the caller consuming that page's rows.
+    """
+    client = client or get_default_client()
     # Use YouTube Data API v3 'videos?chart=mostPopular' to fetch popular videos
     params = {
         "part": "snippet,statistics",
         "chart": "mostPopular",
         "regionCode": lang,
-        "maxResults": min(50, n),
         "key": api_key,
     }
     # If category looks numeric, use as videoCategoryId; otherwise skip filtering
     if category and category.isdigit():
         params["videoCategoryId"] = category
 
-    resp = requests.get("https://www.googleapis.com/youtube/v3/videos", params=params, timeout=10)
-    resp.raise_for_status()
-    data = resp.json()
-    items = []
-    for idx, it in enumerate(data.get("items", [])[:n], start=1):
-        snip = it.get("snippet", {})
-        stats = it.get("statistics", {})
-        vid_id = it.get("id")
-        url = f"https://www.youtube.com/watch?v={vid_id}"
-        items.append(
-            {
-                "category": category,
-                "rank": idx,
-                "title": snip.get("title"),
-                "channel": snip.get("channelTitle"),
-                "views": int(stats.get("viewCount", 0)),
-                "url": url,
-                "published_at": snip.get("publishedAt"),
-            }
-        )
-    return items
+    def fetch_page(token, size):
+        page_params = dict(params, maxResults=size)
+        if token:
+            page_params["pageToken"] = token
+        return client.get_json("videos", page_params)
 
-
-def write_csv(path: str, rows: List[dict]):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    headers = ["category", "rank", "title", "channel", "views", "url", "published_at"]
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=headers)
-        w.writeheader()
+    rank = 0
+    prefetch = None
+    try:
+        data = fetch_page(None, min(PAGE_SIZE, n))
+        while True:
+            items = data.get("items", [])[: n - rank]
+            token = data.get("nextPageToken")
+            remaining = n - rank - len(items)
+            pending = None
+            if token and items and remaining > 0:
+                if prefetch is None:
+                    prefetch = ThreadPoolExecutor(max_workers=1)
+                pending = prefetch.submit(fetch_page, token, min(PAGE_SIZE, remaining))
+            for it in items:
+                rank += 1
+                yield _video_row(category, rank, it)
+            if pending is None:
+                return
+            data = pending.result()
+    finally:
+        if prefetch is not None:
+            prefetch.shutdown(wait=True, cancel_futures=True)
+
+
+def fetch_videos_for_category(category: str, n: int, lang: str, days: int, api_key: str, client: YouTubeClient = None):
+    return list(iter_videos_for_category(category, n, lang, days, api_key, client=client))
+
+
+def write_rows(path: str, rows: Iterable[dict], headers: List[str] = None, fmt: str = None, **options):
+    """Write `rows` to `path` in `fmt` (by default the format its extension names).
+
+    The file is written under a staging name and renamed over `path` once
+    complete, so a failure leaves any previous file in place.
+    """
+    with open_sink(path, headers or RAW_HEADERS, fmt, atomic=True, **options) as sink:
         for r in rows:
-            w.writerow(r)
+            sink.write(r)
+
+
+def write_csv(path: str, rows: Iterable[dict], headers: List[str] = None):
+    write_rows(path, rows, headers, "csv")
 
-def write_xlsx_minimal(path: str, rows: List[dict]):
+
+def write_xlsx_minimal(path: str, rows: Iterable[dict], headers: List[str] = None):
     """Write a minimal valid XLSX (ZIP+XML) including hyperlinks so Excel can open it.
 
-    This produces a very small workbook with one sheet.
+    This produces a single-sheet workbook with the builtin streaming writer.
     """
-    import zipfile
-    from xml.sax.saxutils import escape
-
-    headers = ["category", "rank", "title", "channel", "views", "url", "published_at"]
-
-    def col_letter(i: int) -> str:
-        s = ""
-        while i > 0:
-            i, rem = divmod(i - 1, 26)
-            s = chr(65 + rem) + s
-        return s
-
-    def cell_xml(col: str, row_idx: int, value: object) -> str:
-        v = "" if value is None else escape(str(value))
-        return f'<c r="{col}{row_idx}" t="inlineStr"><is><t>{v}</t></is></c>'
-
-    rows_xml = []
-    # header
-    header_cells = [cell_xml(col_letter(i), 1, h) for i, h in enumerate(headers, start=1)]
-    rows_xml.append(f'<row r="1">{"".join(header_cells)}</row>')
-
-    hyperlinks = []
-    for ridx, r in enumerate(rows, start=2):
-        cells = []
-        for i, h in enumerate(headers, start=1):
-            val = r.get(h, "")
-            col = col_letter(i)
-            cells.append(cell_xml(col, ridx, val))
-            if h == "url" and isinstance(val, str) and val.startswith("http"):
-                hyperlinks.append((f"{col}{ridx}", val))
-        rows_xml.append(f'<row r="{ridx}">{"".join(cells)}</row>')
-
-    hyperlinks_xml = "" if not hyperlinks else f"<hyperlinks>{''.join(f'<hyperlink ref="{cell}" r:id="rId{idx+1}"/>' for idx, (cell, _) in enumerate(hyperlinks))}</hyperlinks>"
-
-    sheet_xml = f"""<?xml version='1.0' encoding='UTF-8'?>
-<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
-  <sheetData>
-    {''.join(rows_xml)}
-  </sheetData>
-  {hyperlinks_xml}
-</worksheet>"""
-
-    # content types and relationships
-    content_types = """<?xml version='1.0' encoding='UTF-8'?>
-<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
-  <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
-  <Default Extension="xml" ContentType="application/xml"/>
-  <Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
-  <Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
-</Types>"""
-
-    rels_xml = """<?xml version='1.0' encoding='UTF-8'?>
-<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
-  <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="/xl/workbook.xml"/>
-</Relationships>"""
-
-    workbook_xml = """<?xml version='1.0' encoding='UTF-8'?>
-<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
-  <sheets>
-    <sheet name="Sheet1" sheetId="1" r:id="rId1"/>
-  </sheets>
-</workbook>"""
-
-    workbook_rels = """<?xml version='1.0' encoding='UTF-8'?>
-<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
-  <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
-</Relationships>"""
-
-    sheet_rels = ""
-    if hyperlinks:
-        rels = []
-        for idx, (_, target) in enumerate(hyperlinks, start=1):
-            rid = f"rId{idx+1}"
-            # Target must be XML-escaped
-            rels.append(f'<Relationship Id="{rid}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink" Target="{escape(target)}" TargetMode="External"/>')
-        sheet_rels = f"<?xml version='1.0' encoding='UTF-8'?><Relationships xmlns='http://schemas.openxmlformats.org/package/2006/relationships'>{''.join(rels)}</Relationships>"
-
-    # write zip package
-    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as z:
-        z.writestr('[Content_Types].xml', content_types)
-        z.writestr('_rels/.rels', rels_xml)
-        z.writestr('xl/workbook.xml', workbook_xml)
-        z.writestr('xl/_rels/workbook.xml.rels', workbook_rels)
-        z.writestr('xl/worksheets/sheet1.xml', sheet_xml)
-        if sheet_rels:
-            z.writestr('xl/worksheets/_rels/sheet1.xml.rels', sheet_rels)
-
-
-def write_xlsx(path: str, rows: List[dict]):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    try:
-        from openpyxl import Workbook
-        from openpyxl.styles import Font
-    except Exception:
-        # fallback to minimal XLSX writer
-        write_xlsx_minimal(path, rows)
-        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with StreamingXlsxWriter(path, headers or RAW_HEADERS) as w:
+        for r in rows:
+            w.write(r)
+
+
+def write_xlsx(path: str, rows: Iterable[dict], headers: List[str] = None, engine: str = None):
+    write_rows(path, rows, headers, "xlsx", xlsx_engine=engine)
 
-    wb = Workbook()
-    ws = wb.active
-    headers = ["category", "rank", "title", "channel", "views", "url", "published_at"]
-    ws.append(headers)
-    for r in rows:
-        row = [r.get(h) for h in headers]
-        ws.append(row)
-        # set hyperlink on the last appended row's URL cell and ensure cell value is the URL
-        url_idx = headers.index("url") + 1
-        url_cell = ws.cell(row=ws.max_row, column=url_idx)
-        url = r.get("url")
-        if url:
-            url_cell.value = url
-            url_cell.hyperlink = url
-            url_cell.font = Font(color="0000FF", underline="single")
-    wb.save(path)
-    return
-
-
-def get_video_categories(api_key: str, region: str = "US"):
+
+def get_video_categories(api_key: str, region: str = "US", client: YouTubeClient = None):
     """Return mapping of category id -> category title for the provided region."""
     params = {"part": "snippet", "regionCode": region, "key": api_key}
-    resp = requests.get("https://www.googleapis.com/youtube/v3/videoCategories", params=params, timeout=10)
-    resp.raise_for_status()
-    data = resp.json()
+    data = (client or get_default_client()).get_json("videoCategories", params)
     mapping = {}
     for it in data.get("items", []):
         cid = it.get("id")
@@ -213,136 +180,670 @@ def get_video_categories(api_key: str, region: str = "US"):
     return mapping
 
 
+def fetch_video_statistics(video_ids: Iterable[str], api_key: str, client: YouTubeClient = None, concurrency: int = 1) -> dict:
+    """Return {video_id: views} for `video_ids` using `videos.list?part=statistics`.
+
+    Ids are requested `PAGE_SIZE` (50) per call, one quota unit each, and the
+    calls run `concurrency` at a time. Ids the API does not return (deleted
+    or private videos) are missing from the result. The response cache is
+    bypassed: a refresh is only useful with current counts.
+    """
+    client = client or get_default_client()
+    ids = list(dict.fromkeys(v for v in video_ids if v))
+    batches = [ids[i : i + PAGE_SIZE] for i in range(0, len(ids), PAGE_SIZE)]
+
+    def fetch(batch):
+        params = {"part": "statistics", "id": ",".join(batch), "maxResults": PAGE_SIZE, "key": api_key}
+        return client.get_json("videos", params, use_cache=False).get("items", [])
+
+    views = {}
+    for items in _ordered_map(fetch, batches, max(1, concurrency)):
+        for it in items:
+            views[it.get("id")] = int(it.get("statistics", {}).get("viewCount", 0))
+    return views
+
+
 def _detect_lang(text: str) -> str:
-    """Very small heuristic to detect 'en' vs 'zh' based on characters."""
-    if not text:
-        return "en"
-    for ch in text:
-        # basic CJK range
-        if "\u4e00" <= ch <= "\u9fff":
-            return "zh"
-    return "en"
-
-
-def write_enriched_csv(path: str, rows: List[dict]):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    headers = [
-        "category_id",
-        "category_name",
-        "title",
-        "channel",
-        "views",
-        "language",
-        "published_at",
-        "video_url",
-    ]
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow(headers)
-        for r in rows:
-            w.writerow([
-                r.get("category_id", ""),
-                r.get("category_name", ""),
-                r.get("title", ""),
-                r.get("channel", ""),
-                r.get("views", ""),
-                r.get("language", ""),
-                r.get("published_at", ""),
-                r.get("video_url", ""),
-            ])
-
-
-def fetch_and_export(categories: str, n: int, lang: str, days: int, api_key: str = None, mock: bool = False):
-    cats = [c.strip() for c in categories.split(",")] if categories else ["all"]
+    """Language code of a title; see `lang.detect_lang` for the heuristic."""
+    return detect_lang(text)[0]
 
-    category_map = {}
-    if not mock:
-        if not api_key:
-            raise RuntimeError("YOUTUBE_API_KEY is required when not running in mock mode")
-        try:
-            category_map = get_video_categories(api_key, region=lang)
-        except Exception as e:
-            raise RuntimeError(f"Failed to fetch video categories: {e}")
 
-    # map category names to ids when possible
-    mapped_cats = []
-    for c in cats:
-        if c.isdigit():
-            mapped_cats.append(c)
-            continue
-        # try to find id by matching category title
-        found = None
-        for cid, title in category_map.items():
-            if title and title.lower() == c.lower():
-                found = cid
-                break
-        mapped_cats.append(found if found is not None else c)
-
-    # if user requested "all", expand to all category ids we fetched
-    if any((str(x).lower() == "all" for x in cats)) and category_map:
-        mapped_cats = list(category_map.keys())
-
-    all_rows = []
-    for c in mapped_cats:
-        if mock:
-            rows = _mock_videos(c or "all", n)
-        else:
+def write_enriched_csv(path: str, rows: Iterable[dict], headers: List[str] = None):
+    write_csv(path, rows, headers=headers or ENRICHED_HEADERS)
+
+
+def _parse_regions(lang) -> List[str]:
+    """Split a comma-separated region string (or list) into unique region codes."""
+    parts = lang.split(",") if isinstance(lang, str) else list(lang or [])
+    regions = []
+    for p in parts:
+        code = str(p).strip()
+        if code and code not in regions:
+            regions.append(code)
+    return regions or [DEFAULT_REGION]
+
+
+def _resolve_categories(cats: List[str], region: str, api_key: str, mock: bool, client: YouTubeClient, category_cache: dict = None):
+    """Return (CategoryIndex, mapped_cats) for one region.
+
+    `category_cache` ({region: (monotonic time, CategoryIndex)}) lets a
+    long-running process reuse a region's index, lookups included, for
+    `CATEGORY_INDEX_TTL` seconds.
+    """
+    cached = category_cache.get(region) if category_cache is not None and not mock else None
+    if cached is not None and time.monotonic() - cached[0] < CATEGORY_INDEX_TTL:
+        index = cached[1]
+    else:
+        category_map = {}
+        if not mock:
             if not api_key:
-                raise RuntimeError("YOUTUBE_API_KEY is required to fetch real data")
-            # attempt to fetch; on HTTP errors skip this category but continue
+                raise RuntimeError("YOUTUBE_API_KEY is required when not running in mock mode")
             try:
-                rows = fetch_videos_for_category(c, n, lang, days, api_key)
+                category_map = get_video_categories(api_key, region=region, client=client)
             except Exception as e:
-                # log to stderr and skip this category
-                try:
-                    import sys
-
-                    print(f"Skipping category {c}: {e}", file=sys.stderr)
-                except Exception:
-                    pass
-                rows = []
-        all_rows.extend(rows)
-
-    out_csv = os.path.join("out", "top_videos.csv")
-    out_xlsx = os.path.join("out", "top_videos.xlsx")
-    write_csv(out_csv, all_rows)
-    write_xlsx(out_xlsx, all_rows)
-
-    # build enriched rows for the separate CSV
-    enriched = []
-    for r in all_rows:
-        raw_cat = str(r.get("category", ""))
-        category_id = ""
-        category_name = ""
-        if raw_cat.isdigit():
-            category_id = raw_cat
-            category_name = category_map.get(raw_cat, "")
+                raise RuntimeError(f"Failed to fetch video categories: {e}")
+        index = CategoryIndex(category_map)
+        if category_cache is not None and not mock:
+            category_cache[region] = (time.monotonic(), index)
+
+    # map category names (or aliases) to ids when possible; "all" expands in
+    # place to every category id and duplicates keep their first position, so
+    # "music,all" fetches Music first (order is the priority under a quota budget)
+    mapped = []
+    for c in cats:
+        if str(c).lower() == "all" and index:
+            mapped.extend(index.ids())
         else:
-            # maybe it's a name
-            category_name = raw_cat
-            # try to find id by name
-            for cid, title in category_map.items():
-                if title and title.lower() == raw_cat.lower():
-                    category_id = cid
-                    break
-
-        title = r.get("title")
-        enriched.append(
-            {
-                "category_id": category_id,
-                "category_name": category_name,
-                "title": title,
-                "channel": r.get("channel"),
-                "views": r.get("views"),
-                "language": _detect_lang(title),
-                "published_at": r.get("published_at"),
-                "video_url": r.get("url"),
-            }
-        )
+            mapped.append(index.resolve(c) or c)
+    return index, list(dict.fromkeys(mapped))
+
+
+def _ordered_map(fn, items, workers: int):
+    """Like `ThreadPoolExecutor.map`, but only keeps `2 * workers` tasks ahead of
+    the consumer so results stream out in order instead of piling up in memory."""
+    if workers <= 1:
+        for it in items:
+            yield fn(it)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        window = deque()
+        for it in items:
+            window.append(pool.submit(fn, it))
+            if len(window) >= 2 * workers:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+
+class _RegionTimings:
+    """Thread-safe per-region fetch seconds, row counts and completion times."""
+
+    def __init__(self, regions: List[str]):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stats = {region: [0.0, 0, 0.0] for region in regions}
+
+    def add(self, region: str, seconds: float = 0.0, rows: int = 0):
+        with self._lock:
+            stats = self._stats[region]
+            stats[0] += seconds
+            stats[1] += rows
+
+    def finish(self, region: str):
+        self._stats[region][2] = time.perf_counter() - self.started
+
+    def report(self, file=None):
+        file = file or sys.stderr
+        print("Region timings:", file=file)
+        for region, (seconds, rows, done) in self._stats.items():
+            print(f"  {region}: {seconds:.2f}s fetching, done at +{done:.2f}s, {rows} rows", file=file)
+
+
+def _iter_rows(
+    plans: List[tuple],
+    n: int,
+    days: int,
+    api_key: str,
+    mock: bool,
+    client: YouTubeClient,
+    workers: int,
+    timings: _RegionTimings,
+    scheduler: QuotaScheduler = None,
+    checkpoints: Checkpoints = None,
+):
+    """Yield rows for every (region, category) in `plans` order, tagged with their region.
+
+    A category is buffered until its fetch completes so a failing category is
+    still skipped as a whole; everything after that streams. With a
+    `scheduler`, each chart is recorded as fetched, as failed when it was
+    skipped for an error or, when the quota budget ran out during its
+    fetch, as skipped.
+
+    Charts are fetched by `workers` threads, or, when `client` is an
+    `aio.AsyncYouTubeClient`, as coroutines on its event loop. There an
+    `aio.FatalAPIError` (invalid key, exhausted API quota) cancels every
+    outstanding chart and propagates instead of skipping one category.
+
+    With `checkpoints`, every chart fetched in full is saved there as soon
+    as its fetch completes, and a chart already saved is read back instead
+    of being fetched.
+    """
+    metrics = get_metrics()
+
+    def resumed(region, c, start):
+        rows = checkpoints.load(region, c) if checkpoints is not None else None
+        if rows is None:
+            return None
+        metrics.inc("charts_resumed_total", region=region)
+        return outcome(region, c, start, rows)
+
+    def outcome(region, c, start, rows=None, error=None):
+        failed = False
+        if isinstance(error, QuotaExceeded):
+            metrics.inc("categories_skipped_total", region=region, reason="quota")
+            rows = None
+        elif error is not None:
+            # log to stderr and skip this category
+            print(f"Skipping category {c}: {error}", file=sys.stderr)
+            metrics.inc("categories_skipped_total", region=region, reason="error")
+            rows = []
+            failed = True
+        elif checkpoints is not None and rows is not None and not checkpoints.has(region, c):
+            checkpoints.save(region, c, rows)
+        elapsed = time.perf_counter() - start
+        timings.add(region, elapsed)
+        metrics.observe("category_fetch_seconds", elapsed, region=region, category=c)
+        return region, c, rows, failed
+
+    def fetch_one(task):
+        region, c = task
+        start = time.perf_counter()
+        done = resumed(region, c, start)
+        if done is not None:
+            return done
+        if mock:
+            return outcome(region, c, start, _mock_videos(c or "all", n))
+        if not api_key:
+            raise RuntimeError("YOUTUBE_API_KEY is required to fetch real data")
+        # attempt to fetch; on HTTP errors skip this category but continue
+        try:
+            rows = fetch_videos_for_category(c, n, region, days, api_key, client=client)
+        except Exception as e:
+            return outcome(region, c, start, error=e)
+        return outcome(region, c, start, rows)
+
+    async def fetch_one_async(task):
+        region, c = task
+        start = time.perf_counter()
+        done = resumed(region, c, start)
+        if done is not None:
+            return done
+        try:
+            rows = await aio.fetch_videos_for_category(client, c, n, region, api_key)
+        except aio.FatalAPIError:
+            raise
+        except Exception as e:
+            return outcome(region, c, start, error=e)
+        return outcome(region, c, start, rows)
+
+    tasks = ((region, c) for region, _, mapped_cats in plans for c in mapped_cats)
+    if mock or not getattr(client, "is_async", False):
+        results = _ordered_map(fetch_one, tasks, workers)
+    else:
+        if not api_key:
+            raise RuntimeError("YOUTUBE_API_KEY is required to fetch real data")
+        from . import aio
+
+        # requests are capped by the client's semaphore; the window bounds buffered charts
+        results = client.ordered_map(fetch_one_async, tasks, max(workers, client.max_in_flight))
+    for region, c, rows, failed in results:
+        if scheduler is not None:
+            (scheduler.failed if failed else scheduler.fetched if rows is not None else scheduler.skipped).append((region, c))
+        rows = rows or []
+        timings.add(region, rows=len(rows))
+        metrics.inc("rows_fetched_total", len(rows), region=region)
+        for r in rows:
+            r["region"] = region
+            yield r
+
+
+def _admit(plans: List[tuple], n: int, scheduler: QuotaScheduler, checkpoints: Checkpoints = None) -> List[tuple]:
+    """Drop the charts the remaining quota budget cannot pay for.
+
+    Charts are admitted by priority: their position in the category list
+    first, then region order. Each is estimated at one `videos` request per
+    page, except charts saved in `checkpoints`, which cost nothing; skipped
+    charts are recorded on the scheduler.
+    """
+    left = scheduler.remaining()
+    if left is None:
+        return plans
+    cost = -(-n // PAGE_SIZE) * scheduler.cost("videos")
+    tasks = sorted((i, r, region, c) for r, (region, _, cats) in enumerate(plans) for i, c in enumerate(cats))
+    admitted = set()
+    for _, _, region, c in tasks:
+        if checkpoints is not None and checkpoints.has(region, c):
+            admitted.add((region, c))
+        elif cost <= left:
+            admitted.add((region, c))
+            left -= cost
+        else:
+            scheduler.skipped.append((region, c))
+    return [(region, index, [c for c in cats if (region, c) in admitted]) for region, index, cats in plans]
+
+
+def _enrich_row(r: VideoRow, index: CategoryIndex, lang: tuple = None) -> EnrichedRow:
+    if type(r) is not VideoRow:
+        r = as_video_row(r)
+    category_id, category_name = index.lookup(r.category if r.category is not None else "")
+    language, confidence = lang or detect_lang(r.title)
+    return EnrichedRow(r.region, category_id, category_name, r.title, r.channel, r.views, language, confidence, r.published_at, r.url)
+
+
+def _lang_allowed(language: str, confidence: float = 1.0, allowed=None, min_confidence: float = 0.0) -> bool:
     # filter by allowed language prefixes
-    filtered = [e for e in enriched if any(e.get("language", "").startswith(p) for p in ALLOWED_LANG_PREFIX)]
+    if confidence < min_confidence:
+        return False
+    return language.startswith(tuple(allowed or ALLOWED_LANG_PREFIX))
+
+
+class _OutputSet:
+    """The raw and enriched sinks for one set of output files.
+
+    Raw rows are written in every format of `formats` (default CSV and XLSX);
+    enriched rows in the same formats except XLSX, or CSV if that leaves none.
+    Every file is staged and renamed into place by `close`; `discard` drops
+    the staged files of a failed run instead.
+
+    `xlsx_sheets` ("category" or "region") splits the XLSX into one sheet per
+    value of that column plus a summary sheet; it is ignored when the column
+    is not written (e.g. "region" without `with_region`). Category sheets are
+    named after the category's title in the row's region.
 
-    enriched_csv = os.path.join("out", OUTPUT_CSV_DEFAULT.format(days=days, lang=lang))
-    write_enriched_csv(enriched_csv, filtered)
+    Enrichment runs on batches of `ENRICH_BATCH` rows, so titles are
+    classified with one `lang.detect_langs` call per batch.
 
-    return out_csv, out_xlsx, enriched_csv
+    While metrics are enabled, rows go through `_write_timed` instead, which
+    also times enrichment and every sink and counts the rows dropped by the
+    language filter.
+    """
+
+    def __init__(
+        self,
+        suffix: str,
+        lang: str,
+        days: int,
+        with_region: bool = False,
+        xlsx_engine: str = None,
+        allowed_langs=None,
+        min_lang_confidence: float = 0.0,
+        formats=None,
+        xlsx_sheets: str = None,
+    ):
+        self.allowed_langs = tuple(allowed_langs or ALLOWED_LANG_PREFIX)
+        self.min_lang_confidence = min_lang_confidence
+        formats = list(formats or DEFAULT_FORMATS)
+        enriched_formats = [f for f in formats if f != "xlsx"] or ["csv"]
+        prefix = ["region"] if with_region else []
+        enriched_base = os.path.join("out", os.path.splitext(OUTPUT_CSV_DEFAULT.format(days=days, lang=lang))[0])
+        if xlsx_sheets not in prefix + RAW_HEADERS:
+            xlsx_sheets = None
+        # category -> title, filled in as rows arrive while splitting by category
+        self._category_titles = {} if xlsx_sheets == "category" else None
+        xlsx_options = dict(xlsx_engine=xlsx_engine, xlsx_sheets=xlsx_sheets)
+        if self._category_titles is not None:
+            xlsx_options["sheet_title"] = lambda category: self._category_titles.get(category) or category
+        self.raw_sinks = tuple(
+            open_sink(os.path.join("out", f"top_videos{suffix}") + FORMATS[f][0], prefix + RAW_HEADERS, f, atomic=True, **xlsx_options)
+            for f in formats
+        )
+        self.enriched_sinks = tuple(
+            open_sink(enriched_base + FORMATS[f][0], prefix + ENRICHED_HEADERS, f, atomic=True) for f in enriched_formats
+        )
+        self.paths = tuple(sink.path for sink in self.raw_sinks + self.enriched_sinks)
+        # {path: data rows} of the files renamed into place, once closed
+        self.written = {}
+        # (row, index) pairs written raw and not yet enriched
+        self._pending = []
+        self._metrics = get_metrics()
+        if self._metrics.enabled:
+            self._seconds = {sink: 0.0 for sink in self.raw_sinks + self.enriched_sinks}
+            self._enrich_seconds = 0.0
+            self._dropped = {}
+            self.write = self._write_timed
+
+    def write(self, row: dict, index: CategoryIndex):
+        if self._category_titles is not None:
+            self._note_category(row, index)
+        for sink in self.raw_sinks:
+            sink.write(row)
+        self._pending.append((row, index))
+        if len(self._pending) >= ENRICH_BATCH:
+            self._enrich_pending()
+
+    def _enrich_pending(self):
+        pending, self._pending = self._pending, []
+        langs = detect_langs([row.get("title") for row, _ in pending])
+        for (row, index), lang in zip(pending, langs):
+            if _lang_allowed(lang[0], lang[1], self.allowed_langs, self.min_lang_confidence):
+                e = _enrich_row(row, index, lang)
+                for sink in self.enriched_sinks:
+                    sink.write(e)
+
+    def _note_category(self, row: dict, index: CategoryIndex):
+        category = row.get("category")
+        if category not in self._category_titles:
+            self._category_titles[category] = index.lookup(category or "")[1]
+
+    def _write_timed(self, row: dict, index: CategoryIndex):
+        clock, seconds = time.perf_counter, self._seconds
+        if self._category_titles is not None:
+            self._note_category(row, index)
+        for sink in self.raw_sinks:
+            start = clock()
+            sink.write(row)
+            seconds[sink] += clock() - start
+        self._pending.append((row, index))
+        if len(self._pending) >= ENRICH_BATCH:
+            self._enrich_pending_timed()
+
+    def _enrich_pending_timed(self):
+        clock, seconds = time.perf_counter, self._seconds
+        pending, self._pending = self._pending, []
+        start = clock()
+        langs = detect_langs([row.get("title") for row, _ in pending])
+        self._enrich_seconds += clock() - start
+        for (row, index), lang in zip(pending, langs):
+            start = clock()
+            allowed = _lang_allowed(lang[0], lang[1], self.allowed_langs, self.min_lang_confidence)
+            e = _enrich_row(row, index, lang) if allowed else None
+            self._enrich_seconds += clock() - start
+            if not allowed:
+                self._dropped[lang[0]] = self._dropped.get(lang[0], 0) + 1
+                continue
+            for sink in self.enriched_sinks:
+                start = clock()
+                sink.write(e)
+                seconds[sink] += clock() - start
+
+    def close(self):
+        sinks = self.raw_sinks + self.enriched_sinks
+        if not self._metrics.enabled:
+            self._enrich_pending()
+            for sink in sinks:
+                sink.close()
+            self.written = {sink.path: sink.rows for sink in sinks}
+            return self.paths
+        self._enrich_pending_timed()
+        for sink in sinks:
+            start = time.perf_counter()
+            sink.close()
+            self._seconds[sink] += time.perf_counter() - start
+        self.written = {sink.path: sink.rows for sink in sinks}
+        m = self._metrics
+        m.observe("stage_seconds", self._enrich_seconds, stage="enrich")
+        for language, n in self._dropped.items():
+            m.inc("rows_filtered_total", n, reason="language", language=language)
+        _report_sinks(m, self.raw_sinks, "raw", self._seconds)
+        _report_sinks(m, self.enriched_sinks, "enriched", self._seconds)
+        return self.paths
+
+    def discard(self):
+        for sink in self.raw_sinks + self.enriched_sinks:
+            sink.discard()
+
+
+def _report_sinks(metrics, sinks, output: str, seconds: dict = None):
+    """Record rows and bytes written (and write seconds, if timed) of closed sinks."""
+    if not metrics.enabled:
+        return
+    for sink in sinks:
+        fmt = format_for_path(sink.path)
+        if seconds is not None:
+            metrics.observe("stage_seconds", seconds[sink], stage=f"write:{fmt}", output=output)
+        metrics.inc("sink_rows_total", sink.rows, format=fmt, output=output)
+        metrics.inc("sink_bytes_total", os.path.getsize(sink.path), format=fmt, output=output)
+
+
+class _DeltaOutputSet:
+    """Incremental outputs: only rows that `state` reports as new or changed.
+
+    They go to `out/top_videos_delta{suffix}.csv` (staged and renamed into
+    place on close) and, with `history`, are also appended to
+    `out/top_videos_history{suffix}.csv` when `state` is saved.
+    """
+
+    def __init__(self, suffix: str, state: ExportState, fetched_at: str, with_region: bool = False, history: bool = False):
+        self.state = state
+        self.fetched_at = fetched_at
+        self.unchanged = 0
+        headers = (["region"] if with_region else []) + DELTA_HEADERS + RAW_HEADERS
+        self.paths = (os.path.join("out", f"top_videos_delta{suffix}.csv"),)
+        self.sinks = (open_sink(self.paths[0], headers, "csv", atomic=True),)
+        if history:
+            self.paths += (os.path.join("out", f"top_videos_history{suffix}.csv"),)
+            self.sinks += (CsvSink(staging_path(self.paths[1]), headers),)
+        # the appended history file is not replaced, so it is left out
+        self.written = {}
+
+    def write(self, row: dict, index: CategoryIndex):
+        change = self.state.diff(row)
+        if change is None:
+            self.unchanged += 1
+            return
+        row = dict(row, change=change, fetched_at=self.fetched_at)
+        for sink in self.sinks:
+            sink.write(row)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+        for sink, path in zip(self.sinks[1:], self.paths[1:]):
+            self.state.append_on_save(sink.path, path)
+        self.written = {self.sinks[0].path: self.sinks[0].rows}
+        metrics = get_metrics()
+        metrics.inc("rows_filtered_total", self.unchanged, reason="unchanged")
+        _report_sinks(metrics, self.sinks, "delta")
+        return self.paths
+
+    def discard(self):
+        self.sinks[0].discard()
+        for sink in self.sinks[1:]:
+            sink.close()
+            os.unlink(sink.path)
+
+
+def fetch_and_export(
+    categories: str,
+    n: int,
+    lang,
+    days: int,
+    api_key: str = None,
+    mock: bool = False,
+    concurrency: int = 1,
+    client: YouTubeClient = None,
+    region_concurrency: int = 1,
+    combined: bool = False,
+    xlsx_engine: str = None,
+    allowed_langs=None,
+    min_lang_confidence: float = 0.0,
+    incremental: bool = False,
+    state_path: str = None,
+    history: bool = False,
+    min_views_change: float = 0.0,
+    formats=None,
+    history_db: str = None,
+    category_cache: dict = None,
+    xlsx_sheets: str = None,
+    manifest: str = DEFAULT_MANIFEST_PATH,
+    checkpoint_dir: str = None,
+    resume: bool = False,
+):
+    """Fetch the requested categories for one or more regions and write the outputs.
+
+    `lang` is a region code, a comma-separated list of codes or a list.
+    Several regions are fetched `region_concurrency` at a time into
+    per-region files, or with `combined` into one set with a `region`
+    column. Rows stream through enrichment into the sinks. `allowed_langs`
+    and `min_lang_confidence` filter the enriched CSV; `formats` and
+    `xlsx_sheets` shape the raw outputs (see `_OutputSet`).
+
+    `incremental` writes only rows that changed since the state at
+    `state_path` (see `_DeltaOutputSet`). `history_db` records the run in
+    a SQLite snapshot store. `manifest` is the JSON manifest of the
+    outputs (None for none). `checkpoint_dir` saves each chart as it is
+    fetched, and `resume` reuses them after a failed run. `category_cache`
+    keeps each region's category index across calls. Returns the output
+    paths.
+    """
+    if incremental:
+        state = ExportState(state_path or DEFAULT_STATE_PATH, min_views_change)
+        fetched_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        def output_set(suffix, region, with_region=False):
+            return _DeltaOutputSet(suffix, state, fetched_at, with_region=with_region, history=history)
+
+    else:
+
+        def output_set(suffix, region, with_region=False):
+            return _OutputSet(
+                suffix,
+                region,
+                days,
+                with_region=with_region,
+                xlsx_engine=xlsx_engine,
+                allowed_langs=allowed_langs,
+                min_lang_confidence=min_lang_confidence,
+                formats=formats,
+                xlsx_sheets=xlsx_sheets,
+            )
+
+    metrics = get_metrics()
+    cats = [c.strip() for c in categories.split(",")] if categories else ["all"]
+    regions = _parse_regions(lang)
+    multi = len(regions) > 1
+    timings = _RegionTimings(regions)
+    checkpoints = None
+    if checkpoint_dir:
+        checkpoints = Checkpoints(checkpoint_dir, {"n": n, "days": days, "mock": bool(mock)}, resume=resume)
+
+    def plan(region):
+        start = time.perf_counter()
+        try:
+            return (region,) + _resolve_categories(cats, region, api_key, mock, client, category_cache)
+        except Exception as e:
+            if not multi:
+                raise
+            print(f"Skipping region {region}: {e}", file=sys.stderr)
+            return region, CategoryIndex(), []
+        finally:
+            elapsed = time.perf_counter() - start
+            timings.add(region, elapsed)
+            metrics.observe("stage_seconds", elapsed, stage="categories")
+
+    region_workers = max(1, min(region_concurrency, len(regions)))
+    plans = list(_ordered_map(plan, regions, region_workers))
+    indexes = {region: index for region, index, _ in plans}
+    scheduler = None if mock else (client or get_default_client()).scheduler
+    if scheduler is not None:
+        plans = _admit(plans, n, scheduler, checkpoints)
+    rows = _iter_rows(plans, n, days, api_key, mock, client, max(1, concurrency) * region_workers, timings, scheduler, checkpoints)
+    try:
+        # a failed run rolls its partial snapshot back
+        with HistoryStore(history_db) if history_db else nullcontext() as store, metrics.timer("stage_seconds", stage="export"):
+            if store is not None:
+                for region, index in indexes.items():
+                    store.record_categories(region, index.names)
+                rows = store.recording(rows)
+            written = {}
+            paths = _write_outputs(rows, regions, indexes, output_set, multi, combined, timings, written)
+            if manifest:
+                write_manifest(manifest, written)
+    except BaseException:
+        if incremental:
+            # and its history rows are never appended
+            state.discard()
+        raise
+
+    if incremental:
+        state.save()
+    if checkpoints is not None:
+        checkpoints.clear()
+    if multi:
+        timings.report()
+    if scheduler is not None:
+        scheduler.save()
+        scheduler.report()
+    return paths
+
+
+def _write_outputs(rows, regions, indexes, output_set, multi, combined, timings, written):
+    if not multi or combined:
+        out = output_set("", regions[0] if not multi else "multi", with_region=multi)
+        with _discarding(out):
+            for r in rows:
+                out.write(r, indexes[r["region"]])
+        paths = out.close()
+        written.update(out.written)
+        for region in regions:
+            timings.finish(region)
+    else:
+        # rows arrive grouped by region in plan order; one output set is open at a time
+        paths = ()
+        groups = groupby(rows, key=itemgetter("region"))
+        group_region, group_rows = next(groups, (None, ()))
+        for region in regions:
+            out = output_set(f"_{region}", region)
+            with _discarding(out):
+                if group_region == region:
+                    for r in group_rows:
+                        out.write(r, indexes[region])
+                    group_region, group_rows = next(groups, (None, ()))
+            paths += out.close()
+            written.update(out.written)
+            timings.finish(region)
+    return paths
+
+
+@contextmanager
+def _discarding(out):
+    # a run that fails mid-stream leaves the previous outputs in place
+    try:
+        yield
+    except BaseException:
+        out.discard()
+        raise
+
+
+def export_history(days: int, lang, categories: str = None, db_path: str = None, formats=None, limit: int = None):
+    """Write the top videos of the last `days` days from the snapshot store.
+
+    No API calls are made: the snapshots recorded by earlier
+    `fetch_and_export(history_db=...)` runs for the given regions (and
+    categories, unless "all") are aggregated per video and written to
+    `out/top_videos_last_{days}d.*` in each of `formats` (default CSV and
+    XLSX).
+
+    Categories may be ids, names or aliases; names resolve through the
+    category titles recorded with the snapshots, and a category that does
+    not resolve raises ValueError.
+    """
+    regions = _parse_regions(lang)
+    cats = [c.strip() for c in categories.split(",") if c.strip()] if categories else []
+    if "all" in cats:
+        cats = []
+    with HistoryStore(db_path or DEFAULT_DB_PATH) as store:
+        if cats:
+            index = CategoryIndex(store.category_names(regions))
+            ids = [index.resolve(c) for c in cats]
+            unknown = [c for c, cid in zip(cats, ids) if cid is None]
+            if unknown:
+                raise ValueError(f"unknown categories in the snapshot store for {', '.join(regions)}: {', '.join(unknown)}")
+            cats = list(dict.fromkeys(ids))
+        rows = store.top_videos(days, regions=regions, categories=cats, limit=limit)
+    paths = ()
+    for fmt in formats or DEFAULT_FORMATS:
+        path = os.path.join("out", f"top_videos_last_{days}d") + FORMATS[fmt][0]
+        write_rows(path, rows, HISTORY_HEADERS, fmt)
+        paths += (path,)
+    return paths
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeYouTube:
+    """Tiny stand-in for the YouTube Data API v3 served over local HTTP.
+
+    `categories` maps category id -> title, `videos_per_category` is the size of
+    each mostPopular chart, `delay` is added to every response and `fail` lists
+    category ids that answer with HTTP 500. `flaky` maps category id -> number
+    of 503 responses (with `Retry-After: 0`) to send before succeeding.
+    `reject` maps category id -> API error reason (e.g. "quotaExceeded"),
+    answered with HTTP 403 (400 for "keyInvalid").
+    `views` maps video id -> view count, overriding the default `1000 * rank`.
+    With `synthetic` (a `SyntheticCharts`), charts serve its realistic rows
+    instead of the uniform `Video {rank} in {category}` ones.
+    """
+
+    def __init__(self, categories=None, videos_per_category=10, delay=0.0, fail=(), flaky=None, synthetic=None, reject=None):
+        self.categories = categories or {"1": "Film & Animation", "10": "Music", "20": "Gaming"}
+        self.videos_per_category = videos_per_category
+        self.delay = delay
+        self.fail = set(fail)
+        self.flaky = dict(flaky or {})
+        self.reject = dict(reject or {})
+        self.views = {}
+        self.synthetic = synthetic
+        self.requests = []
+        self.connections = set()
+        self.not_modified = 0
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                fake._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handle(self, handler):
+        url = urlparse(handler.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with self._lock:
+            self.requests.append((url.path, params))
+            self.connections.add(handler.client_address)
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+        finally:
+            with self._lock:
+                self.active -= 1
+        endpoint = url.path.rsplit("/", 1)[-1]
+        if endpoint == "videoCategories":
+            body = {"items": [{"id": cid, "snippet": {"title": t}} for cid, t in self.categories.items()]}
+            return self._send(handler, 200, body)
+        if endpoint == "videos" and "id" in params:
+            # statistics lookup by id; ids look like v{category}x{rank}, others are unknown
+            items = []
+            for vid in params["id"].split(","):
+                cid, _, rank = vid[1:].partition("x")
+                if vid.startswith("v") and rank.isdigit():
+                    items.append({"id": vid, "statistics": {"viewCount": str(self.views.get(vid, 1000 * int(rank)))}})
+            return self._send(handler, 200, {"items": items})
+        if endpoint == "videos":
+            cid = params.get("videoCategoryId", "")
+            if cid in self.fail:
+                return self._send(handler, 500, {"error": {"code": 500, "message": "boom"}})
+            if cid in self.reject:
+                status = 400 if self.reject[cid] == "keyInvalid" else 403
+                return self._send(handler, status, {"error": {"code": status, "errors": [{"reason": self.reject[cid]}]}})
+            with self._lock:
+                flaky = self.flaky.get(cid, 0)
+                if flaky:
+                    self.flaky[cid] = flaky - 1
+            if flaky:
+                return self._send(handler, 503, {"error": {"code": 503}}, {"Retry-After": "0"})
+            # page tokens are plain offsets into the chart
+            start = int(params.get("pageToken", 0))
+            end = min(start + int(params.get("maxResults", 5)), self.videos_per_category)
+            body = {"items": [self._video(cid, i, params.get("regionCode", "US")) for i in range(start + 1, end + 1)]}
+            if end < self.videos_per_category:
+                body["nextPageToken"] = str(end)
+            return self._send(handler, 200, body)
+        return self._send(handler, 404, {"error": {"code": 404}})
+
+    def _video(self, cid, i, region="US"):
+        if self.synthetic is not None:
+            return self.synthetic.api_item(cid, i, region)
+        return {
+            "id": f"v{cid}x{i}",
+            "snippet": {
+                "title": f"Video {i} in {cid}",
+                "channelTitle": f"Channel {cid}",
+                "publishedAt": "2024-01-01T00:00:00Z",
+            },
+            "statistics": {"viewCount": str(self.views.get(f"v{cid}x{i}", 1000 * i))},
+        }
+
+    def _send(self, handler, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        if status == 200:
+            etag = '"' + hashlib.md5(data).hexdigest() + '"'
+            if handler.headers.get("If-None-Match") == etag:
+                with self._lock:
+                    self.not_modified += 1
+                handler.send_response(304)
+                handler.send_header("ETag", etag)
+                handler.send_header("Content-Length", "0")
+                handler.end_headers()
+                return
+            headers = dict(headers or {}, ETag=etag)
+        handler.send_response(status)
+        for k, v in (headers or {}).items():
+            handler.send_header(k, v)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
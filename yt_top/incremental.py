@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+DEFAULT_STATE_PATH = os.path.join("out", "top_videos_state.tsv")
+DELTA_HEADERS = ["change", "fetched_at", "video_id"]
+
+
+class ExportState:
+    """What the previous incremental runs exported, one line per chart entry.
+
+    The state file is tab-separated `region, category, video_id, views, rank`.
+    `diff` compares a fetched row against it and returns "new", "changed" or
+    None; `save` rewrites the file atomically. Entries keep the last *emitted*
+    views, so growth below `min_views_change` accumulates until it is reported.
+    Entries for a (region, category) chart fetched this run that no longer
+    appear in it are dropped; charts that were not fetched keep theirs.
+
+    Rows staged with `append_on_save` are appended to their files by `save`,
+    just before the state file is replaced, and taken out again if that
+    fails, so a rerun after a failed run does not add them twice. `discard`
+    drops them.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH, min_views_change: float = 0.0):
+        self.path = path
+        self.min_views_change = min_views_change
+        self._entries = {}
+        self._seen = set()
+        self._charts = set()
+        self._appends = []
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    region, category, vid, views, rank = line.rstrip("\n").split("\t")
+                    self._entries[(region, category, vid)] = (int(views), int(rank))
+        except FileNotFoundError:
+            pass
+
+    def __len__(self):
+        return len(self._entries)
+
+    def diff(self, row: dict) -> Optional[str]:
+        chart = (row.get("region") or "", str(row.get("category") or ""))
+        key = chart + (str(row.get("video_id") or row.get("url") or ""),)
+        views, rank = int(row.get("views") or 0), int(row.get("rank") or 0)
+        self._charts.add(chart)
+        self._seen.add(key)
+        last = self._entries.get(key)
+        if last is None:
+            change = "new"
+        elif last[1] != rank or abs(views - last[0]) > self.min_views_change * last[0]:
+            change = "changed"
+        else:
+            return None
+        self._entries[key] = (views, rank)
+        return change
+
+    def append_on_save(self, staged: str, path: str):
+        """Append the CSV at `staged`, less its header row, to `path` on `save`."""
+        self._appends.append((staged, path))
+
+    def discard(self):
+        for staged, _ in self._appends:
+            os.unlink(staged)
+        self._appends = []
+
+    def save(self):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        sizes = []
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                for key, (views, rank) in self._entries.items():
+                    if key[:2] in self._charts and key not in self._seen:
+                        continue
+                    f.write(f"{key[0]}\t{key[1]}\t{key[2]}\t{views}\t{rank}\n")
+            for staged, path in self._appends:
+                size = os.path.getsize(path) if os.path.exists(path) else None
+                sizes.append((path, size))
+                with open(staged, "rb") as src, open(path, "ab") as dest:
+                    if size:
+                        src.readline()
+                    shutil.copyfileobj(src, dest)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            for path, size in sizes:
+                if size is None:
+                    os.unlink(path)
+                else:
+                    os.truncate(path, size)
+            raise
+        finally:
+            self.discard()
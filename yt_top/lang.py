@@ -0,0 +1,158 @@
+from typing import Iterable, List, Tuple
+
+# Code point ranges per detected language. Latin-1 letters are counted
+# separately.
+SCRIPT_RANGES = {
+    "zh": [(0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xF900, 0xFAFF), (0x3100, 0x312F), (0x31A0, 0x31BF)],
+    "ko": [(0x1100, 0x11FF), (0x3130, 0x318F), (0xA960, 0xA97F), (0xAC00, 0xD7FF)],
+    "ru": [(0x0400, 0x052F)],
+    "ar": [(0x0600, 0x06FF), (0x0750, 0x077F), (0x08A0, 0x08FF)],
+    "hi": [(0x0900, 0x097F)],
+    # kana letters and iteration marks; not the ・ and ー Chinese titles use too
+    "ja": [(0x3041, 0x3096), (0x309D, 0x309F), (0x30A1, 0x30FA), (0x30FD, 0x30FF), (0x31F0, 0x31FF), (0xFF66, 0xFF6F), (0xFF71, 0xFF9D)],
+    "en": [(0x0100, 0x024F), (0x1E00, 0x1EFF)],
+}
+DEFAULT_LANG = "en"
+LANGS = tuple(SCRIPT_RANGES)
+
+# Each 256-code-point block (the high byte of a UTF-16 code unit) maps to
+# one marker byte, so a title's high bytes translated through this table
+# can be tallied with bytes.count() in C. Blocks shared with other scripts
+# (Hebrew next to Cyrillic, Bengali next to Devanagari, CJK punctuation
+# next to kana, ...) map to _MIXED instead: titles using them are first
+# translated code point by code point with _EXACT, which moves each letter
+# of a detected script to a stand-in block of its own (U+E1xx onwards) and
+# deletes everything else in those blocks.
+_MARKERS = {lang: i + 1 for i, lang in enumerate(SCRIPT_RANGES)}
+_MIXED = len(_MARKERS) + 1
+_SEP = 0xE0  # high byte of U+E0xx (private use), the batch separator
+_STAND_IN = {lang: 0xE1 + i for i, lang in enumerate(SCRIPT_RANGES)}
+
+
+def _tables():
+    high = bytearray(256)
+    exact_high = bytearray(256)
+    exact = {}
+    mixed = set()
+    for lang, ranges in SCRIPT_RANGES.items():
+        for lo, hi in ranges:
+            for block in range(lo >> 8, (hi >> 8) + 1):
+                if lo <= block << 8 and (block << 8) + 0xFF <= hi:
+                    high[block] = exact_high[block] = _MARKERS[lang]
+                else:
+                    mixed.add(block)
+    for block in mixed:
+        high[block] = _MIXED
+        exact_high[block] = 0
+        exact.update(dict.fromkeys(range(block << 8, (block + 1) << 8)))
+    for lang, ranges in SCRIPT_RANGES.items():
+        offset = _STAND_IN[lang] << 8
+        for lo, hi in ranges:
+            for block in mixed.intersection(range(lo >> 8, (hi >> 8) + 1)):
+                cps = range(max(lo, block << 8), min(hi, (block << 8) + 0xFF) + 1)
+                exact.update(zip(cps, map(chr, range(offset + (cps[0] & 0xFF), offset + (cps[-1] & 0xFF) + 1))))
+    for lang, block in _STAND_IN.items():
+        # private use characters in the stand-in blocks count for nothing
+        high[block] = _MIXED
+        exact_high[block] = _MARKERS[lang]
+        exact.update(dict.fromkeys(range(block << 8, (block + 1) << 8)))
+    return bytes(high), bytes(exact_high), exact
+
+
+_HIGH, _EXACT_HIGH, _EXACT = _tables()
+_UNMAPPED = bytes(b for b in range(256) if not _HIGH[b])
+_EXACT_UNMAPPED = bytes(b for b in range(256) if not _EXACT_HIGH[b])
+_BATCH_HIGH = _HIGH[:_SEP] + bytes([_SEP]) + _HIGH[_SEP + 1:]
+_BATCH_UNMAPPED = _UNMAPPED.replace(bytes([_SEP]), b"")
+# Latin-1 bytes that are not letters (ASCII letters and U+00C0-U+00FF stay,
+# NUL is kept as the batch separator).
+_NON_LETTERS = bytes(b for b in range(1, 256) if not chr(b).isalpha() or b in (0xAA, 0xB5, 0xBA))
+_LANGS = {marker: lang for lang, marker in _MARKERS.items()}
+_JA, _ZH, _EN = _MARKERS["ja"], _MARKERS["zh"], _MARKERS["en"]
+
+
+def _marks(text: str, table: bytes = _HIGH, unmapped: bytes = _UNMAPPED) -> bytes:
+    # one marker byte per character of a known script, in title order
+    return text.encode("utf-16-be", "surrogatepass")[::2].translate(table, unmapped)
+
+
+def _exact_marks(text: str) -> bytes:
+    return _marks(text.translate(_EXACT), _EXACT_HIGH, _EXACT_UNMAPPED)
+
+
+def _latin(text: str) -> bytes:
+    return text.encode("latin-1", "ignore").translate(None, _NON_LETTERS)
+
+
+def _classify(text: str, marks: bytes, latin: int) -> Tuple[str, float]:
+    if _MIXED in marks:
+        marks = _exact_marks(text)
+        if not marks:
+            return ("en", 1.0) if latin else (DEFAULT_LANG, 0.0)
+    n = len(marks)
+    first = marks[0]
+    if first != _JA and first != _EN and marks.count(first) == n:
+        # the common case: a single non-Latin script
+        return _LANGS[first], n / (n + latin)
+    total = latin
+    kana = 0
+    best, best_count = DEFAULT_LANG, 0
+    for marker in set(marks):
+        count = marks.count(marker)
+        if marker == _EN:
+            latin += count
+        elif marker == _JA:
+            kana = count
+        elif count > best_count:
+            best, best_count = _LANGS[marker], count
+        total += count
+    if kana:
+        # Japanese mixes kana with kanji
+        return "ja", (kana + marks.count(_ZH)) / total
+    if not best_count:
+        return "en", latin / total
+    return best, best_count / total
+
+
+def detect_lang(text: str) -> Tuple[str, float]:
+    """Return (language, confidence) for a title based on the scripts it uses.
+
+    A title containing non-Latin letters gets the language of the most common
+    such script, since the Latin parts of mixed titles are usually names or
+    tags like "Official MV"; kana mark a title as Japanese even when most of
+    it is kanji. Confidence is the share of the title's letters written in
+    the detected script. Pure ASCII titles short-circuit to English, and
+    titles without letters fall back to English with confidence 0.
+    """
+    if not text:
+        return DEFAULT_LANG, 0.0
+    if text.isascii():
+        for ch in text:
+            if ch.isalpha():
+                return "en", 1.0
+        return DEFAULT_LANG, 0.0
+    marks, latin = _marks(text), _latin(text)
+    if marks:
+        return _classify(text, marks, len(latin))
+    return ("en", 1.0) if latin else (DEFAULT_LANG, 0.0)
+
+
+def detect_langs(titles: Iterable[str]) -> List[Tuple[str, float]]:
+    """Batch form of `detect_lang`.
+
+    The titles are joined and encoded, translated and split in a few C-level
+    passes over the whole batch, so only titles with non-Latin characters
+    reach per-title Python code.
+    """
+    titles = [t or "" for t in titles]
+    joined = "\x00".join(titles)
+    if "\ue000" in joined or joined.count("\x00") != len(titles) - 1:
+        # a title contains one of the separators
+        return [detect_lang(t) for t in titles]
+    marks = _marks(joined.replace("\x00", "\ue000"), _BATCH_HIGH, _BATCH_UNMAPPED).split(bytes([_SEP]))
+    latin = _latin(joined).split(b"\x00")
+    en, none = ("en", 1.0), (DEFAULT_LANG, 0.0)
+    return [
+        _classify(t, m, len(n)) if m else en if n else none
+        for t, m, n in zip(titles, marks, latin)
+    ]
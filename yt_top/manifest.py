@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+DEFAULT_MANIFEST_PATH = os.path.join("out", "manifest.json")
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_manifest(path: str, files: dict) -> dict:
+    """Record the data row count, size and SHA-256 of every file in `files`
+    ({path: rows}) in the JSON manifest at `path`, replaced atomically.
+
+    Files are keyed by their path relative to the manifest's directory.
+    Returns the manifest.
+    """
+    return _write(path, {"created_at": None, "files": {}}, files)
+
+
+def update_manifest(path: str, files: dict) -> dict:
+    """Re-record the files in `files` ({path: rows}) in an existing manifest,
+    keeping its other entries."""
+    return _write(path, load_manifest(path), files)
+
+
+def _write(path: str, manifest: dict, files: dict) -> dict:
+    directory = os.path.dirname(path) or "."
+    manifest["created_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    for p, rows in files.items():
+        manifest["files"][_key(directory, p)] = {"rows": rows, "bytes": os.path.getsize(p), "sha256": file_sha256(p)}
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        # mkstemp creates 0600; readable by whoever reads the outputs
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return manifest
+
+
+def load_manifest(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def manifest_entry(manifest: dict, manifest_path: str, path: str):
+    """The entry for `path` in a loaded manifest, or None if it is not listed."""
+    return manifest.get("files", {}).get(_key(os.path.dirname(manifest_path) or ".", path))
+
+
+def manifest_paths(manifest: dict, manifest_path: str):
+    directory = os.path.dirname(manifest_path) or "."
+    return [os.path.join(directory, name) for name in manifest.get("files", {})]
+
+
+def _key(directory: str, path: str) -> str:
+    return os.path.relpath(path, directory).replace(os.sep, "/")
@@ -0,0 +1,144 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+PREFIX = "yt_top_"
+
+
+class Metrics:
+    """Thread-safe counters and timers for one run.
+
+    Series are keyed by name plus label values, e.g.
+    `inc("http_responses_total", endpoint="videos", status=200)`. Timers keep
+    a count, a total and a maximum in seconds. `write_json` and
+    `write_prometheus` (node_exporter textfile format) replace their file
+    atomically. Instrumented code reads the process-wide instance with
+    `get_metrics()`, which is a `NullMetrics` unless `enable()` was called.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timers = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            t = self._timers.get(key)
+            if t is None:
+                self._timers[key] = [1, seconds, seconds]
+            else:
+                t[0] += 1
+                t[1] += seconds
+                t[2] = max(t[2], seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter(self, name: str, **labels) -> float:
+        return self._counters.get((name, tuple(sorted((k, str(v)) for k, v in labels.items()))), 0)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            counters, timers = dict(self._counters), {k: list(v) for k, v in self._timers.items()}
+        out = {"started_at": self.started, "seconds": time.time() - self.started, "counters": {}, "timers": {}}
+        for (name, labels), value in sorted(counters.items()):
+            out["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), (count, total, peak) in sorted(timers.items()):
+            out["timers"].setdefault(name, []).append({"labels": dict(labels), "count": count, "seconds": total, "max_seconds": peak})
+        return out
+
+    def write_json(self, path: str):
+        _atomic_write(path, json.dumps(self.to_dict(), indent=2) + "\n")
+
+    def prometheus(self) -> str:
+        data = self.to_dict()
+        lines = [f"# TYPE {PREFIX}run_seconds gauge", f"{PREFIX}run_seconds {data['seconds']:.6f}"]
+        for name, series in data["counters"].items():
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            lines.extend(f"{PREFIX}{name}{_labels(s['labels'])} {s['value']}" for s in series)
+        for name, series in data["timers"].items():
+            lines.append(f"# TYPE {PREFIX}{name} summary")
+            for s in series:
+                labels = _labels(s["labels"])
+                lines.append(f"{PREFIX}{name}_sum{labels} {s['seconds']:.6f}")
+                lines.append(f"{PREFIX}{name}_count{labels} {s['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        _atomic_write(path, self.prometheus())
+
+
+class NullMetrics:
+    """Stand-in used while metrics are disabled: every call is a no-op."""
+
+    enabled = False
+    _timer = nullcontext()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        pass
+
+    def observe(self, name: str, seconds: float, **labels):
+        pass
+
+    def timer(self, name: str, **labels):
+        return self._timer
+
+
+NULL = NullMetrics()
+_current = NULL
+
+
+def get_metrics():
+    """Return the process-wide metrics, a `NullMetrics` unless enabled."""
+    return _current
+
+
+def enable() -> Metrics:
+    """Start collecting into a fresh `Metrics` and return it."""
+    global _current
+    _current = Metrics()
+    return _current
+
+
+def disable():
+    global _current
+    _current = NULL
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def _atomic_write(path: str, text: str):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        # textfile collectors read *.prom files; never let them see a partial one
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
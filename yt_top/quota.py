@@ -0,0 +1,221 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from .cache import default_cache_dir
+
+try:
+    import fcntl
+except ImportError:
+    # not on Windows: concurrent runs there may lose each other's units
+    fcntl = None
+
+# YouTube Data API units per request; every list call costs 1, search costs 100
+UNIT_COSTS = {"videos": 1, "videoCategories": 1, "search": 100}
+DEFAULT_UNIT_COST = 1
+# the daily quota resets at midnight Pacific time
+QUOTA_TIMEZONE = "America/Los_Angeles"
+# without a daily budget the state file is only a record for later runs, so
+# units are added to it in batches instead of on every request
+SAVE_EVERY = 50
+
+
+def default_state_path() -> str:
+    return os.path.join(default_cache_dir(), "quota.state")
+
+
+class QuotaExceeded(RuntimeError):
+    """Raised instead of sending a request that would exceed a unit budget."""
+
+
+def _quota_day() -> str:
+    try:
+        from zoneinfo import ZoneInfo
+
+        return datetime.now(ZoneInfo(QUOTA_TIMEZONE)).date().isoformat()
+    except Exception:
+        return datetime.utcnow().date().isoformat()
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst` saved."""
+
+    def __init__(self, rate: float, burst: float = None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+class QuotaScheduler:
+    """Gate in front of every API request: unit accounting, budgets and rate.
+
+    Each request is charged `UNIT_COSTS[endpoint]` units before it is sent,
+    retries included, since the API bills failed requests too. A request that
+    would take the run past `run_budget` or the day past `daily_budget`
+    raises `QuotaExceeded` without touching the network. The day's usage is
+    kept in `state_path` (reset at midnight Pacific time) so separate runs
+    share the daily budget: with a `daily_budget`, every request re-reads
+    it and adds its units under a lock, so concurrent runs see each other's
+    usage. Without one, units are added every `SAVE_EVERY` units and by
+    `save`. `rate` (requests per second, with `burst`) adds a token-bucket
+    rate limit.
+
+    The exporter records which (region, category) charts were fetched,
+    failed with an API error or were skipped for lack of budget, and
+    `report` prints all three.
+    """
+
+    def __init__(
+        self,
+        run_budget: int = None,
+        daily_budget: int = None,
+        state_path: str = None,
+        rate: float = None,
+        burst: float = None,
+        costs: dict = None,
+        day=_quota_day,
+    ):
+        self.run_budget = run_budget
+        self.daily_budget = daily_budget
+        self.state_path = state_path
+        self.costs = dict(UNIT_COSTS, **(costs or {}))
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self._day = day
+        self._lock = threading.Lock()
+        self.used_run = 0
+        self.requests = {}
+        self.fetched = []
+        self.failed = []
+        self.skipped = []
+        self.today = day()
+        self._unsaved = 0
+        self.used_today = self._load() if state_path else 0
+
+    def start_run(self):
+        """Reset the per-run budget, counts and chart lists for another run in the same process."""
+        with self._lock:
+            self.used_run = 0
+            self.requests = {}
+            self.fetched = []
+            self.failed = []
+            self.skipped = []
+
+    def cost(self, endpoint: str) -> int:
+        return self.costs.get(endpoint, DEFAULT_UNIT_COST)
+
+    def remaining(self):
+        """Units left before the tighter of the two budgets, or None if unlimited."""
+        left = []
+        if self.run_budget is not None:
+            left.append(self.run_budget - self.used_run)
+        if self.daily_budget is not None:
+            left.append(self.daily_budget - self.used_today)
+        return max(0, min(left)) if left else None
+
+    def acquire(self, endpoint: str):
+        """Charge one request to `endpoint`, then wait for the rate limit."""
+        units = self.cost(endpoint)
+        with self._lock:
+            day = self._day()
+            if day != self.today:
+                self._save()
+                self.today, self.used_today = day, 0
+            if self.daily_budget is not None and self.state_path:
+                with self._locked():
+                    self.used_today = self._load()
+                    self._charge(endpoint, units)
+                    self._write()
+            else:
+                self._charge(endpoint, units)
+                if self._unsaved >= SAVE_EVERY:
+                    self._save()
+        if self.bucket is not None:
+            self.bucket.acquire()
+
+    def _charge(self, endpoint: str, units: int):
+        left = self.remaining()
+        if left is not None and units > left:
+            raise QuotaExceeded(f"quota budget exhausted: {endpoint} needs {units} units, {left} left")
+        self.used_run += units
+        self.used_today += units
+        self._unsaved += units
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    def save(self):
+        """Add the units not yet recorded to the state file."""
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        if not self.state_path or not self._unsaved:
+            return
+        with self._locked():
+            # other runs may have added units since this one last read the file
+            self.used_today = self._load() + self._unsaved
+            self._write()
+
+    def _load(self) -> int:
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            return int(state.get("units", 0)) if state.get("day") == self.today else 0
+        except (OSError, ValueError):
+            return 0
+
+    @contextmanager
+    def _locked(self):
+        directory = os.path.dirname(self.state_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        # a separate lock file: the state file itself is replaced on every write
+        with open(self.state_path + ".lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _write(self):
+        directory = os.path.dirname(self.state_path) or "."
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"day": self.today, "units": self.used_today}, f)
+        os.replace(tmp, self.state_path)
+        self._unsaved = 0
+
+    def report(self, file=None):
+        file = file or sys.stderr
+        budgets = []
+        if self.run_budget is not None:
+            budgets.append(f"run budget {self.run_budget}")
+        if self.daily_budget is not None:
+            budgets.append(f"{self.used_today}/{self.daily_budget} used today")
+        calls = ", ".join(f"{n} {endpoint}" for endpoint, n in sorted(self.requests.items()))
+        print(f"Quota: {self.used_run} units this run ({calls or 'no requests'})" + (f"; {', '.join(budgets)}" if budgets else ""), file=file)
+        print(f"  fetched: {len(self.fetched)} charts", file=file)
+        if self.failed:
+            failed = ", ".join(f"{region}/{category}" for region, category in self.failed)
+            print(f"  failed (API errors): {failed}", file=file)
+        if self.skipped:
+            skipped = ", ".join(f"{region}/{category}" for region, category in self.skipped)
+            print(f"  not fetched (budget exhausted): {skipped}", file=file)
@@ -0,0 +1,96 @@
+import os
+import time
+from typing import List
+from urllib.parse import parse_qs, urlparse
+
+from .convert import convert_file, output_path
+from .exporter import fetch_video_statistics
+from .manifest import DEFAULT_MANIFEST_PATH, load_manifest, manifest_entry, update_manifest
+from .sinks import format_for_path, open_sink, read_rows
+from .store import HistoryStore
+from .verifier import _sheet_count
+
+ID_COLUMNS = ("video_id", "url", "video_url")
+
+
+def video_id_from_url(url: str):
+    """The `v` parameter of a youtube.com/watch URL (or the path of a youtu.be link)."""
+    if not url:
+        return None
+    parsed = urlparse(url)
+    if parsed.netloc.endswith("youtu.be"):
+        return parsed.path.strip("/") or None
+    ids = parse_qs(parsed.query).get("v")
+    return ids[0] if ids else None
+
+
+def _row_video_id(row: dict):
+    if row.get("video_id"):
+        return str(row["video_id"])
+    return video_id_from_url(row.get("url")) or video_id_from_url(row.get("video_url"))
+
+
+def refresh_export(path: str, api_key: str, client=None, concurrency: int = 1) -> int:
+    """Update the `views` column of an existing export in place.
+
+    Video ids come from the `video_id`, `url` or `video_url` column. The
+    file (CSV, compressed CSV or JSON Lines) is read twice, once for the ids
+    and once to stream the refreshed rows into a staged copy that replaces
+    it. When the exporter's manifest lists the file, its entry is updated,
+    and so is the XLSX written from the same rows, which is rebuilt from
+    the refreshed file; a workbook split into sheets cannot be, so such
+    files are refused. Returns the number of rows whose views were
+    refreshed.
+    """
+    fmt = format_for_path(path)
+    headers, rows = read_rows(path, fmt)
+    if "views" not in headers or not any(c in headers for c in ID_COLUMNS):
+        rows.close()
+        raise ValueError(f"{path} has no views column or no video id/url column")
+    manifest_path = os.path.join(os.path.dirname(path), os.path.basename(DEFAULT_MANIFEST_PATH))
+    manifest = load_manifest(manifest_path) if os.path.isfile(manifest_path) else None
+    workbook = None
+    if manifest is not None and manifest_entry(manifest, manifest_path, path) is not None:
+        workbook = output_path(path)
+        if manifest_entry(manifest, manifest_path, workbook) is None:
+            workbook = None
+        elif _sheet_count(workbook) > 1:
+            rows.close()
+            raise ValueError(f"{workbook} is split into sheets and cannot be rebuilt; export again instead")
+    views = fetch_video_statistics((_row_video_id(r) for r in rows), api_key, client=client, concurrency=concurrency)
+
+    updated = 0
+    headers, rows = read_rows(path, fmt)
+    with open_sink(path, headers, fmt, atomic=True) as sink:
+        for r in rows:
+            vid = _row_video_id(r)
+            if vid in views:
+                r["views"] = views[vid]
+                updated += 1
+            sink.write(r)
+    if manifest is not None and manifest_entry(manifest, manifest_path, path) is not None:
+        written = {path: sink.rows}
+        if workbook is not None:
+            written[workbook] = convert_file(path, workbook)
+        update_manifest(manifest_path, written)
+    return updated
+
+
+def refresh_history(db_path: str, api_key: str, days: int = None, regions: List[str] = None, client=None, concurrency: int = 1) -> int:
+    """Record fresh views for the videos in the snapshot store.
+
+    The latest entry of every chart video seen in the last `days` days is
+    copied into a new snapshot with its current views (rank and metadata are
+    kept), so `--from-history` view velocity covers the refresh. Returns the
+    number of entries recorded.
+    """
+    with HistoryStore(db_path) as store:
+        entries = store.latest_entries(days, regions)
+        views = fetch_video_statistics((e["video_id"] for e in entries), api_key, client=client, concurrency=concurrency)
+        fetched_at = int(time.time())
+        updated = 0
+        for e in entries:
+            if e["video_id"] in views:
+                store.add(dict(e, views=views[e["video_id"]]), fetched_at)
+                updated += 1
+    return updated
@@ -0,0 +1,126 @@
+import sys
+from dataclasses import dataclass, fields
+from operator import attrgetter
+from typing import Iterable
+
+intern = sys.intern
+
+
+class Record:
+    """Mapping-style access to a slotted row record.
+
+    Rows used to be dicts, so records also answer `row[key]`, `row.get(key)`,
+    `key in row`, `keys()` and `dict(row)`; writers read them through
+    `row_values` instead, which uses one `attrgetter` per header list.
+    """
+
+    __slots__ = ()
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def keys(self):
+        return self.__slots__
+
+    def to_dict(self) -> dict:
+        return {f: getattr(self, f) for f in self.__slots__}
+
+
+@dataclass(slots=True)
+class VideoRow(Record):
+    """One fetched chart entry; `category` and `channel` are interned by `video_row`."""
+
+    category: str
+    rank: int
+    video_id: str
+    title: str
+    channel: str
+    views: int
+    url: str
+    published_at: str
+    region: str = None
+
+
+@dataclass(slots=True)
+class EnrichedRow(Record):
+    """A `VideoRow` with its category resolved and its title's language detected."""
+
+    region: str
+    category_id: str
+    category_name: str
+    title: str
+    channel: str
+    views: int
+    language: str
+    language_confidence: float
+    published_at: str
+    video_url: str
+
+
+def video_row(category: str, rank: int, video_id: str, title: str, channel: str, views: int, url: str, published_at: str, region: str = None) -> VideoRow:
+    # a chart repeats a handful of categories and channels across many rows
+    return VideoRow(
+        intern(category) if category else category,
+        rank,
+        video_id,
+        title,
+        intern(channel) if channel else channel,
+        views,
+        url,
+        published_at,
+        region,
+    )
+
+
+def as_video_row(row) -> VideoRow:
+    """`row` as a `VideoRow`; dicts (e.g. read back from a file) are converted."""
+    if type(row) is VideoRow:
+        return row
+    return video_row(*(row.get(f.name) for f in fields(VideoRow)))
+
+
+def row_values(headers: Iterable[str]):
+    """Return a function giving a row's values for `headers`, in order.
+
+    Records of a type that has every header are read with one `attrgetter`;
+    anything else (dicts, records missing a header) goes through `get`, so
+    missing keys give None.
+    """
+    headers = tuple(headers)
+    getters = {}
+
+    def by_get(row):
+        return [row.get(h) for h in headers]
+
+    def values(row):
+        get = getters.get(type(row))
+        if get is None:
+            get = getters[type(row)] = _getter(type(row), headers) or by_get
+        return get(row)
+
+    return values
+
+
+def _getter(cls, headers: tuple):
+    if not issubclass(cls, Record) or not headers:
+        return None
+    names = {f.name for f in fields(cls)}
+    if not names.issuperset(headers):
+        return None
+    if len(headers) == 1:
+        get = attrgetter(headers[0])
+        return lambda row: (get(row),)
+    return attrgetter(*headers)
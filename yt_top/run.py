@@ -1,38 +1,261 @@
 import argparse
 import os
-from dotenv import load_dotenv
-from . import exporter
+import sys
+import threading
+from . import exporter, metrics, refresh, serve
+from .cache import ResponseCache, default_cache_dir
+from .checkpoint import DEFAULT_CHECKPOINT_DIR
+from .client import YouTubeClient
+from .quota import QuotaScheduler, default_state_path
+from .sinks import DEFAULT_FORMATS, DEFAULT_XLSX_ENGINE, FORMAT_REQUIRES, FORMATS, XLSX_ENGINES, format_available
 
 
 def build_parser():
     p = argparse.ArgumentParser(description="YouTube Top Videos exporter")
     p.add_argument("--categories", default="all", help="Comma-separated categories (names or ids)")
-    p.add_argument("--n", type=int, default=5, help="Top N per category")
-    p.add_argument("--lang", default="US", help="Region/language code (used as regionCode)")
-    p.add_argument("--days", type=int, default=7, help="Time window in days (informational)")
+    p.add_argument("--n", type=int, default=5, help="Top N per category (pages past 50 are followed automatically)")
+    p.add_argument("--lang", default=None, help="Region/language code (used as regionCode, default US); comma-separate for several regions")
+    p.add_argument("--regions-file", default=None, help="File with one region code per line (# comments allowed), added to --lang")
+    p.add_argument("--region-concurrency", type=int, default=4, help="Number of regions fetched in parallel")
+    p.add_argument("--max-in-flight", type=int, default=None, help="Global cap on concurrent API requests across all regions (default 8, or 64 with --backend async)")
+    p.add_argument("--backend", choices=["sync", "async"], default="sync", help="API fetch engine: thread pool (default) or asyncio with HTTP/2 multiplexing (needs httpx)")
+    p.add_argument("--combined", action="store_true", help="Write all regions to one set of files with a region column")
+    p.add_argument("--days", type=int, default=7, help="Time window in days for --from-history (also used in the enriched CSV name)")
     p.add_argument("--mock", action="store_true", help="Run in mock mode (no API calls)")
+    p.add_argument("--concurrency", type=int, default=4, help="Number of categories fetched in parallel")
+    p.add_argument("--api-base", default=None, help="YouTube Data API base URL (default: $YOUTUBE_API_BASE or the public API)")
+    p.add_argument("--retries", type=int, default=4, help="Retries per request on 429/5xx and connection errors")
+    p.add_argument("--cache-dir", default=None, help="Directory for cached API responses (default: ~/.cache/yt_top)")
+    p.add_argument("--no-cache", action="store_true", help="Always hit the API; do not read or write the response cache")
+    p.add_argument("--chart-ttl", type=int, default=600, help="Seconds a cached mostPopular chart is reused without revalidation")
+    p.add_argument("--cache-max-mb", type=int, default=64, help="Response cache size cap in MB (least recently used entries are evicted)")
+    p.add_argument("--quota-run", type=int, default=None, help="API units this run may spend (categories listed first are fetched first)")
+    p.add_argument("--quota-day", type=int, default=None, help="API units all runs may spend per day (the API default is 10000)")
+    p.add_argument("--quota-state", default=None, help="File tracking today's API unit usage (default in the cache directory)")
+    p.add_argument("--rate", type=float, default=None, help="Maximum API requests per second (token bucket)")
+    p.add_argument("--burst", type=float, default=None, help="Requests allowed in a burst above --rate (default: --rate)")
+    p.add_argument("--xlsx-engine", choices=XLSX_ENGINES, default=DEFAULT_XLSX_ENGINE, help="XLSX writer: builtin streaming writer or openpyxl write-only mode")
+    p.add_argument("--xlsx-sheets", choices=["single", "category", "region"], default="single", help="XLSX layout: one sheet, or one sheet per category or per region (region needs --combined) after a summary sheet")
+    p.add_argument("--format", default=",".join(DEFAULT_FORMATS), help=f"Comma-separated output formats: {', '.join(FORMATS)} (enriched rows use the same formats except xlsx)")
+    p.add_argument("--langs", default=",".join(exporter.ALLOWED_LANG_PREFIX), help="Comma-separated language prefixes kept in the enriched CSV (default all of en, zh, ja, ko, ru, ar, hi)")
+    p.add_argument("--min-lang-confidence", type=float, default=0.0, help="Drop enriched rows whose language detection confidence is below this (0-1)")
+    p.add_argument("--incremental", action="store_true", help="Write only videos that are new or changed since the last incremental run to out/top_videos_delta*.csv")
+    p.add_argument("--state-file", default=None, help="State file for --incremental (default out/top_videos_state.tsv)")
+    p.add_argument("--history", action="store_true", help="With --incremental, also append the delta rows to out/top_videos_history*.csv")
+    p.add_argument("--min-views-change", type=float, default=0.0, help="With --incremental, ignore views changes up to this fraction (e.g. 0.05)")
+    p.add_argument("--history-db", default=None, help=f"Record every run's chart snapshot in this SQLite file (--from-history reads {exporter.DEFAULT_DB_PATH} by default)")
+    p.add_argument("--from-history", action="store_true", help="Write the top videos of the last --days days from the snapshot store to out/top_videos_last_{days}d.* without calling the API")
+    p.add_argument("--refresh", action="append", metavar="PATH", help="Update the views of an existing CSV/JSONL export in place with 50-id videos.list statistics calls (repeatable)")
+    p.add_argument("--refresh-history", action="store_true", help="Record fresh views for the videos of the last --days days in the snapshot store")
+    p.add_argument("--limit", type=int, default=None, help="With --from-history, keep only the N most viewed videos")
+    p.add_argument("--serve", action="store_true", help="Stay resident and export on a schedule (every 15m unless --every is given); stops on SIGTERM/SIGINT")
+    p.add_argument("--every", default=None, metavar="INTERVAL", help="Interval between scheduled exports, e.g. 90s, 15m, 1h (implies --serve)")
+    p.add_argument("--jitter", type=float, default=0.1, help="With --serve, delay each run by up to this fraction of the interval (default 0.1)")
+    p.add_argument("--resume", action="store_true", help="Continue a failed run: reuse the charts it saved in --checkpoint-dir and fetch only the missing ones")
+    p.add_argument("--checkpoint-dir", default=DEFAULT_CHECKPOINT_DIR, help=f"Where each fetched chart is saved until the outputs are written (default {DEFAULT_CHECKPOINT_DIR})")
+    p.add_argument("--metrics-json", default=None, metavar="PATH", help="Write per-stage timings, HTTP/retry counters and rows/bytes written to this JSON file")
+    p.add_argument("--metrics-prom", default=None, metavar="PATH", help="Write the same metrics as a Prometheus textfile (e.g. for node_exporter's textfile collector)")
     return p
 
 
+def read_regions_file(path):
+    regions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            code = line.split("#", 1)[0].strip()
+            if code:
+                regions.append(code)
+    return regions
+
+
+def _httpx_available() -> bool:
+    from .aio import available
+
+    return available()
+
+
 def main(argv=None):
-    load_dotenv()
     parser = build_parser()
     args = parser.parse_args(argv)
+    if not (args.metrics_json or args.metrics_prom):
+        return _run(parser, args)
+    # written even when the run fails, which is when they are most useful
+    metrics.enable()
+    try:
+        return _run(parser, args)
+    finally:
+        _write_metrics(args)
+        metrics.disable()
+
+
+def _write_metrics(args):
+    collected = metrics.get_metrics()
+    if not collected.enabled:
+        return
+    if args.metrics_json:
+        collected.write_json(args.metrics_json)
+    if args.metrics_prom:
+        collected.write_prometheus(args.metrics_prom)
+
+
+def _run(parser, args):
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.max_in_flight is None:
+        args.max_in_flight = 64 if args.backend == "async" else 8
+    if args.region_concurrency < 1 or args.max_in_flight < 1:
+        parser.error("--region-concurrency and --max-in-flight must be at least 1")
+    if not 0.0 <= args.min_lang_confidence <= 1.0:
+        parser.error("--min-lang-confidence must be between 0 and 1")
+    for name in ("quota_run", "quota_day", "rate", "burst"):
+        value = getattr(args, name)
+        if value is not None and value <= 0:
+            parser.error(f"--{name.replace('_', '-')} must be positive")
+    if args.min_views_change < 0:
+        parser.error("--min-views-change must not be negative")
+    if (args.history or args.state_file) and not args.incremental:
+        parser.error("--history and --state-file require --incremental")
+    formats = [x.strip() for x in args.format.split(",") if x.strip()]
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown or not formats:
+        parser.error(f"--format must list formats from: {', '.join(FORMATS)}")
+    for f in formats:
+        if not format_available(f):
+            parser.error(f"--format {f} requires the {FORMAT_REQUIRES[f]} package")
+    if args.backend == "async" and not args.mock and not _httpx_available():
+        parser.error("--backend async requires the httpx package (pip install httpx, plus h2 for HTTP/2)")
+    langs = [x.strip() for x in args.langs.split(",") if x.strip()]
+    if not langs:
+        parser.error("--langs must name at least one language")
+    serving = args.serve or args.every is not None
+    every = None
+    if serving:
+        try:
+            every = serve.parse_interval(args.every or "15m")
+        except ValueError as e:
+            parser.error(f"--every: {e}")
+        if not 0.0 <= args.jitter <= 1.0:
+            parser.error("--jitter must be between 0 and 1")
+        if args.from_history or args.refresh or args.refresh_history:
+            parser.error("--serve cannot be combined with --from-history, --refresh or --refresh-history")
+
+    regions = [c.strip() for c in (args.lang or "").split(",") if c.strip()]
+    if args.regions_file:
+        try:
+            regions.extend(read_regions_file(args.regions_file))
+        except OSError as e:
+            parser.error(f"cannot read --regions-file: {e}")
+    explicit_regions = regions
+    regions = regions or [exporter.DEFAULT_REGION]
+
+    if args.from_history:
+        if args.days < 1:
+            parser.error("--days must be at least 1")
+        try:
+            results = exporter.export_history(args.days, regions, args.categories, args.history_db, formats=formats, limit=args.limit)
+        except ValueError as e:
+            parser.error(f"--categories: {e}")
+        print("Wrote:", *results)
+        return
 
-    api_key = os.getenv("YOUTUBE_API_KEY")
     mock = args.mock
+    if not mock:
+        # .env only matters when calling the API, so --mock runs skip loading dotenv
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    api_key = os.getenv("YOUTUBE_API_KEY")
 
     if not mock and not api_key:
         parser.error("YOUTUBE_API_KEY not set in environment. Set it or run with --mock.")
+    refreshing = args.refresh or args.refresh_history
+    if refreshing and mock:
+        parser.error("--refresh and --refresh-history need the API; they cannot run with --mock")
+
+    client = None
+    if not mock:
+        # one pooled session for the whole run, sized so every worker can hold a connection
+        cache = None
+        if not args.no_cache:
+            cache = ResponseCache(
+                args.cache_dir or default_cache_dir(),
+                ttls={"videos": args.chart_ttl},
+                max_bytes=args.cache_max_mb * 1024 * 1024,
+            )
+        scheduler = QuotaScheduler(
+            run_budget=args.quota_run,
+            daily_budget=args.quota_day,
+            state_path=args.quota_state or default_state_path(),
+            rate=args.rate,
+            burst=args.burst,
+        )
+        if args.backend == "async":
+            from .aio import AsyncYouTubeClient
+
+            # HTTP/2 multiplexes the in-flight requests over a few connections
+            client = AsyncYouTubeClient(
+                base_url=args.api_base,
+                max_in_flight=args.max_in_flight,
+                max_retries=args.retries,
+                cache=cache,
+                scheduler=scheduler,
+            )
+        else:
+            client = YouTubeClient(
+                base_url=args.api_base,
+                pool_size=max(10, args.max_in_flight),
+                max_in_flight=args.max_in_flight,
+                max_retries=args.retries,
+                cache=cache,
+                scheduler=scheduler,
+            )
 
-    results = exporter.fetch_and_export(
+    if refreshing:
+        for path in args.refresh or ():
+            try:
+                updated = refresh.refresh_export(path, api_key, client=client, concurrency=args.concurrency)
+            except (OSError, ValueError) as e:
+                parser.error(f"cannot refresh {path}: {e}")
+            print(f"Refreshed {updated} rows in {path}")
+        if args.refresh_history:
+            db = args.history_db or exporter.DEFAULT_DB_PATH
+            updated = refresh.refresh_history(db, api_key, args.days, explicit_regions or None, client=client, concurrency=args.concurrency)
+            print(f"Recorded fresh views for {updated} entries in {db}")
+        client.scheduler.save()
+        client.scheduler.report()
+        return
+
+    export_args = dict(
         categories=args.categories,
         n=args.n,
-        lang=args.lang,
+        lang=regions,
         days=args.days,
         api_key=api_key,
         mock=mock,
+        concurrency=args.concurrency,
+        client=client,
+        region_concurrency=args.region_concurrency,
+        combined=args.combined,
+        xlsx_engine=args.xlsx_engine,
+        allowed_langs=langs,
+        min_lang_confidence=args.min_lang_confidence,
+        incremental=args.incremental,
+        state_path=args.state_file,
+        history=args.history,
+        min_views_change=args.min_views_change,
+        formats=formats,
+        history_db=args.history_db,
+        xlsx_sheets=None if args.xlsx_sheets == "single" else args.xlsx_sheets,
+        checkpoint_dir=args.checkpoint_dir,
+        resume=args.resume,
     )
+    if serving:
+        return _serve(args, client, export_args, every)
+    try:
+        results = exporter.fetch_and_export(**export_args)
+    finally:
+        if client is not None:
+            client.close()
     # fetch_and_export may return (csv, xlsx) or (csv, xlsx, enriched_csv)
     if isinstance(results, tuple) or isinstance(results, list):
         print("Wrote:", *results)
@@ -40,5 +263,29 @@ def main(argv=None):
         print("Wrote:", results)
 
 
+def _serve(args, client, export_args, every):
+    """Export every `every` seconds, keeping the client's connection pool and the
+    category indexes warm between runs; returns after SIGTERM/SIGINT."""
+    category_cache = {}
+
+    def export_once():
+        if metrics.get_metrics().enabled:
+            metrics.enable()
+        if client is not None:
+            client.scheduler.start_run()
+        try:
+            results = exporter.fetch_and_export(**export_args, category_cache=category_cache)
+            print("Wrote:", *results, flush=True)
+        finally:
+            _write_metrics(args)
+
+    print(f"Serving: exporting every {every:g}s (Ctrl-C or SIGTERM to stop)", file=sys.stderr)
+    with serve.stop_on_signals(threading.Event()) as stop:
+        runs = serve.serve(export_once, every, args.jitter, stop)
+    if client is not None:
+        client.close()
+    print(f"Stopped after {runs} runs", file=sys.stderr)
+
+
 if __name__ == "__main__":
     main()
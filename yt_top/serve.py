@@ -0,0 +1,67 @@
+import random
+import re
+import signal
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+_INTERVAL = re.compile(r"(\d+(?:\.\d+)?)([smhd]?)")
+_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_interval(text: str) -> float:
+    """Seconds in an interval like "900", "90s", "15m", "1h" or "1d"."""
+    m = _INTERVAL.fullmatch(text.strip().lower())
+    if not m or float(m.group(1)) <= 0:
+        raise ValueError(f"invalid interval {text!r} (use e.g. 90s, 15m, 1h)")
+    return float(m.group(1)) * _UNITS[m.group(2)]
+
+
+@contextmanager
+def stop_on_signals(stop: threading.Event, signals=(signal.SIGTERM, signal.SIGINT)):
+    """Set `stop` on SIGTERM/SIGINT while the block runs; a second signal aborts."""
+
+    def handle(signum, frame):
+        if stop.is_set():
+            raise KeyboardInterrupt
+        print(f"Received {signal.Signals(signum).name}, stopping after the current run", file=sys.stderr)
+        stop.set()
+
+    previous = {s: signal.signal(s, handle) for s in signals}
+    try:
+        yield stop
+    finally:
+        for s, handler in previous.items():
+            signal.signal(s, handler)
+
+
+def serve(job, every: float, jitter: float = 0.1, stop: threading.Event = None, max_runs: int = None, clock=time.monotonic, rng=random.random):
+    """Call `job()` every `every` seconds until `stop` is set; return the number of runs.
+
+    The first run starts immediately. Later runs follow a fixed grid, so a
+    slow run does not push the schedule back. Each run is delayed by a random
+    jitter of up to `jitter * every` seconds, which spreads several instances
+    over time. Slots missed by a run that took longer than `every` are
+    skipped. A failing run is logged and does not stop the loop. `stop` is
+    only checked between runs, so a run in progress always completes.
+    """
+    stop = stop or threading.Event()
+    runs = 0
+    start = clock()
+    slot = 0
+    while not stop.is_set():
+        delay = start + slot * every + (rng() * jitter * every if slot else 0.0) - clock()
+        if delay > 0 and stop.wait(delay):
+            break
+        try:
+            job()
+        except Exception:
+            print("Run failed:", file=sys.stderr)
+            traceback.print_exc()
+        runs += 1
+        if max_runs is not None and runs >= max_runs:
+            break
+        slot = max(slot + 1, int((clock() - start) // every) + 1)
+    return runs
@@ -0,0 +1,441 @@
+import csv
+import gzip
+import io
+import json
+import os
+from datetime import datetime
+from typing import Iterable, List
+
+from .rows import row_values
+from .xlsx import (
+    LINK_COLUMNS,
+    NUMERIC_COLUMNS,
+    SUMMARY_HEADERS,
+    SUMMARY_SHEET,
+    SheetSummary,
+    StreamingXlsxWriter,
+    sheet_name,
+    strip_illegal,
+)
+
+XLSX_ENGINES = ("builtin", "openpyxl")
+DEFAULT_XLSX_ENGINE = "builtin"
+DEFAULT_BATCH_ROWS = 1000
+TIMESTAMP_COLUMNS = {"published_at", "fetched_at"}
+
+
+class Sink:
+    """Push-style writer interface shared by every output format.
+
+    Subclasses implement `write(row)` and `close()`; rows are dicts and keys
+    outside `headers` are ignored.
+    """
+
+    path: str
+    headers: List[str]
+    rows: int = 0
+
+    def write(self, row: dict):
+        raise NotImplementedError
+
+    def write_many(self, rows: Iterable[dict]):
+        for r in rows:
+            self.write(r)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _open_text(path: str, mode: str, compression: str = None):
+    # text stream for mode "r", "w" or "a", optionally gzip or zstd compressed
+    if compression is None:
+        return open(path, mode, newline="", encoding="utf-8")
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", newline="", encoding="utf-8")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd output requires the zstandard package") from None
+        if mode == "r":
+            raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        else:
+            raw = zstandard.ZstdCompressor().stream_writer(open(path, mode + "b"), closefd=True)
+        return io.TextIOWrapper(raw, newline="", encoding="utf-8")
+    raise ValueError(f"unknown compression {compression!r}")
+
+
+class CsvSink(Sink):
+    """Push-style CSV writer: rows are written one at a time as they arrive.
+
+    Missing keys are written as empty cells and keys outside `headers` are
+    ignored, so raw and enriched rows can share one implementation. With
+    `append` rows are added to an existing file and the header is only
+    written when the file is new or empty. `compression` is None, "gzip" or
+    "zstd" (the latter needs the optional zstandard package).
+    """
+
+    def __init__(self, path: str, headers: List[str], append: bool = False, compression: str = None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.headers = headers
+        self.rows = 0
+        new = not append or not os.path.exists(path) or not os.path.getsize(path)
+        self._f = _open_text(path, "a" if append else "w", compression)
+        self._w = csv.writer(self._f)
+        self._values = row_values(headers)
+        if new:
+            self._w.writerow(headers)
+
+    def write(self, row: dict):
+        self._w.writerow(self._values(row))
+        self.rows += 1
+
+    def write_many(self, rows: Iterable[dict]):
+        rows = list(map(self._values, rows))
+        self._w.writerows(rows)
+        self.rows += len(rows)
+
+    def close(self):
+        self._f.close()
+
+
+class JsonlSink(Sink):
+    """JSON Lines writer: one object per row with the `headers` keys in order.
+
+    Numbers keep their type; rows are serialized and written in chunks of
+    `batch_rows`.
+    """
+
+    def __init__(self, path: str, headers: List[str], batch_rows: int = DEFAULT_BATCH_ROWS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.headers = headers
+        self.rows = 0
+        self.batch_rows = batch_rows
+        self._buf = []
+        self._encode = json.JSONEncoder(ensure_ascii=False, default=str).encode
+        self._values = row_values(headers)
+        self._f = open(path, "w", encoding="utf-8", newline="\n")
+
+    def write(self, row: dict):
+        self._buf.append(dict(zip(self.headers, self._values(row))))
+        self.rows += 1
+        if len(self._buf) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        if self._buf:
+            encode = self._encode
+            self._f.write("\n".join(map(encode, self._buf)) + "\n")
+            self._buf = []
+
+    def close(self):
+        self._flush()
+        self._f.close()
+
+
+def _to_int(v):
+    if v is None or v == "":
+        return None
+    return int(v)
+
+
+def _to_timestamp(v):
+    if not v:
+        return None
+    if isinstance(v, datetime):
+        return v
+    return datetime.fromisoformat(v)
+
+
+class ParquetSink(Sink):
+    """Columnar Parquet writer built on the optional pyarrow package.
+
+    `rank` and `views` are stored as int64 and timestamp columns as UTC
+    timestamps, so readers get typed columns back. Rows are buffered and
+    written as one row group chunk per `batch_rows` rows.
+    """
+
+    def __init__(self, path: str, headers: List[str], batch_rows: int = DEFAULT_BATCH_ROWS):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("parquet output requires the pyarrow package") from None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.headers = headers
+        self.rows = 0
+        self.batch_rows = batch_rows
+        self._pa = pa
+        fields, self._convert = [], []
+        for h in headers:
+            if h in NUMERIC_COLUMNS:
+                fields.append((h, pa.int64()))
+                self._convert.append(_to_int)
+            elif h in TIMESTAMP_COLUMNS:
+                fields.append((h, pa.timestamp("s", tz="UTC")))
+                self._convert.append(_to_timestamp)
+            else:
+                fields.append((h, pa.string()))
+                self._convert.append(None)
+        self._schema = pa.schema(fields)
+        self._values = row_values(headers)
+        self._buf = []
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, row: dict):
+        self._buf.append(self._values(row))
+        self.rows += 1
+        if len(self._buf) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self._buf:
+            return
+        columns = {}
+        for h, convert, values in zip(self.headers, self._convert, zip(*self._buf)):
+            if convert is not None:
+                values = [convert(v) for v in values]
+            else:
+                values = [None if v is None else str(v) for v in values]
+            columns[h] = values
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+        self._buf = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+class XlsxSink(Sink):
+    """Push-style XLSX writer with a hyperlink on every URL cell.
+
+    `engine="builtin"` (the default) streams the sheet XML straight into the zip
+    with `xlsx.StreamingXlsxWriter`; `engine="openpyxl"` uses openpyxl's
+    write-only workbook and falls back to the builtin writer when openpyxl is
+    not installed.
+
+    `sheets` ("category" or "region") writes one sheet per value of that
+    column, named by `sheet_title(value)`, after a summary sheet with totals.
+    """
+
+    def __init__(self, path: str, headers: List[str], engine: str = None, sheets: str = None, sheet_title=None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.headers = headers
+        self.rows = 0
+        self._wb = None
+        self._summary_ws = None
+        self._values = row_values(headers)
+        if sheets is not None and sheets not in headers:
+            raise ValueError(f"cannot split sheets by {sheets!r}: not one of the columns")
+        if (engine or DEFAULT_XLSX_ENGINE) == "openpyxl":
+            try:
+                from openpyxl import Workbook
+                from openpyxl.cell import WriteOnlyCell
+                from openpyxl.styles import Font
+            except Exception:
+                pass
+            else:
+                self._cell = WriteOnlyCell
+                self._font = Font(color="0000FF", underline="single")
+                self._wb = Workbook(write_only=True)
+                self._links = frozenset(i for i, h in enumerate(headers) if h in LINK_COLUMNS)
+                if sheets is None:
+                    self._ws = self._wb.create_sheet("Sheet1")
+                    self._ws.append(headers)
+                else:
+                    # write-only sheets stay in creation order, so the
+                    # summary is created first and filled in on close
+                    self._split = headers.index(sheets)
+                    self._sheet_title = sheet_title or str
+                    self._summary_ws = self._wb.create_sheet(SUMMARY_SHEET)
+                    self._summary = SheetSummary(headers)
+                    self._sheets = {}
+                    self._names = {}
+                    self._used = {SUMMARY_SHEET.lower()}
+                return
+        self._writer = StreamingXlsxWriter(path, headers, split_by=sheets, sheet_title=sheet_title)
+
+    def write(self, row: dict):
+        self.rows += 1
+        if self._wb is None:
+            self._writer.write_values(self._values(row))
+            return
+        values = [strip_illegal(v) if type(v) is str else v for v in self._values(row)]
+        ws = self._ws if self._summary_ws is None else self._sheet_for(values)
+        for i in self._links:
+            url = values[i]
+            if url:
+                cell = self._cell(ws, value=url)
+                cell.hyperlink = url
+                cell.font = self._font
+                values[i] = cell
+        ws.append(values)
+
+    def _sheet_for(self, values: list):
+        key = values[self._split]
+        key = "" if key is None else str(key)
+        self._summary.add(key, values)
+        ws = self._sheets.get(key)
+        if ws is None:
+            self._names[key] = sheet_name(self._sheet_title(key), self._used)
+            ws = self._sheets[key] = self._wb.create_sheet(self._names[key])
+            ws.append(self.headers)
+        return ws
+
+    def close(self):
+        if self._wb is None:
+            self._writer.close()
+            return
+        if self._summary_ws is not None:
+            self._summary_ws.append(SUMMARY_HEADERS)
+            for values in self._summary.rows(self._names):
+                self._summary_ws.append(values)
+        self._wb.save(self.path)
+
+
+# --format name -> (file extension, sink factory(path, headers, **options))
+FORMATS = {
+    "csv": (".csv", lambda path, headers, **o: CsvSink(path, headers)),
+    "csv.gz": (".csv.gz", lambda path, headers, **o: CsvSink(path, headers, compression="gzip")),
+    "csv.zst": (".csv.zst", lambda path, headers, **o: CsvSink(path, headers, compression="zstd")),
+    "jsonl": (".jsonl", lambda path, headers, batch_rows=DEFAULT_BATCH_ROWS, **o: JsonlSink(path, headers, batch_rows)),
+    "parquet": (".parquet", lambda path, headers, batch_rows=DEFAULT_BATCH_ROWS, **o: ParquetSink(path, headers, batch_rows)),
+    "xlsx": (
+        ".xlsx",
+        lambda path, headers, xlsx_engine=None, xlsx_sheets=None, sheet_title=None, **o: XlsxSink(
+            path, headers, engine=xlsx_engine, sheets=xlsx_sheets, sheet_title=sheet_title
+        ),
+    ),
+}
+DEFAULT_FORMATS = ("csv", "xlsx")
+# optional package each format needs, checked up front by the CLI
+FORMAT_REQUIRES = {"csv.zst": "zstandard", "parquet": "pyarrow"}
+
+
+# formats `read_rows` can read back, with their compression
+READABLE_FORMATS = {"csv": None, "csv.gz": "gzip", "csv.zst": "zstd", "jsonl": None}
+
+
+def read_rows(path: str, fmt: str = None):
+    """Return (headers, rows iterator) for a CSV (optionally compressed) or JSON Lines file.
+
+    CSV values come back as strings; JSON Lines values keep their JSON types.
+    """
+    fmt = fmt or format_for_path(path)
+    if fmt not in READABLE_FORMATS:
+        raise ValueError(f"cannot read {fmt} files")
+    f = _open_text(path, "r", READABLE_FORMATS[fmt])
+    if fmt == "jsonl":
+        first = f.readline()
+        headers = list(json.loads(first)) if first.strip() else []
+
+        def rows():
+            with f:
+                if first.strip():
+                    yield json.loads(first)
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    else:
+        reader = csv.DictReader(f)
+        headers = list(reader.fieldnames or [])
+
+        def rows():
+            with f:
+                yield from reader
+
+    return headers, rows()
+
+
+def staging_path(path: str) -> str:
+    """Hidden sibling of `path`, with the same extension, to write before renaming."""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".tmp-{os.getpid()}-{name}")
+
+
+class StagedSink(Sink):
+    """Wraps a sink writing to `staging_path(path)` and renames it to `path` on close.
+
+    Readers of `path` see either the previous file or the complete new one,
+    never a partial write. `discard` (or leaving a `with` block on an
+    exception) deletes the staged file and leaves `path` untouched.
+    """
+
+    def __init__(self, sink: Sink, path: str):
+        self.sink = sink
+        self.path = path
+        self.headers = sink.headers
+        self.write = sink.write
+        self.write_many = sink.write_many
+
+    @property
+    def rows(self):
+        return self.sink.rows
+
+    def close(self):
+        self.sink.close()
+        os.replace(self.sink.path, self.path)
+
+    def discard(self):
+        try:
+            self.sink.close()
+        finally:
+            try:
+                os.unlink(self.sink.path)
+            except FileNotFoundError:
+                pass
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def register_format(name: str, extension: str, factory):
+    """Add an output format; `factory(path, headers, **options)` returns a Sink."""
+    FORMATS[name] = (extension, factory)
+
+
+def format_for_path(path: str) -> str:
+    """The format whose extension `path` ends with (longest match wins)."""
+    matches = [(len(ext), name) for name, (ext, _) in FORMATS.items() if path.endswith(ext)]
+    if not matches:
+        raise ValueError(f"no output format for {path!r}")
+    return max(matches)[1]
+
+
+def open_sink(path: str, headers: List[str], fmt: str = None, atomic: bool = False, **options) -> Sink:
+    """Open a sink for `path` in `fmt` (inferred from the extension by default).
+
+    Options not used by a format are ignored: `xlsx_engine`, `xlsx_sheets`
+    and `sheet_title` for XLSX and `batch_rows` for the chunked JSON Lines and Parquet writers. With
+    `atomic` the rows go to a staging file that replaces `path` on close
+    (see `StagedSink`).
+    """
+    factory = FORMATS[fmt or format_for_path(path)][1]
+    if atomic:
+        return StagedSink(factory(staging_path(path), headers, **options), path)
+    return factory(path, headers, **options)
+
+
+def format_available(fmt: str) -> bool:
+    module = FORMAT_REQUIRES.get(fmt)
+    if module is None:
+        return True
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
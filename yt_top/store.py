@@ -0,0 +1,203 @@
+import os
+import sqlite3
+import time
+from typing import Iterable, Iterator, List
+
+DEFAULT_DB_PATH = os.path.join("out", "history.sqlite3")
+DEFAULT_BATCH_ROWS = 1000
+HISTORY_HEADERS = [
+    "region",
+    "video_id",
+    "categories",
+    "title",
+    "channel",
+    "best_rank",
+    "max_views",
+    "views_per_hour",
+    "snapshots",
+    "first_seen",
+    "last_seen",
+    "url",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chart_entries (
+    fetched_at INTEGER NOT NULL,
+    region TEXT NOT NULL,
+    category TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    video_id TEXT NOT NULL,
+    views INTEGER,
+    title TEXT,
+    channel TEXT,
+    url TEXT,
+    published_at TEXT
+);
+CREATE INDEX IF NOT EXISTS chart_entries_chart ON chart_entries (region, category, fetched_at);
+CREATE INDEX IF NOT EXISTS chart_entries_video ON chart_entries (video_id);
+CREATE TABLE IF NOT EXISTS categories (
+    region TEXT NOT NULL,
+    category TEXT NOT NULL,
+    title TEXT,
+    PRIMARY KEY (region, category)
+);
+"""
+
+TOP_VIDEOS_SQL = """
+WITH w AS (
+    SELECT * FROM chart_entries WHERE fetched_at >= ? {filters}
+),
+agg AS (
+    SELECT region, video_id,
+           GROUP_CONCAT(DISTINCT category) AS categories,
+           MIN(rank) AS best_rank,
+           MAX(views) AS max_views,
+           MIN(views) AS min_views,
+           COUNT(DISTINCT fetched_at) AS snapshots,
+           MIN(fetched_at) AS first_seen,
+           MAX(fetched_at) AS last_seen
+    FROM w GROUP BY region, video_id
+),
+latest AS (
+    -- bare columns come from the row holding MAX(fetched_at)
+    SELECT region, video_id, title, channel, url, MAX(fetched_at) FROM w GROUP BY region, video_id
+)
+SELECT agg.region, agg.video_id, categories, title, channel, best_rank, max_views,
+       CASE WHEN last_seen > first_seen
+            THEN (max_views - min_views) * 3600.0 / (last_seen - first_seen) ELSE 0.0 END AS views_per_hour,
+       snapshots, first_seen, last_seen, url
+FROM agg JOIN latest USING (region, video_id)
+ORDER BY max_views DESC, best_rank
+"""
+
+
+def _iso(ts: int) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+
+
+class HistoryStore:
+    """Chart snapshots in a local SQLite database.
+
+    Every exported row is one `chart_entries` row stamped with the run's
+    `fetched_at` (Unix seconds). Inserts are buffered and written with
+    `executemany` every `batch_rows` rows and committed by `commit`/`close`;
+    leaving a `with` block on an exception rolls them back instead. The
+    `categories` table keeps each region's category titles so queries can
+    take names. The database runs in WAL mode so queries can read while an
+    export records.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, batch_rows: int = DEFAULT_BATCH_ROWS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.batch_rows = batch_rows
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._buf = []
+
+    def add(self, row: dict, fetched_at: int):
+        self._buf.append(
+            (
+                fetched_at,
+                row.get("region") or "",
+                str(row.get("category") or ""),
+                int(row.get("rank") or 0),
+                str(row.get("video_id") or row.get("url") or ""),
+                None if row.get("views") in (None, "") else int(row["views"]),
+                row.get("title"),
+                row.get("channel"),
+                row.get("url"),
+                row.get("published_at"),
+            )
+        )
+        if len(self._buf) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            self._db.executemany("INSERT INTO chart_entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self._buf)
+            self._buf = []
+
+    def commit(self):
+        self.flush()
+        self._db.commit()
+
+    def record_categories(self, region: str, names: dict):
+        """Remember `region`'s {category id: title}, e.g. `CategoryIndex.names`."""
+        self._db.executemany("INSERT OR REPLACE INTO categories VALUES (?, ?, ?)", [(region, cid, title) for cid, title in names.items()])
+
+    def category_names(self, regions: List[str] = None) -> dict:
+        """{category id: title} recorded for `regions` (default all)."""
+        sql, params = "SELECT category, title FROM categories", []
+        if regions:
+            sql += f" WHERE region IN ({', '.join('?' * len(regions))})"
+            params.extend(regions)
+        return dict(self._db.execute(sql + " ORDER BY region", params).fetchall())
+
+    def recording(self, rows: Iterable[dict], fetched_at: int = None) -> Iterator[dict]:
+        """Pass `rows` through unchanged while recording them as one snapshot."""
+        fetched_at = int(time.time()) if fetched_at is None else fetched_at
+        for r in rows:
+            self.add(r, fetched_at)
+            yield r
+        self.commit()
+
+    def top_videos(self, days: int, regions: List[str] = None, categories: List[str] = None, limit: int = None, now: float = None) -> List[dict]:
+        """Aggregate the snapshots of the last `days` days per (region, video).
+
+        Returns dicts with `HISTORY_HEADERS` keys, most viewed first:
+        the best rank and highest views seen, views gained per hour between
+        the first and last snapshot, and the number of snapshots.
+        """
+        self.flush()
+        since = int((time.time() if now is None else now) - days * 86400)
+        filters, params = "", [since]
+        for column, values in (("region", regions), ("category", categories)):
+            if values:
+                filters += f" AND {column} IN ({', '.join('?' * len(values))})"
+                params.extend(values)
+        sql = TOP_VIDEOS_SQL.format(filters=filters)
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        cur = self._db.execute(sql, params)
+        names = [d[0] for d in cur.description]
+        out = []
+        for values in cur:
+            r = dict(zip(names, values))
+            r["first_seen"], r["last_seen"] = _iso(r["first_seen"]), _iso(r["last_seen"])
+            out.append(r)
+        return out
+
+    def latest_entries(self, days: int = None, regions: List[str] = None, now: float = None) -> List[dict]:
+        """The most recent row of every (region, category, video) seen in the last `days` days."""
+        self.flush()
+        since = 0 if days is None else int((time.time() if now is None else now) - days * 86400)
+        sql = (
+            "SELECT region, category, rank, video_id, views, title, channel, url, published_at, MAX(fetched_at)"
+            " FROM chart_entries WHERE fetched_at >= ?"
+        )
+        params = [since]
+        if regions:
+            sql += f" AND region IN ({', '.join('?' * len(regions))})"
+            params.extend(regions)
+        cur = self._db.execute(sql + " GROUP BY region, category, video_id", params)
+        names = [d[0] for d in cur.description][:-1]
+        return [dict(zip(names, values)) for values in cur]
+
+    def close(self):
+        self.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._buf = []
+            self._db.rollback()
+            self._db.close()
@@ -0,0 +1,92 @@
+import random
+from typing import Iterator
+
+from .rows import VideoRow, video_row
+
+# (weight, words, joiner) per title script; weights follow a global chart mix
+# that is mostly Latin with a long tail of other scripts
+TITLE_SCRIPTS = [
+    (50, "Official Music Video Live Reaction Trailer Highlights Gameplay Tutorial Review Full Episode Best Moments Challenge".split(), " "),
+    (8, "Café receta fácil minutos canción avião música coração película Müller Straße".split(), " "),
+    (8, ["アイドル", "公式", "歌ってみた", "ライブ", "ゲーム実況", "新曲", "予告編", "東京"], ""),
+    (8, ["뮤직비디오", "좋은", "날", "아이유", "라이브", "예능", "하이라이트"], " "),
+    (8, ["周杰倫", "最偉大的作品", "官方", "完整版", "精彩", "直播", "电影", "预告"], ""),
+    (6, "Лучшие моменты матча Обзор игры новый клип концерт".split(), " "),
+    (6, "أجمل تلاوة القرآن الكريم بصوت هادئ مباراة ملخص".split(), " "),
+    (6, "नई फिल्म का आधिकारिक ट्रेलर गाना लाइव".split(), " "),
+]
+TAGS = ["Official MV", "4K", "#shorts", "(Live)", "| Full HD", "ft. DJ Snake", "【MV】", "[Teaser]", "🔥", "— Part 2"]
+CATEGORY_IDS = ["1", "2", "10", "15", "17", "19", "20", "22", "23", "24", "25", "26", "27", "28"]
+REGIONS = ["US", "GB", "JP", "KR", "TW", "RU", "EG", "IN", "BR", "DE"]
+
+_WEIGHTS = [w for w, _, _ in TITLE_SCRIPTS]
+
+
+class SyntheticCharts:
+    """Deterministic, realistic-looking chart rows for benchmarks and the fake API.
+
+    Titles mix scripts (mostly Latin, plus Japanese, Korean, Chinese, Cyrillic,
+    Arabic and Devanagari) with Latin tags and emoji; one channel in ten has a
+    60-100 character name; views follow a heavy-tailed distribution that falls
+    off with rank, so a few videos hold most of the views. The same `seed`
+    always produces the same rows, and `video(category, rank)` is stable on
+    its own so the fake API can serve any page in any order.
+    """
+
+    def __init__(self, seed: int = 0, channels: int = 5000, titles: int = 20000):
+        self.seed = seed
+        rng = random.Random(seed)
+        # pools drawn once so generating millions of rows stays cheap
+        self.channels = [self._channel(rng, i) for i in range(channels)]
+        self.titles = [self._title(rng) for _ in range(titles)]
+        self.dates = [
+            f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00Z" for _ in range(1000)
+        ]
+
+    @staticmethod
+    def _channel(rng: random.Random, i: int) -> str:
+        if i % 10 == 0:
+            words = rng.choice(TITLE_SCRIPTS)[1]
+            name = f"Channel {i} "
+            while len(name) < rng.randint(60, 100):
+                name += rng.choice(words) + " "
+            return name.strip()
+        return f"{rng.choice(TITLE_SCRIPTS)[1][0]} {i}"
+
+    @staticmethod
+    def _title(rng: random.Random) -> str:
+        _, words, joiner = rng.choices(TITLE_SCRIPTS, _WEIGHTS)[0]
+        title = joiner.join(rng.choices(words, k=rng.randint(2, 6)))
+        if rng.random() < 0.6:
+            title = f"{title} {rng.choice(TAGS)}"
+        return title
+
+    def _row(self, rng: random.Random, category: str, rank: int, region: str, vid: str) -> VideoRow:
+        # lognormal noise on a Zipf-like curve over the rank
+        views = int(50_000_000 / rank ** 0.9 * rng.lognormvariate(0, 1.2))
+        title = rng.choice(self.titles)
+        channel = rng.choice(self.channels)
+        return video_row(category, rank, vid, title, channel, views, f"https://www.youtube.com/watch?v={vid}", rng.choice(self.dates), region)
+
+    def video(self, category: str, rank: int, region: str = "US") -> VideoRow:
+        """The row at `rank` in `category`'s chart, independent of any other row."""
+        rng = random.Random(f"{self.seed}:{region}:{category}:{rank}")
+        return self._row(rng, category, rank, region, f"s{region}{category}x{rank}")
+
+    def api_item(self, category: str, rank: int, region: str = "US") -> dict:
+        """`video` in the shape of a YouTube Data API `videos` item."""
+        r = self.video(category, rank, region)
+        return {
+            "id": r["video_id"],
+            "snippet": {"title": r["title"], "channelTitle": r["channel"], "publishedAt": r["published_at"]},
+            "statistics": {"viewCount": str(r["views"])},
+        }
+
+    def rows(self, n: int, per_category: int = 200) -> Iterator[VideoRow]:
+        """Yield `n` rows as consecutive charts of `per_category` rows, cycling
+        through regions and categories."""
+        rng = random.Random(self.seed)
+        charts = [(region, c) for region in REGIONS for c in CATEGORY_IDS]
+        for i in range(n):
+            region, category = charts[i // per_category % len(charts)]
+            yield self._row(rng, category, i % per_category + 1, region, f"s{self.seed}n{i:09d}")
@@ -1,62 +1,496 @@
 import csv
+import hashlib
+import os
+import posixpath
+import re
+import sys
+import zipfile
+from array import array
+from itertools import zip_longest
+from typing import Iterator, List
+from xml.etree.ElementTree import iterparse
 
+from .manifest import file_sha256, load_manifest, manifest_entry, manifest_paths
+from .metrics import get_metrics
+from .xlsx import SUMMARY_SHEET, strip_illegal
 
+RAW_HEADERS = ["category", "rank", "title", "channel", "views", "url", "published_at"]
+URL_COLUMNS = ("url", "video_url")
+# failures kept with their row numbers; the rest are only counted
+MAX_REPORTED_ERRORS = 100
 
-def verify_csv(path: str) -> bool:
-    required = ["category", "rank", "title", "channel", "views", "url", "published_at"]
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_CELL_REF = re.compile(r"([A-Z]+)(\d+)")
+_RID = re.compile(r"rId(\d+)")
+
+
+class VerifyReport:
+    """Outcome of a verification: truthy when every check passed.
+
+    `errors` holds up to `MAX_REPORTED_ERRORS` (row, message) pairs, where row
+    is the spreadsheet row number (the header is row 1) or None for
+    file-level problems; `error_count` counts all of them. `rows` and
+    `checksums` hold the data row count and a SHA-256 over the normalized
+    cell values of each verified file, keyed by "csv" / "xlsx".
+    """
+
+    def __init__(self, paths: List[str]):
+        self.paths = list(paths)
+        self.errors = []
+        self.error_count = 0
+        self.rows = {}
+        self.checksums = {}
+
+    def fail(self, row, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row, message))
+
+    @property
+    def ok(self) -> bool:
+        return self.error_count == 0
+
+    def __bool__(self):
+        return self.ok
+
+    @property
+    def failed_rows(self) -> List[int]:
+        """Row numbers with a reported failure (up to `MAX_REPORTED_ERRORS`)."""
+        return sorted({row for row, _ in self.errors if row is not None})
+
+    def __str__(self):
+        counts = ", ".join(f"{kind} {n} rows" for kind, n in self.rows.items())
+        lines = [f"{'OK' if self.ok else 'FAILED'}: {' + '.join(self.paths)} ({counts})"]
+        for row, message in self.errors:
+            lines.append(f"  {'file' if row is None else f'row {row}'}: {message}")
+        if self.error_count > len(self.errors):
+            lines.append(f"  ... {self.error_count - len(self.errors)} more")
+        return "\n".join(lines)
+
+
+class _Digest:
+    """SHA-256 over a file's data rows.
+
+    Ordered digests hash the rows in sequence. Unordered ones add up the
+    SHA-256 of each row modulo 2**256, which compares the same rows written
+    in another order, e.g. grouped into sheets.
+    """
+
+    def __init__(self, ordered: bool = True):
+        self._hash = hashlib.sha256() if ordered else None
+        self._sum = 0
+
+    def update(self, values: List[str]):
+        data = ("\x1f".join(values) + "\x1e").encode("utf-8")
+        if self._hash is not None:
+            self._hash.update(data)
+        else:
+            self._sum = (self._sum + int.from_bytes(hashlib.sha256(data).digest(), "big")) & _DIGEST_MASK
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest() if self._hash is not None else f"{self._sum:064x}"
+
+
+_DIGEST_MASK = (1 << 256) - 1
+
+
+def _normalize(value) -> str:
+    # what survives the trip into XLSX: no XML-illegal characters, \n line ends
+    text = "" if value is None else str(value)
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return strip_illegal(text)
+
+
+def _csv_rows(path: str, report: VerifyReport, required: List[str] = None, ordered: bool = True) -> Iterator[list]:
+    """Yield normalized CSV rows (header first) in one pass, checking URL cells."""
     with open(path, newline="", encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        # check headers
-        for h in required:
-            if h not in r.fieldnames:
-                return False
-        rows = list(r)
-        if len(rows) < 1:
-            return False
-        # check urls
-        for row in rows:
-            if not row.get("url", "").startswith("http"):
-                return False
-    return True
-
-
-def verify_xlsx(path: str) -> bool:
+        reader = csv.reader(f)
+        headers = next(reader, None)
+        if headers is None:
+            report.fail(None, f"{path}: empty file")
+            return
+        missing = [h for h in (required or RAW_HEADERS) if h not in headers]
+        url_idx = next((headers.index(c) for c in URL_COLUMNS if c in headers), None)
+        if missing or url_idx is None:
+            report.fail(1, f"{path}: missing columns {', '.join(missing or URL_COLUMNS)}")
+            return
+        yield [_normalize(h) for h in headers]
+        rows = 0
+        digest = _Digest(ordered)
+        for row_num, values in enumerate(reader, start=2):
+            rows += 1
+            values = [_normalize(v) for v in values]
+            digest.update(values)
+            url = values[url_idx] if url_idx < len(values) else ""
+            if not url.startswith("http"):
+                report.fail(row_num, f"csv: {headers[url_idx]} is not a URL: {url!r}")
+            yield values
+        report.rows["csv"] = rows
+        report.checksums["csv"] = digest.hexdigest()
+        if not rows:
+            report.fail(None, f"{path}: no data rows")
+
+
+def _col_index(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n - 1
+
+
+def _sheets(z: zipfile.ZipFile) -> List[tuple]:
+    """(name, path) of every sheet in workbook order, falling back to sheet1.xml."""
+    sheets = []
+    try:
+        with z.open("xl/workbook.xml") as f:
+            listed = [(e.get("name"), e.get(_REL_NS + "id")) for _, e in iterparse(f) if e.tag == _MAIN_NS + "sheet"]
+        targets = {}
+        with z.open("xl/_rels/workbook.xml.rels") as f:
+            for _, e in iterparse(f):
+                if e.tag == _PKG_REL_NS + "Relationship":
+                    targets[e.get("Id")] = e.get("Target") or ""
+    except KeyError:
+        listed = []
+    for name, rid in listed:
+        target = targets.get(rid)
+        if target:
+            sheets.append((name, target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))))
+    return sheets or [("Sheet1", "xl/worksheets/sheet1.xml")]
+
+
+def _data_sheets(sheets: List[tuple]) -> List[tuple]:
+    # a split workbook leads with the summary sheet, which holds no rows
+    if len(sheets) > 1 and sheets[0][0] == SUMMARY_SHEET:
+        return sheets[1:]
+    return sheets
+
+
+def _sheet_count(path: str) -> int:
+    try:
+        with zipfile.ZipFile(path) as z:
+            return len(_sheets(z))
+    except (OSError, zipfile.BadZipFile):
+        return 0
+
+
+def _text(elem) -> str:
+    # concatenated <t> text of an <si> or <is> element (plain or rich text runs)
+    return "".join(t.text or "" for t in elem.iter(_MAIN_NS + "t"))
+
+
+def _shared_strings(z: zipfile.ZipFile) -> List[str]:
+    strings = []
+    try:
+        f = z.open("xl/sharedStrings.xml")
+    except KeyError:
+        return strings
+    with f:
+        for _, elem in iterparse(f):
+            if elem.tag == _MAIN_NS + "si":
+                strings.append(_text(elem))
+                elem.clear()
+    return strings
+
+
+def _rel_ids(z: zipfile.ZipFile, sheet: str):
+    """Relationship ids of the sheet: a bitmap of rIdN numbers plus a set of other ids."""
+    bits, other = bytearray(), set()
+    rels = posixpath.join(posixpath.dirname(sheet), "_rels", posixpath.basename(sheet) + ".rels")
+    try:
+        f = z.open(rels)
+    except KeyError:
+        return bits, other
+    with f:
+        for _, elem in iterparse(f):
+            if elem.tag == _PKG_REL_NS + "Relationship" and elem.get("Target"):
+                rid = elem.get("Id") or ""
+                m = _RID.fullmatch(rid)
+                if m:
+                    n = int(m.group(1))
+                    if n >= len(bits) * 8:
+                        bits.extend(bytes(n // 8 + 1 - len(bits)))
+                    bits[n // 8] |= 1 << (n % 8)
+                else:
+                    other.add(rid)
+            elem.clear()
+    return bits, other
+
+
+def _sheet_rows(z: zipfile.ZipFile, sheet: str, strings: List[str], report: VerifyReport, label: str, links: bool = True) -> Iterator[list]:
+    """Yield normalized rows (header first) of one sheet with iterparse, then
+    check that every URL cell has a hyperlink whose relationship exists."""
+    rel_bits, rel_other = _rel_ids(z, sheet)
+    try:
+        f = z.open(sheet)
+    except KeyError:
+        report.fail(None, f"{label}: missing {sheet}")
+        return
+    url_idx = None
+    url_rows, link_rows = array("I"), array("I")
+    row_num = 0
+    sheet_data = None
+    with f:
+        for event, elem in iterparse(f, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                if tag == _MAIN_NS + "sheetData":
+                    sheet_data = elem
+                continue
+            if tag == _MAIN_NS + "row":
+                row_num = int(elem.get("r") or row_num + 1)
+                values = []
+                for c in elem:
+                    ref = c.get("r")
+                    if ref:
+                        col = _col_index(_CELL_REF.match(ref).group(1))
+                        values.extend([""] * (col - len(values)))
+                    kind = c.get("t")
+                    if kind == "inlineStr":
+                        value = _text(c)
+                    else:
+                        v = c.find(_MAIN_NS + "v")
+                        value = "" if v is None or v.text is None else v.text
+                        if kind == "s" and value:
+                            value = strings[int(value)]
+                    values.append(_normalize(value))
+                if sheet_data is not None:
+                    sheet_data.clear()
+                if url_idx is None:
+                    width = len(values)
+                    url_idx = next((values.index(c) for c in URL_COLUMNS if c in values), -1)
+                    if url_idx < 0 and links:
+                        report.fail(row_num, f"{label}: header has no url column")
+                    yield values
+                    continue
+                # trailing empty cells may be left out of the sheet
+                values.extend([""] * (width - len(values)))
+                if 0 <= url_idx < len(values) and values[url_idx].startswith("http"):
+                    url_rows.append(row_num)
+                yield values
+            elif tag == _MAIN_NS + "hyperlink" and url_idx is not None:
+                rid = elem.get(_REL_NS + "id") or ""
+                m = _RID.fullmatch(rid)
+                if m:
+                    n = int(m.group(1))
+                    linked = n < len(rel_bits) * 8 and rel_bits[n // 8] >> (n % 8) & 1
+                else:
+                    linked = rid in rel_other
+                first, _, last = (elem.get("ref") or "").partition(":")
+                cells = [_CELL_REF.match(first), _CELL_REF.match(last or first)]
+                if not linked or None in cells:
+                    report.fail(int(cells[0].group(2)) if cells[0] else None, f"{label}: hyperlink {elem.get('ref')} has no relationship {rid!r}")
+                elif _col_index(cells[0].group(1)) <= url_idx <= _col_index(cells[1].group(1)):
+                    link_rows.extend(range(int(cells[0].group(2)), int(cells[1].group(2)) + 1))
+                elem.clear()
+    # merge the two sorted row lists: URL cells without a hyperlink fail
+    links = sorted(link_rows)
+    i = 0
+    for r in url_rows:
+        while i < len(links) and links[i] < r:
+            i += 1
+        if i == len(links) or links[i] != r:
+            report.fail(r, f"{label}: URL cell has no hyperlink")
+
+
+def _xlsx_rows(path: str, report: VerifyReport, ordered: bool = True) -> Iterator[list]:
+    """Yield normalized rows (header first) of every data sheet in workbook order.
+
+    Every data sheet must repeat the first one's header. A leading summary
+    sheet is not yielded; its per-sheet video counts and total are checked
+    against the rows read instead. See `_Digest` for `ordered`.
+    """
     try:
-        from openpyxl import load_workbook
-    except Exception:
-        # openpyxl not installed — fallback: attempt to read worksheet XML from the .xlsx zip
-        try:
-            import zipfile
-            with zipfile.ZipFile(path) as z:
-                try:
-                    data = z.read('xl/worksheets/sheet1.xml').decode('utf-8', errors='ignore')
-                except Exception:
-                    # fall back to raw text read
-                    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                        data = f.read()
-        except Exception:
-            return False
-        if 'url' not in data:
-            return False
-        if 'http' in data:
-            return True
-        return False
-
-    wb = load_workbook(path)
-    ws = wb.active
-    # find URL column index by header
-    headers = [c.value for c in next(ws.rows)]
+        z = zipfile.ZipFile(path)
+    except (OSError, zipfile.BadZipFile) as e:
+        report.fail(None, f"{path}: not an xlsx file: {e}")
+        return
+    with z:
+        sheets = _sheets(z)
+        data_sheets = _data_sheets(sheets)
+        strings = _shared_strings(z)
+        header = None
+        rows = 0
+        counts = {}
+        digest = _Digest(ordered)
+        for name, sheet in data_sheets:
+            label = "xlsx" if len(sheets) == 1 else f"xlsx sheet {name!r}"
+            it = _sheet_rows(z, sheet, strings, report, label)
+            head = next(it, None)
+            if head is None:
+                continue
+            if header is None:
+                header = head
+                yield head
+            elif head != header:
+                report.fail(1, f"{label}: header differs from the first sheet")
+                it.close()
+                continue
+            n = 0
+            for values in it:
+                n += 1
+                digest.update(values)
+                yield values
+            counts[name] = n
+            rows += n
+        if len(data_sheets) < len(sheets):
+            _check_summary(z, sheets[0][1], strings, counts, rows, report)
+        report.rows["xlsx"] = rows
+        report.checksums["xlsx"] = digest.hexdigest()
+        if not rows:
+            report.fail(None, f"{path}: no data rows")
+
+
+def _check_summary(z: zipfile.ZipFile, sheet: str, strings: List[str], counts: dict, rows: int, report: VerifyReport):
+    label = f"xlsx sheet {SUMMARY_SHEET!r}"
+    it = _sheet_rows(z, sheet, strings, report, label, links=False)
+    head = next(it, None) or []
+    if "sheet" not in head or "videos" not in head:
+        report.fail(1, f"{label}: missing columns sheet, videos")
+        return
+    name_idx, videos_idx = head.index("sheet"), head.index("videos")
+    summary = list(it)
+    # the last row holds the totals
+    for row_num, values in enumerate(summary, start=2):
+        name, videos = values[name_idx], values[videos_idx]
+        expected = rows if row_num == len(summary) + 1 else counts.get(name)
+        if expected is None:
+            report.fail(row_num, f"{label}: no sheet named {name!r}")
+        elif videos != str(expected):
+            report.fail(row_num, f"{label}: {name} has {videos} videos, the sheet has {expected} rows")
+    listed = {values[name_idx] for values in summary[:-1]}
+    for name in counts:
+        if name not in listed:
+            report.fail(None, f"{label}: sheet {name!r} is missing")
+
+
+def verify_csv(path: str, required: List[str] = None) -> VerifyReport:
+    """Check a CSV in one streaming pass: required headers, at least one row,
+    and a URL in every `url`/`video_url` cell."""
+    report = VerifyReport([path])
+    for _ in _csv_rows(path, report, required):
+        pass
+    return report
+
+
+def verify_xlsx(path: str) -> VerifyReport:
+    """Stream every data sheet of an XLSX: a url column header, at least one
+    row, a resolvable hyperlink on every URL cell and, for a workbook split
+    into sheets, summary counts that match them."""
+    report = VerifyReport([path])
+    for _ in _xlsx_rows(path, report):
+        pass
+    return report
+
+
+def _check_manifest(report: VerifyReport, manifest: dict, manifest_path: str, path: str, key: str):
+    entry = manifest_entry(manifest, manifest_path, path)
+    if entry is None:
+        report.fail(None, f"{path} is not listed in {manifest_path}")
+        return
+    report.rows[key] = entry["rows"]
     try:
-        url_idx = headers.index("url")
-    except ValueError:
-        return False
-    # check at least one hyperlink present in url column
-    for row in ws.iter_rows(min_row=2, min_col=url_idx + 1, max_col=url_idx + 1):
-        cell = row[0]
-        if getattr(cell, "hyperlink", None):
-            return True
-    return False
-
-
-def verify_all(csv_path: str, xlsx_path: str) -> bool:
-    return verify_csv(csv_path) and verify_xlsx(xlsx_path)
+        size = os.path.getsize(path)
+    except OSError as e:
+        report.fail(None, f"{path}: {e.strerror or e}")
+        return
+    if size != entry["bytes"]:
+        report.fail(None, f"{path} has {size} bytes, the manifest lists {entry['bytes']}")
+        return
+    report.checksums[key] = file_sha256(path)
+    if report.checksums[key] != entry["sha256"]:
+        report.fail(None, f"{path} does not match its manifest checksum")
+
+
+def verify_manifest(manifest_path: str, paths: List[str] = None) -> VerifyReport:
+    """Check files against the manifest written with them, without parsing them.
+
+    Every file in `paths` (default: all files listed) must be listed and
+    match its recorded size and SHA-256. `rows` holds the row counts the
+    manifest records and `checksums` the files' SHA-256, keyed by path.
+    """
+    manifest = load_manifest(manifest_path)
+    paths = manifest_paths(manifest, manifest_path) if paths is None else list(paths)
+    report = VerifyReport(paths)
+    for path in paths:
+        _check_manifest(report, manifest, manifest_path, path, path)
+    return report
+
+
+def verify_all(csv_path: str, xlsx_path: str, manifest: str = None) -> VerifyReport:
+    """Verify a CSV and the XLSX written from the same rows in one lockstep pass.
+
+    On top of the per-file checks, rows are compared cell by cell (after the
+    normalization XLSX applies) and the row counts and checksums must match.
+    A workbook split into several sheets holds the rows in another order, so
+    only the headers, row counts and order-independent checksums are compared.
+
+    With the path of the `manifest` written alongside the files, neither
+    file is parsed: both must match their recorded size and SHA-256 and
+    have the same recorded row count. `checksums` then holds the files'
+    SHA-256.
+    """
+    report = VerifyReport([csv_path, xlsx_path])
+    metrics = get_metrics()
+    if manifest is not None:
+        with metrics.timer("stage_seconds", stage="verify"):
+            loaded = load_manifest(manifest)
+            _check_manifest(report, loaded, manifest, csv_path, "csv")
+            _check_manifest(report, loaded, manifest, xlsx_path, "xlsx")
+        metrics.inc("verify_failures_total", report.error_count)
+        if report.ok and report.rows["csv"] != report.rows["xlsx"]:
+            report.fail(None, f"row counts differ: csv {report.rows['csv']}, xlsx {report.rows['xlsx']}")
+        return report
+    ordered = _sheet_count(xlsx_path) <= 1
+    with metrics.timer("stage_seconds", stage="verify"):
+        csv_rows, xlsx_rows = _csv_rows(csv_path, report, ordered=ordered), _xlsx_rows(xlsx_path, report, ordered)
+        if not ordered:
+            a, b = next(csv_rows, None), next(xlsx_rows, None)
+            if a is not None and b is not None and a != b:
+                report.fail(1, "csv and xlsx headers differ")
+            for _ in csv_rows:
+                pass
+            for _ in xlsx_rows:
+                pass
+            csv_rows = xlsx_rows = ()
+        rows = zip_longest(csv_rows, xlsx_rows)
+        for row_num, (a, b) in enumerate(rows, start=1):
+            if a is None or b is None:
+                continue
+            if a != b:
+                cols = [str(i + 1) for i, (x, y) in enumerate(zip_longest(a, b, fillvalue="")) if x != y]
+                report.fail(row_num, f"csv and xlsx differ in column {', '.join(cols)}")
+    metrics.inc("rows_verified_total", report.rows.get("csv", 0))
+    metrics.inc("verify_failures_total", report.error_count)
+    if report.rows.get("csv") != report.rows.get("xlsx"):
+        report.fail(None, f"row counts differ: csv {report.rows.get('csv')}, xlsx {report.rows.get('xlsx')}")
+    elif report.checksums.get("csv") != report.checksums.get("xlsx"):
+        report.fail(None, "checksums differ")
+    return report
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    manifest = None
+    if argv[:1] == ["--manifest"] and len(argv) > 1:
+        manifest, argv = argv[1], argv[2:]
+    if manifest is not None and not argv:
+        report = verify_manifest(manifest)
+    elif len(argv) == 2:
+        report = verify_all(*argv, manifest=manifest)
+    elif len(argv) == 1:
+        if manifest is not None:
+            report = verify_manifest(manifest, argv)
+        else:
+            report = verify_xlsx(argv[0]) if argv[0].endswith(".xlsx") else verify_csv(argv[0])
+    else:
+        print("usage: python -m yt_top.verifier [--manifest MANIFEST.json] FILE.csv [FILE.xlsx]", file=sys.stderr)
+        return 2
+    print(report)
+    return 0 if report else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
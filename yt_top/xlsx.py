@@ -0,0 +1,423 @@
+import re
+import shutil
+import tempfile
+import zipfile
+from typing import Iterable, List
+
+from .rows import row_values
+
+NUMERIC_COLUMNS = frozenset({"rank", "views"})
+SHARED_COLUMNS = frozenset({"category", "category_id", "category_name", "channel", "language", "region"})
+LINK_COLUMNS = frozenset({"url", "video_url"})
+
+_NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+_NS_R = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+_CT_MAIN = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+# characters XML 1.0 does not allow, even escaped
+_ILLEGAL_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+# also drops the tab/newline separators of the hyperlink spill file
+_BAD_TARGET = re.compile("[\x00-\x1f\ufffe\uffff]")
+_NEEDS_ESCAPE = re.compile("[&<>\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+SUMMARY_SHEET = "Summary"
+SUMMARY_HEADERS = ["sheet", "videos", "total_views", "average_views", "top_video", "top_video_views"]
+# characters Excel does not allow in sheet names, and its name length limit
+_BAD_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+MAX_SHEET_NAME = 31
+
+
+# style 0 is the default, style 1 is the blue underlined hyperlink font
+STYLES = f"""<?xml version='1.0' encoding='UTF-8'?>
+<styleSheet {_NS}>
+  <fonts count="2">
+    <font><sz val="11"/><name val="Calibri"/></font>
+    <font><u/><sz val="11"/><color rgb="FF0000FF"/><name val="Calibri"/></font>
+  </fonts>
+  <fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+  <borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+  <cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+  <cellXfs count="2">
+    <xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+    <xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>
+  </cellXfs>
+  <cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>"""
+
+
+def col_letter(i: int) -> str:
+    s = ""
+    while i > 0:
+        i, rem = divmod(i - 1, 26)
+        s = chr(65 + rem) + s
+    return s
+
+
+def strip_illegal(value: str) -> str:
+    """Drop characters that cannot appear in an XML 1.0 document."""
+    return _ILLEGAL_XML.sub("", value)
+
+
+def escape(s: str) -> str:
+    # same as xml.sax.saxutils.escape, whose import chain pulls in urllib and email
+    return s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _text(value) -> str:
+    s = value if type(value) is str else str(value)
+    # most cells need no escaping; one regex scan is cheaper than escape()'s replaces
+    if _NEEDS_ESCAPE.search(s) is None:
+        return s
+    return escape(_ILLEGAL_XML.sub("", s))
+
+
+def _t(value) -> str:
+    """Render a `<t>` text element, preserving leading/trailing whitespace."""
+    s = _text(value)
+    if s and (s[0].isspace() or s[-1].isspace()):
+        return f'<t xml:space="preserve">{s}</t>'
+    return f"<t>{s}</t>"
+
+
+def _is_number(value) -> bool:
+    t = type(value)
+    if t is int or t is float:
+        return True
+    # isdigit() also accepts superscripts such as "²", which are not numbers
+    return t is str and value.isascii() and value.isdecimal() and len(value) < 16
+
+
+def content_types(sheets: int = 1) -> str:
+    overrides = "".join(
+        f'\n  <Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{_CT_MAIN}.worksheet+xml"/>' for i in range(1, sheets + 1)
+    )
+    return f"""<?xml version='1.0' encoding='UTF-8'?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+  <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+  <Default Extension="xml" ContentType="application/xml"/>
+  <Override PartName="/xl/workbook.xml" ContentType="{_CT_MAIN}.sheet.main+xml"/>{overrides}
+  <Override PartName="/xl/sharedStrings.xml" ContentType="{_CT_MAIN}.sharedStrings+xml"/>
+  <Override PartName="/xl/styles.xml" ContentType="{_CT_MAIN}.styles+xml"/>
+</Types>"""
+
+
+def workbook(names: List[str]) -> str:
+    quoted = (_text(name).replace('"', "&quot;") for name in names)
+    sheets = "".join(f'\n    <sheet name="{name}" sheetId="{i}" r:id="rId{i}"/>' for i, name in enumerate(quoted, start=1))
+    return f"""<?xml version='1.0' encoding='UTF-8'?>
+<workbook {_NS} {_NS_R}>
+  <sheets>{sheets}
+  </sheets>
+</workbook>"""
+
+
+def workbook_rels(sheets: int = 1) -> str:
+    rels = "".join(
+        f'\n  <Relationship Id="rId{i}" Type="{_REL}/worksheet" Target="worksheets/sheet{i}.xml"/>' for i in range(1, sheets + 1)
+    )
+    return f"""<?xml version='1.0' encoding='UTF-8'?>
+<Relationships xmlns="{_PKG_REL}">{rels}
+  <Relationship Id="rId{sheets + 1}" Type="{_REL}/sharedStrings" Target="sharedStrings.xml"/>
+  <Relationship Id="rId{sheets + 2}" Type="{_REL}/styles" Target="styles.xml"/>
+</Relationships>"""
+
+
+CONTENT_TYPES = content_types(1)
+
+ROOT_RELS = f"""<?xml version='1.0' encoding='UTF-8'?>
+<Relationships xmlns="{_PKG_REL}">
+  <Relationship Id="rId1" Type="{_REL}/officeDocument" Target="/xl/workbook.xml"/>
+</Relationships>"""
+
+WORKBOOK = workbook(["Sheet1"])
+
+WORKBOOK_RELS = workbook_rels(1)
+
+
+def sheet_name(title, used: set) -> str:
+    """An Excel-valid sheet name for `title`, unique (case-insensitively) among `used`, which it joins."""
+    base = _BAD_SHEET_CHARS.sub(" ", strip_illegal(str(title or ""))).strip().strip("'")[:MAX_SHEET_NAME] or "Sheet"
+    name, n = base, 1
+    while name.lower() in used:
+        n += 1
+        suffix = f" ({n})"
+        name = base[: MAX_SHEET_NAME - len(suffix)] + suffix
+    used.add(name.lower())
+    return name
+
+
+def _kinds(headers: List[str]) -> List[str]:
+    return [
+        "n" if h in NUMERIC_COLUMNS else "s" if h in SHARED_COLUMNS else "l" if h in LINK_COLUMNS else "i"
+        for h in headers
+    ]
+
+
+def _write_chunked(stream, parts, chunk_rows: int):
+    buf = []
+    for part in parts:
+        buf.append(part)
+        if len(buf) >= chunk_rows:
+            stream.write("".join(buf).encode("utf-8"))
+            buf = []
+    stream.write("".join(buf).encode("utf-8"))
+
+
+class _Sheet:
+    """One worksheet's XML, streamed to a binary `stream` in chunks of `chunk_rows` rows.
+
+    Hyperlink targets are spilled to a temporary file until `finish` writes
+    the `<hyperlinks>` block; `rels_parts` then renders the sheet's rels.
+    """
+
+    def __init__(self, stream, headers: List[str], kinds: List[str], shared, chunk_rows: int):
+        self.stream = stream
+        self.rows = 0
+        self._chunk_rows = chunk_rows
+        self._cols = [col_letter(i) for i in range(1, len(headers) + 1)]
+        self._kinds = kinds
+        self._shared = shared
+        self._links = tempfile.TemporaryFile(mode="w+", encoding="utf-8", newline="\n")
+        self.n_links = 0
+        self._link_buf = []
+        self._buf = []
+        stream.write(f"<?xml version='1.0' encoding='UTF-8'?>\n<worksheet {_NS} {_NS_R}><sheetData>".encode("utf-8"))
+        header_cells = "".join(f'<c t="inlineStr"><is>{_t(h)}</is></c>' for h in headers)
+        self._buf.append(f'<row r="1">{header_cells}</row>')
+
+    def write_values(self, values: Iterable):
+        # cells carry no `r` reference: they are positional, and empty values
+        # are written as `<c/>` to keep later cells in their columns
+        self.rows += 1
+        ridx = self.rows + 1
+        cells = []
+        append = cells.append
+        for col, kind, value in zip(self._cols, self._kinds, values):
+            if value is None or value == "":
+                append("<c/>")
+            elif kind == "i":
+                s = value if type(value) is str else str(value)
+                if _NEEDS_ESCAPE.search(s) is not None:
+                    s = escape(_ILLEGAL_XML.sub("", s))
+                if s and (s[0].isspace() or s[-1].isspace()):
+                    append(f'<c t="inlineStr"><is><t xml:space="preserve">{s}</t></is></c>')
+                else:
+                    append(f'<c t="inlineStr"><is><t>{s}</t></is></c>')
+            elif kind == "s":
+                append(f'<c t="s"><v>{self._shared(value if type(value) is str else str(value))}</v></c>')
+            elif kind == "n" and _is_number(value):
+                append(f"<c><v>{value}</v></c>")
+            elif kind == "l" and type(value) is str and value.startswith("http"):
+                append(f'<c s="1" t="inlineStr"><is><t>{_text(value)}</t></is></c>')
+                if _BAD_TARGET.search(value) is not None:
+                    value = _BAD_TARGET.sub("", value)
+                self._link_buf.append(f"{col}{ridx}\t{value}\n")
+            else:
+                append(f'<c t="inlineStr"><is>{_t(value)}</is></c>')
+        self._buf.append(f'<row r="{ridx}">{"".join(cells)}</row>')
+        if len(self._buf) >= self._chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            self.stream.write("".join(self._buf).encode("utf-8"))
+            self._buf = []
+        if self._link_buf:
+            self._links.write("".join(self._link_buf))
+            self.n_links += len(self._link_buf)
+            self._link_buf = []
+
+    def finish(self):
+        self.flush()
+        self.stream.write(b"</sheetData>")
+        if self.n_links:
+            _write_chunked(self.stream, self._hyperlink_parts(), self._chunk_rows)
+        self.stream.write(b"</worksheet>")
+
+    def _iter_links(self):
+        self._links.seek(0)
+        for idx, line in enumerate(self._links, start=1):
+            ref, target = line.rstrip("\n").split("\t", 1)
+            yield idx, ref, target
+
+    def _hyperlink_parts(self):
+        yield "<hyperlinks>"
+        for idx, ref, _ in self._iter_links():
+            yield f'<hyperlink ref="{ref}" r:id="rId{idx}"/>'
+        yield "</hyperlinks>"
+
+    def rels_parts(self):
+        yield f"<?xml version='1.0' encoding='UTF-8'?><Relationships xmlns=\"{_PKG_REL}\">"
+        for idx, _, target in self._iter_links():
+            # Target must be XML-escaped
+            target = _text(target).replace('"', "&quot;")
+            yield f'<Relationship Id="rId{idx}" Type="{_REL}/hyperlink" Target="{target}" TargetMode="External"/>'
+        yield "</Relationships>"
+
+    def close(self):
+        self._links.close()
+
+
+class SheetSummary:
+    """Per-sheet totals for the summary sheet: videos, views and the most viewed title."""
+
+    def __init__(self, headers: List[str]):
+        self._views = headers.index("views") if "views" in headers else None
+        self._title = headers.index("title") if "title" in headers else None
+        self._stats = {}
+
+    def add(self, key: str, values: list):
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = [0, 0, None, -1]
+        stats[0] += 1
+        views = values[self._views] if self._views is not None else None
+        if type(views) is not int:
+            views = int(views) if type(views) is str and views.isascii() and views.isdecimal() else 0
+        stats[1] += views
+        if views > stats[3]:
+            stats[2], stats[3] = values[self._title] if self._title is not None else None, views
+
+    def rows(self, names: dict) -> List[list]:
+        """Summary rows (`SUMMARY_HEADERS` order) for each key, named by `names`, plus a total."""
+        out = []
+        videos = total = 0
+        for key, (n, views, title, top) in self._stats.items():
+            out.append([names[key], n, views, views // n, title, max(top, 0)])
+            videos += n
+            total += views
+        out.append(["Total", videos, total, total // videos if videos else 0, None, None])
+        return out
+
+
+class StreamingXlsxWriter:
+    """XLSX writer that streams sheet XML without holding rows in memory.
+
+    Rows are rendered in chunks of `chunk_rows`. `rank`/`views` become numeric
+    cells, low-cardinality columns (category, channel, ...) go through the
+    workbook's shared-strings table and URL columns get a hyperlink, whose
+    targets are spilled to a temporary file until the sheet is closed.
+
+    By default every row goes to `Sheet1`, written straight into a
+    `ZipFile.open(..., "w")` stream. With `split_by` (a column in `headers`,
+    e.g. "category" or "region") rows go to one sheet per value of that
+    column, named by `sheet_title(value)` (default the value itself). Each of
+    those sheets streams into its own temporary file, because a zip can only
+    be written one member at a time; `close` copies them into the workbook
+    after a `Summary` sheet with per-sheet totals (unless `summary` is False)
+    and generates `[Content_Types].xml` and the workbook rels to match.
+    """
+
+    def __init__(self, path: str, headers: List[str], chunk_rows: int = 1000, split_by: str = None, sheet_title=None, summary: bool = True):
+        self.path = path
+        self.headers = list(headers)
+        self.rows = 0
+        self._chunk_rows = chunk_rows
+        self._kinds = _kinds(self.headers)
+        self._values = row_values(self.headers)
+        self._sst = {}
+        self._sst_refs = 0
+        self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        self._sheets = None
+        if split_by is None:
+            self._sheet = self._open_sheet(self._zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True))
+            return
+        if split_by not in self.headers:
+            raise ValueError(f"cannot split sheets by {split_by!r}: not one of the columns")
+        self._split = self.headers.index(split_by)
+        self._sheet_title = sheet_title or str
+        self._sheets = {}
+        self._summary = SheetSummary(self.headers) if summary else None
+
+    def _open_sheet(self, stream, headers: List[str] = None, kinds: List[str] = None) -> _Sheet:
+        return _Sheet(stream, headers or self.headers, kinds or self._kinds, self._shared, self._chunk_rows)
+
+    def _shared(self, value: str) -> int:
+        idx = self._sst.get(value)
+        if idx is None:
+            idx = self._sst[value] = len(self._sst)
+        self._sst_refs += 1
+        return idx
+
+    def write(self, row: dict):
+        self.write_values(self._values(row))
+
+    def write_values(self, values: Iterable):
+        self.rows += 1
+        if self._sheets is None:
+            self._sheet.write_values(values)
+            return
+        values = list(values)
+        key = values[self._split]
+        key = "" if key is None else str(key)
+        sheet = self._sheets.get(key)
+        if sheet is None:
+            sheet = self._sheets[key] = self._open_sheet(tempfile.TemporaryFile())
+        sheet.write_values(values)
+        if self._summary is not None:
+            self._summary.add(key, values)
+
+    def close(self):
+        if self._sheets is None:
+            self._sheet.finish()
+            self._sheet.stream.close()
+            self._write_rels(1, self._sheet)
+            self._sheet.close()
+            names = ["Sheet1"]
+        else:
+            names = self._close_split()
+        with self._zip.open("xl/sharedStrings.xml", "w", force_zip64=True) as f:
+            _write_chunked(f, self._sst_parts(), self._chunk_rows)
+        self._zip.writestr("[Content_Types].xml", content_types(len(names)))
+        self._zip.writestr("_rels/.rels", ROOT_RELS)
+        self._zip.writestr("xl/workbook.xml", workbook(names))
+        self._zip.writestr("xl/_rels/workbook.xml.rels", workbook_rels(len(names)))
+        self._zip.writestr("xl/styles.xml", STYLES)
+        self._zip.close()
+
+    def _close_split(self) -> List[str]:
+        used = {SUMMARY_SHEET.lower()} if self._summary is not None else set()
+        titles = {key: sheet_name(self._sheet_title(key), used) for key in self._sheets}
+        names = []
+        if self._summary is not None:
+            names.append(SUMMARY_SHEET)
+            kinds = ["i", "n", "n", "n", "i", "n"]
+            with self._zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as f:
+                summary = self._open_sheet(f, SUMMARY_HEADERS, kinds)
+                for values in self._summary.rows(titles):
+                    summary.write_values(values)
+                summary.finish()
+                summary.close()
+        elif not self._sheets:
+            # a workbook needs at least one sheet
+            self._sheets[""] = self._open_sheet(tempfile.TemporaryFile())
+            titles[""] = "Sheet1"
+        for key, sheet in self._sheets.items():
+            names.append(titles[key])
+            idx = len(names)
+            sheet.finish()
+            sheet.stream.seek(0)
+            with self._zip.open(f"xl/worksheets/sheet{idx}.xml", "w", force_zip64=True) as f:
+                shutil.copyfileobj(sheet.stream, f, 1 << 20)
+            sheet.stream.close()
+            self._write_rels(idx, sheet)
+            sheet.close()
+        return names
+
+    def _write_rels(self, idx: int, sheet: _Sheet):
+        if sheet.n_links:
+            with self._zip.open(f"xl/worksheets/_rels/sheet{idx}.xml.rels", "w", force_zip64=True) as f:
+                _write_chunked(f, sheet.rels_parts(), self._chunk_rows)
+
+    def _sst_parts(self):
+        yield f'<?xml version=\'1.0\' encoding=\'UTF-8\'?><sst {_NS} count="{self._sst_refs}" uniqueCount="{len(self._sst)}">'
+        for value in self._sst:
+            yield f"<si>{_t(value)}</si>"
+        yield "</sst>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()